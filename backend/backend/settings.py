@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -82,19 +83,112 @@ CACHES = {
     }
 }
 
+REST_FRAMEWORK = {
+    # orjson for compact JSON; same bytes as DRF's JSONRenderer
+    "DEFAULT_RENDERER_CLASSES": [
+        "movies.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
+
+# Thread pool size for running the /api/search/ branches concurrently
+SEARCH_MAX_WORKERS = 3
+
+# In-process tier in front of the shared cache for versioned (search, list
+# page and count) entries; see movies.tiered_cache
+HOT_CACHE_MAX_ENTRIES = 1024
+HOT_CACHE_TIMEOUT = 60
+
+# Seconds each process reuses the generation counters it read, and so the
+# longest a write made by another process can go unseen; see movies.cache
+GENERATION_CACHE_TIMEOUT = 1
+
+# Search cache fills: entries stay servable this long past their TTL while
+# one worker refreshes them, and are refreshed early with probability scaled
+# by this factor (0 disables early refresh); see movies.single_flight
+CACHE_STALE_GRACE = 60
+CACHE_EARLY_REFRESH_BETA = 1.0
+
 WSGI_APPLICATION = "backend.wsgi.application"
 
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+SQLITE_PATH = BASE_DIR / "db.sqlite3"
+
+# "sqlite" (default) or "postgresql", configured from the POSTGRES_* variables
+DATABASE_ENGINE = os.environ.get("DATABASE_ENGINE", "sqlite")
+
+if DATABASE_ENGINE == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("POSTGRES_DB", "movies"),
+            "USER": os.environ.get("POSTGRES_USER", "movies"),
+            "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+            "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+            "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+            # Each worker keeps its connection (to PgBouncer, when pooled)
+            # instead of reconnecting per request
+            "CONN_MAX_AGE": 600,
+            "CONN_HEALTH_CHECKS": True,
+            # Transaction-mode PgBouncer hands each transaction to any server
+            # connection, so named cursors must not outlive a transaction
+            "DISABLE_SERVER_SIDE_CURSORS": os.environ.get("POSTGRES_POOLER")
+            == "pgbouncer",
+        }
+    }
+    # Streaming replica serving the GET requests; see movies.db
+    if os.environ.get("POSTGRES_REPLICA_HOST"):
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "HOST": os.environ["POSTGRES_REPLICA_HOST"],
+            "PORT": os.environ.get(
+                "POSTGRES_REPLICA_PORT", DATABASES["default"]["PORT"]
+            ),
+            "TEST": {"MIRROR": "default"},
+        }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": SQLITE_PATH,
+            # Keep connections open between requests (pragmas are set once per
+            # connection), checking they still work before reusing them
+            "CONN_MAX_AGE": 600,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                # Seconds to wait for an import's write lock instead of failing
+                "timeout": 20,
+            },
+        }
     }
+    # Optional read-only connection on the same file for GET requests, so that
+    # reads never queue behind an import; see movies.db.ReadReplicaRouter
+    if os.environ.get("SQLITE_READ_REPLICA") == "1":
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "NAME": f"file:{SQLITE_PATH}?mode=ro",
+            "TEST": {"MIRROR": "default"},
+        }
+
+# Set on every new SQLite connection; see movies.db.configure_sqlite
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "mmap_size": 256 * 1024 * 1024,
+    # Negative values are in KiB: 64 MiB per connection
+    "cache_size": -64 * 1024,
+    "temp_store": "memory",
 }
 
+DATABASE_ROUTERS = ["movies.db.ReadReplicaRouter"]
+
+# Seconds after a write during which reads stay on the primary; must exceed
+# the replica's replication lag. See movies.db.ReadReplicaRouter
+REPLICA_MAX_LAG = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -0,0 +1,144 @@
+"""
+Benchmark: import.py's parallel filter pipeline at 1, 2, 4 and 8 workers,
+checking every run writes the same subset as the streaming pipeline.
+
+Run from backend/, against the real dumps or generated ones:
+
+    python benchmarks/import_workers.py --dir /path/to/imdb/dumps
+    python benchmarks/import_workers.py --titles 2000000
+
+The speedup is bounded by the cores available (os.cpu_count()).
+"""
+
+import argparse
+import importlib
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+# import.py is a script; "import" cannot be imported with a statement
+imdb_import = importlib.import_module("import")
+
+TABLES = ("movies", "principals", "names")
+
+
+def write_dumps(directory, titles):
+    """Synthetic title.basics/principals/name.basics with a few top movies."""
+    rng = random.Random(0)
+    people = max(titles // 2, 1)
+    top = imdb_import.top_movies
+    with open(directory / "title.basics.tsv", "w", encoding="utf-8") as f:
+        f.write(
+            "tconst\ttitleType\tprimaryTitle\toriginalTitle\tisAdult\t"
+            "startYear\tendYear\truntimeMinutes\tgenres\n"
+        )
+        for i in range(titles):
+            title = top[i % len(top)] if i % 1000 == 0 else f"Title {i}"
+            kind = "movie" if i % 3 else "tvEpisode"
+            f.write(
+                f"tt{i:08d}\t{kind}\t{title}\t{title}\t0\t{1900 + i % 120}\t\\N\t"
+                f"{60 + i % 90}\tDrama,Comedy\n"
+            )
+    with open(directory / "title.principals.tsv", "w", encoding="utf-8") as f:
+        f.write("tconst\tordering\tnconst\tcategory\tjob\tcharacters\n")
+        for i in range(titles):
+            for ordering in range(1, 4):
+                person = rng.randrange(people)
+                f.write(
+                    f"tt{i:08d}\t{ordering}\tnm{person:08d}\tactor\t\\N\t"
+                    f'["Role {ordering}"]\n'
+                )
+    with open(directory / "name.basics.tsv", "w", encoding="utf-8") as f:
+        f.write(
+            "nconst\tprimaryName\tbirthYear\tdeathYear\tprimaryProfession\t"
+            "knownForTitles\n"
+        )
+        for i in range(people):
+            f.write(f"nm{i:08d}\tPerson {i}\t{1900 + i % 100}\t\\N\tactor\t\\N\n")
+
+
+def snapshot(db_path):
+    """Sorted contents of the subset tables, to compare runs."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return {
+            table: sorted(
+                conn.execute(f"SELECT * FROM {table}"), key=lambda row: str(row)
+            )
+            for table in TABLES
+        }
+    finally:
+        conn.close()
+
+
+def timed_run(pipeline, db_path):
+    conn = sqlite3.connect(db_path)
+    started = time.perf_counter()
+    try:
+        pipeline(conn)
+    finally:
+        conn.close()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dir", help="Directory with the IMDb TSV dumps.")
+    parser.add_argument(
+        "--titles",
+        type=int,
+        default=1_000_000,
+        help="Titles to generate when --dir is not given (default: 1000000).",
+    )
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        dumps = Path(args.dir) if args.dir else tmp
+        if not args.dir:
+            write_dumps(dumps, args.titles)
+        imdb_import.tsv_files.update(
+            title_basics=str(dumps / "title.basics.tsv"),
+            title_principals=str(dumps / "title.principals.tsv"),
+            name_basics=str(dumps / "name.basics.tsv"),
+        )
+
+        baseline_db = tmp / "streaming.db"
+        streaming = timed_run(
+            lambda conn: imdb_import.run_streaming(
+                conn, imdb_import.DEFAULT_CHUNK_SIZE
+            ),
+            baseline_db,
+        )
+        expected = snapshot(baseline_db)
+
+        results = []
+        for workers in (int(n) for n in args.workers.split(",")):
+            db_path = tmp / f"workers_{workers}.db"
+            elapsed = timed_run(
+                lambda conn, workers=workers: imdb_import.run_parallel(conn, workers),
+                db_path,
+            )
+            if snapshot(db_path) != expected:
+                sys.exit(f"{workers} workers: subset differs from --stream output")
+            results.append((workers, elapsed))
+
+    print(f"\n{os.cpu_count()} CPUs; --stream (pandas) took {streaming:.2f}s")
+    print(f"{'workers':>8} {'seconds':>8} {'speedup':>8} {'vs pandas':>10}")
+    single = results[0][1]
+    for workers, elapsed in results:
+        print(
+            f"{workers:>8} {elapsed:>8.2f} {single / elapsed:>7.2f}x "
+            f"{streaming / elapsed:>9.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Minimal HTTP load generator for comparing WSGI and ASGI throughput.
+
+Run both servers against the same db.sqlite3, one worker each:
+
+    gunicorn backend.wsgi:application --workers 1 --threads 8 --bind :8000
+    uvicorn backend.asgi:application --workers 1 --port 8001
+
+then point one target at each:
+
+    python benchmarks/load_test.py \
+        --target wsgi=http://127.0.0.1:8000/api/movies/?title=Toy \
+        --target asgi=http://127.0.0.1:8001/api/async/movies/?title=Toy \
+        --concurrency 64 --requests 2000 --bust-cache
+
+`--bust-cache` appends a unique query param to every request so each one
+misses the response cache and reaches the database.
+"""
+
+import argparse
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def fetch(url: str, timeout: float) -> tuple[float, bool]:
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            ok = response.status < 400
+    except (urllib.error.URLError, TimeoutError):
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def run_target(
+    url: str, requests: int, concurrency: int, bust_cache: bool, timeout: float
+) -> dict[str, float]:
+    separator = "&" if "?" in url else "?"
+    urls = [
+        f"{url}{separator}_bench={i}" if bust_cache else url for i in range(requests)
+    ]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda u: fetch(u, timeout), urls))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        "requests": requests,
+        "errors": sum(1 for _, ok in results if not ok),
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--target",
+        action="append",
+        required=True,
+        help="label=url to load; repeat to compare several servers.",
+    )
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--bust-cache", action="store_true")
+    args = parser.parse_args(argv)
+
+    print(f"{'target':<10} {'req/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'errors':>8}")
+    for target in args.target:
+        label, _, url = target.partition("=")
+        stats = run_target(
+            url, args.requests, args.concurrency, args.bust_cache, args.timeout
+        )
+        print(
+            f"{label:<10} {stats['rps']:>10.1f} {stats['p50_ms']:>10.1f} "
+            f"{stats['p95_ms']:>10.1f} {stats['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
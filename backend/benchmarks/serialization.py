@@ -0,0 +1,90 @@
+"""
+Micro-benchmark: ModelSerializer + JSONRenderer against FastSerializer +
+ORJSONRenderer on full list pages, checking the bytes are identical.
+
+Run from backend/ against a populated database:
+
+    python benchmarks/serialization.py --page-size 50 --repeat 200
+
+The database query is included in both timings, as it is in a request.
+"""
+
+import argparse
+import os
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django
+
+django.setup()
+
+from movies.renderers import ORJSONRenderer
+from movies.serializers import (
+    MovieSerializer,
+    NameSerializer,
+    PrincipalSerializer,
+    fast_serializer,
+)
+from movies.utils import filter_movies, filter_names, filter_principals
+from rest_framework.renderers import JSONRenderer
+
+CASES = [
+    ("movies", MovieSerializer, filter_movies),
+    ("principals", PrincipalSerializer, filter_principals),
+    ("names", NameSerializer, filter_names),
+]
+
+
+def model_serializer_page(serializer_class, queryset, page_size):
+    data = serializer_class(queryset[:page_size], many=True).data
+    return JSONRenderer().render(data)
+
+
+def fast_page(serializer_class, queryset, page_size):
+    fast = fast_serializer(serializer_class)
+    rows = fast.serialize(fast.values(queryset)[:page_size])
+    return ORJSONRenderer().render(rows)
+
+
+def best_of(fn, repeat):
+    """Best per-call time over `repeat` calls, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<12} {'drf ms':>8} {'fast ms':>8} {'speedup':>8}")
+    for label, serializer_class, filter_fn in CASES:
+        queryset = filter_fn({})
+        slow = model_serializer_page(serializer_class, queryset, args.page_size)
+        fast = fast_page(serializer_class, queryset, args.page_size)
+        if slow != fast:
+            sys.exit(f"{label}: fast output differs from ModelSerializer output")
+
+        slow_ms = best_of(
+            partial(model_serializer_page, serializer_class, queryset, args.page_size),
+            args.repeat,
+        )
+        fast_ms = best_of(
+            partial(fast_page, serializer_class, queryset, args.page_size),
+            args.repeat,
+        )
+        print(f"{label:<12} {slow_ms:>8.2f} {fast_ms:>8.2f} {slow_ms / fast_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,13 @@
 import pytest
+from movies.cache import local_generations
 
 
 @pytest.fixture
 def example_fixture():
     return "This is a shared fixture!"
+
+
+@pytest.fixture(autouse=True)
+def fresh_local_generations():
+    """Generation counters read by an earlier test may outlive its cache."""
+    local_generations.clear()
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class MoviesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "movies"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+
+        from . import signals  # noqa: F401
+        from .db import configure_sqlite
+        from .search import reinstall_sqlite_indexes
+
+        connection_created.connect(configure_sqlite)
+        post_migrate.connect(reinstall_sqlite_indexes, sender=self)
@@ -0,0 +1,208 @@
+"""
+Read-only async (ASGI-native) variants of the movie, principal, name and
+search endpoints, served under /api/async/.
+
+They reuse the filter_* querysets, serializers and paginators of the DRF
+views (so the same `count` modes and `?pagination=cursor` apply), but query
+through Django's async ORM and the async cache API, so under an ASGI server
+a single worker can keep many slow or cache-miss requests in flight instead
+of tying up a thread per request.
+"""
+
+import asyncio
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Model, QuerySet
+from django.http import HttpRequest, JsonResponse
+from django.views import View
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.serializers import BaseSerializer
+
+from .cache import (
+    aget_generations,
+    dependencies,
+    list_cache_key,
+    object_cache_key,
+    search_cache_key,
+    search_dependencies,
+)
+from .models import Movie, Name, Principal, SearchQueryParams
+from .pagination import KeysetPagination, StandardResultsSetPagination
+from .serializers import MovieSerializer, NameSerializer, PrincipalSerializer
+from .single_flight import aget_or_compute
+from .tiered_cache import hot_cache
+from .utils import filter_movies, filter_names, filter_principals
+from .views import (
+    BranchResult,
+    build_search_response,
+    has_search_filters,
+    search_branches,
+    search_kinds,
+    single_query_params,
+)
+
+# Same lifetimes as the read-through / manual caching of the sync views
+LIST_CACHE_TIMEOUT = 60 * 15
+SEARCH_CACHE_TIMEOUT = 60 * 5
+
+
+def paginate(
+    queryset: QuerySet, request: HttpRequest, *, cursor: bool = True
+) -> tuple[dict[str, Any], list[Any]]:
+    """
+    Paginate `queryset` as the DRF views do, with the same count modes and,
+    if `cursor`, opt-in keyset pagination: returns the response metadata
+    and the objects on the page. Raises NotFound for an invalid page.
+    """
+    drf_request = Request(request)
+    if cursor and KeysetPagination.requested(drf_request):
+        paginator = KeysetPagination()
+    else:
+        paginator = StandardResultsSetPagination()
+    objects = paginator.paginate_queryset(queryset, drf_request)
+    meta = paginator.get_paginated_response([]).data
+    del meta["results"]
+    return meta, objects
+
+
+# The paginators query synchronously, as the async ORM itself does in a thread
+apaginate = sync_to_async(paginate)
+
+
+class AsyncModelView(View):
+    """
+    Async list and retrieve for one model. Subclasses set the model and
+    serializer and build the filtered queryset.
+
+    Cache keys embed the model generations like those of the DRF viewsets
+    (see movies.cache), so writes and imports retire them. Plain retrieves
+    share the viewsets' "obj:" entries; list pages are cached whole.
+    """
+
+    http_method_names = ["get", "head", "options"]
+    model: type[Model]
+    serializer_class: type[BaseSerializer]
+
+    def get_queryset(self, request: HttpRequest) -> QuerySet:
+        raise NotImplementedError
+
+    async def get(self, request: HttpRequest, pk: str | None = None) -> JsonResponse:
+        label = self.model._meta.label_lower
+        generations = await aget_generations(dependencies([label]))
+        if pk is None:
+            # Whole pages, next to the "ids:" pages of the DRF list
+            key = list_cache_key(label, Request(request), generations)
+            tier, cache_key = hot_cache, f"async:{key}"
+        elif not request.GET:
+            tier, cache_key = cache, object_cache_key(label, pk, generations)
+        else:
+            # Filter params can hide the object, as in ReadThroughCacheMixin
+            tier = cache_key = None
+        if tier is not None:
+            cached_data = await tier.aget(cache_key)
+            if cached_data is not None:
+                return JsonResponse(cached_data)
+
+        queryset = self.get_queryset(request)
+        if pk is not None:
+            try:
+                obj = await queryset.aget(pk=pk)
+            except (queryset.model.DoesNotExist, ValueError):
+                return JsonResponse({"detail": "Not found."}, status=404)
+            data = self.serializer_class(obj).data
+        else:
+            try:
+                meta, objects = await apaginate(queryset, request)
+            except NotFound as e:
+                return JsonResponse({"detail": str(e.detail)}, status=404)
+            data = {**meta, "results": self.serializer_class(objects, many=True).data}
+
+        if tier is not None:
+            await tier.aset(cache_key, data, timeout=LIST_CACHE_TIMEOUT)
+        return JsonResponse(data)
+
+
+class AsyncMovieView(AsyncModelView):
+    model = Movie
+    serializer_class = MovieSerializer
+
+    def get_queryset(self, request):
+        return filter_movies(request.GET, base_qs=Movie.objects.all())
+
+
+class AsyncPrincipalView(AsyncModelView):
+    model = Principal
+    serializer_class = PrincipalSerializer
+
+    def get_queryset(self, request):
+        base_qs = Principal.objects.all()
+        tconst = request.GET.get("tconst")
+        if tconst:
+            base_qs = base_qs.filter(tconst_id=tconst)
+        return filter_principals(request.GET, base_qs=base_qs)
+
+
+class AsyncNameView(AsyncModelView):
+    model = Name
+    serializer_class = NameSerializer
+
+    def get_queryset(self, request):
+        return filter_names(request.GET, base_qs=Name.objects.all())
+
+
+async def run_search_branch(
+    kind: str,
+    queryset: QuerySet,
+    serializer_class: type[BaseSerializer],
+    request: HttpRequest,
+) -> BranchResult:
+    try:
+        meta, objects = await apaginate(queryset, request, cursor=False)
+    except NotFound:
+        # This branch has fewer pages than the one being browsed
+        count = await sync_to_async(StandardResultsSetPagination().get_total)(
+            queryset, Request(request)
+        )
+        return kind, {"count": count, "next": None, "previous": None}, []
+    rows = [{"type": kind, "data": serializer_class(obj).data} for obj in objects]
+    return kind, meta, rows
+
+
+class AsyncSearchView(View):
+    """Async variant of SearchAPIView."""
+
+    http_method_names = ["get", "head", "options"]
+
+    async def get(self, request: HttpRequest) -> JsonResponse:
+        single_params = single_query_params(request.GET)
+        try:
+            params = SearchQueryParams(**single_params)
+        except ValueError as e:
+            return JsonResponse({"error": f"Invalid query parameters: {e}"}, status=400)
+
+        generations = await aget_generations(search_dependencies(search_kinds(params)))
+        cache_key = search_cache_key(params, request, generations)
+
+        if not has_search_filters(params):
+            return JsonResponse(
+                {"error": "At least one search parameter is required."}, status=400
+            )
+
+        async def compute():
+            results = await asyncio.gather(
+                *(
+                    run_search_branch(*branch, request)
+                    for branch in search_branches(params, single_params)
+                )
+            )
+            return build_search_response(list(results))
+
+        response_data = await aget_or_compute(
+            cache_key, compute, timeout=SEARCH_CACHE_TIMEOUT
+        )
+        if response_data is None:
+            return JsonResponse({"message": "No results found."}, status=404)
+        return JsonResponse(response_data)
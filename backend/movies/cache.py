@@ -0,0 +1,241 @@
+"""
+Cache keys and generation-based invalidation for cached reads.
+
+Every model has a generation counter stored in the cache. Keys for cached
+reads embed the generations of the models the read depends on, so bumping
+a model's generation on write makes exactly those entries unreachable; they
+then age out on their TTL instead of being served stale.
+
+Single-row writes bump generations through the signals in movies.signals.
+Bulk writes (bulk_create, queryset update/delete) send no signals, so the
+import commands call bump_generation() themselves.
+
+The list/retrieve endpoints cache serialized rows per object ("obj:" keys)
+and list pages as the IDs they contain ("ids:" keys). Both embed the
+generations too, so a bulk import retires cached rows exactly like it
+retires list pages, and a single-row write retires the cached rows of its
+model along with every list page that might have included them.
+
+Each process keeps the counters it read for GENERATION_CACHE_TIMEOUT
+seconds, so a hot read needs no shared-cache lookup for them. A write in
+another process is therefore seen at most that long after its bump; writes
+in the same process drop the local copy and are seen immediately.
+
+Every bump also records its time (LAST_WRITE_KEY), which is read together
+with the counters. A process that builds keys from new counters therefore
+knows a write just happened, and the database router keeps its reads off a
+replica that may not have applied it yet (see recently_written()).
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Model
+
+# A cached read of a model also depends on the models it joins or nests
+DEPENDENCIES: dict[str, tuple[str, ...]] = {
+    "movies.movie": ("movies.movie", "movies.rating"),
+    "movies.principal": ("movies.principal",),
+    "movies.name": ("movies.name",),
+    "movies.rating": ("movies.rating",),
+}
+
+# Model read by each /api/search/ branch
+SEARCH_KIND_MODELS = {
+    "movie": "movies.movie",
+    "principal": "movies.principal",
+    "name": "movies.name",
+}
+
+# SearchQueryParams matched ignoring case; the others (e.g. nconsts) are exact
+SEARCH_CASELESS_PARAMS = ("title", "name", "characters", "category", "job", "genre")
+
+# Query params besides SearchQueryParams that change a search response
+SEARCH_PAGINATION_PARAMS = ("page", "page_size", "count")
+
+
+# Time of the latest bump, read along with the counters
+LAST_WRITE_KEY = "gen:last_write"
+
+
+def generation_key(label: str) -> str:
+    return f"gen:{label}"
+
+
+def dependencies(labels: Iterable[str]) -> list[str]:
+    return sorted({dep for label in labels for dep in DEPENDENCIES.get(label, ())})
+
+
+class LocalGenerations:
+    """The generation counters this process read recently, per label."""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._data: dict[str, tuple[float, int]] = {}
+        self._last_write: tuple[float, float] | None = None
+        self._lock = threading.Lock()
+
+    def get(self, labels: Iterable[str]) -> tuple[dict[str, int], list[str]]:
+        """The fresh counters among `labels`, and the labels to fetch."""
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            for label in labels:
+                item = self._data.get(label)
+                if item is not None and item[0] > now:
+                    found[label] = item[1]
+                else:
+                    missing.append(label)
+        return found, missing
+
+    def set(self, generations: dict[str, int]) -> None:
+        if self.timeout <= 0:
+            return
+        expires = time.monotonic() + self.timeout
+        with self._lock:
+            for label, generation in generations.items():
+                self._data[label] = (expires, generation)
+
+    def get_last_write(self) -> float | None:
+        item = self._last_write
+        if item is None or item[0] <= time.monotonic():
+            return None
+        return item[1]
+
+    def set_last_write(self, last_write: float) -> None:
+        if self.timeout > 0:
+            self._last_write = (time.monotonic() + self.timeout, last_write)
+
+    def discard(self, labels: Iterable[str]) -> None:
+        with self._lock:
+            for label in labels:
+                self._data.pop(label, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._last_write = None
+
+
+local_generations = LocalGenerations(
+    timeout=getattr(settings, "GENERATION_CACHE_TIMEOUT", 1)
+)
+
+
+def get_generations(labels: Iterable[str]) -> dict[str, int]:
+    """Current generation of each model label, seeding missing counters."""
+    generations, missing = local_generations.get(labels)
+    if missing:
+        keys = {generation_key(label): label for label in missing}
+        found = cache.get_many([*keys, LAST_WRITE_KEY])
+        local_generations.set_last_write(found.pop(LAST_WRITE_KEY, 0))
+        for key in keys.keys() - found.keys():
+            # Seed from the clock so a counter lost to eviction never repeats
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+        fetched = {label: found[key] for key, label in keys.items()}
+        local_generations.set(fetched)
+        generations.update(fetched)
+    return generations
+
+
+async def aget_generations(labels: Iterable[str]) -> dict[str, int]:
+    generations, missing = local_generations.get(labels)
+    if missing:
+        keys = {generation_key(label): label for label in missing}
+        found = await cache.aget_many([*keys, LAST_WRITE_KEY])
+        local_generations.set_last_write(found.pop(LAST_WRITE_KEY, 0))
+        for key in keys.keys() - found.keys():
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            found[key] = await cache.aget(key)
+        fetched = {label: found[key] for key, label in keys.items()}
+        local_generations.set(fetched)
+        generations.update(fetched)
+    return generations
+
+
+def bump_generation(*models: type[Model]) -> None:
+    """Invalidate every cached read that depends on `models`."""
+    labels = [model._meta.label_lower for model in models]
+    # Before the counters move, so whoever reads the new ones reads this too
+    now = time.time()
+    cache.set(LAST_WRITE_KEY, now, timeout=None)
+    for label in labels:
+        key = generation_key(label)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+    local_generations.discard(labels)
+    local_generations.set_last_write(now)
+
+
+def recently_written(window: float) -> bool:
+    """Whether any generation was bumped in the last `window` seconds."""
+    last_write = local_generations.get_last_write()
+    if last_write is None:
+        last_write = cache.get(LAST_WRITE_KEY, 0)
+        local_generations.set_last_write(last_write)
+    return time.time() - last_write < window
+
+
+def fingerprint(data: Any, generations: dict[str, int]) -> str:
+    payload = json.dumps([data, sorted(generations.items())], sort_keys=True)
+    return hashlib.md5(payload.encode(), usedforsecurity=False).hexdigest()
+
+
+def search_fingerprint_data(params, query_params) -> dict[str, Any]:
+    """
+    Canonical form of a search: the parsed SearchQueryParams without blank
+    values, with the case-insensitive filters case-folded, plus the
+    pagination params that shape the response.
+    """
+    data: dict[str, Any] = {}
+    for field, value in params.model_dump().items():
+        if value is None or value == "" or value is False:
+            continue
+        if field in SEARCH_CASELESS_PARAMS:
+            value = value.casefold()
+        data[field] = value
+    for name in SEARCH_PAGINATION_PARAMS:
+        value = (query_params.get(name) or "").strip().lower()
+        if value and not (name == "page" and value == "1"):
+            data[name] = value
+    return data
+
+
+def search_cache_key(params, request, generations: dict[str, int]) -> str:
+    """
+    Key for a search response. The host and path are included because the
+    pagination links are absolute URLs of the endpoint that was called.
+    """
+    data = [
+        request.get_host(),
+        request.path,
+        search_fingerprint_data(params, request.GET),
+    ]
+    return f"search:{fingerprint(data, generations)}"
+
+
+def search_dependencies(kinds: Iterable[str]) -> list[str]:
+    return dependencies(SEARCH_KIND_MODELS[kind] for kind in kinds)
+
+
+def object_cache_key(label: str, pk: Any, generations: dict[str, int]) -> str:
+    return f"obj:{label}:{pk}:{fingerprint(None, generations)}"
+
+
+def list_cache_key(label: str, request, generations: dict[str, int]) -> str:
+    """
+    Key for the page of IDs a list request returns. Query params are
+    order-insensitive; the host is included because pagination links are
+    absolute URLs.
+    """
+    data = [request.get_host(), sorted(request.query_params.lists())]
+    return f"ids:{label}:{fingerprint(data, generations)}"
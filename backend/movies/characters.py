@@ -0,0 +1,43 @@
+"""
+Character names of principals.
+
+Principal.characters holds IMDb's JSON array of the characters a person
+played (possibly still as the raw JSON text). Searching it with icontains
+scans the serialized JSON of every principal. PrincipalCharacter stores one
+row per name instead, under a trigram text index (search.CHARACTER_INDEX).
+"""
+
+import json
+from collections.abc import Iterable
+from typing import Any
+
+from .models import Principal, PrincipalCharacter
+
+
+def parse_characters(value: Any) -> list[str]:
+    """['Simba'] or '["Simba"]' -> ['Simba']; anything else -> []."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return [value] if value and value != "\\N" else []
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return [str(name) for name in value if name]
+
+
+def sync_principal_characters(principals: Iterable[Principal]) -> None:
+    """Rewrite the character rows of `principals` from their `characters`."""
+    characters = {p.pk: parse_characters(p.characters) for p in principals}
+    if not characters:
+        return
+    PrincipalCharacter.objects.filter(principal_id__in=characters).delete()
+    PrincipalCharacter.objects.bulk_create(
+        [
+            PrincipalCharacter(principal_id=pk, name=name)
+            for pk, names in characters.items()
+            for name in names
+        ]
+    )
@@ -0,0 +1,111 @@
+"""
+Database connection tuning and read/write routing.
+
+SQLite connections get the pragmas in settings.SQLITE_PRAGMAS when they are
+opened (WAL journaling, so readers are not blocked by an import's writes;
+mmap and a larger page cache; synchronous=NORMAL, which is durable enough
+under WAL). Combined with CONN_MAX_AGE, they are set once per connection
+rather than once per request.
+
+Reads made inside read_replica() (GET requests to the viewsets and search
+views, see ReadReplicaMixin) go to the REPLICA alias when it is configured:
+a read-only connection on the same SQLite file, or a PostgreSQL streaming
+replica. Everything else, including every write and the reads of requests
+that write, uses the default database, so a request never reads behind its
+own writes because of replication lag.
+
+Nor do the reads that fill the shared caches: their keys embed the model
+generations, so a GET that followed a write and read the old row from a
+lagging replica would cache it under the new key. For REPLICA_MAX_LAG
+seconds after any generation bump, reads therefore go to the default
+database too (see movies.cache.recently_written). Reads whose results are
+written back, like the materialized rebuilds, run inside read_primary().
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .cache import recently_written
+
+REPLICA = "replica"
+
+_use_replica: ContextVar[bool] = ContextVar("use_replica", default=False)
+
+
+def configure_sqlite(sender, connection, **kwargs) -> None:
+    """connection_created receiver applying settings.SQLITE_PRAGMAS."""
+    if connection.vendor != "sqlite":
+        return
+    pragmas = dict(getattr(settings, "SQLITE_PRAGMAS", {}))
+    if "mode=ro" in str(connection.settings_dict["NAME"]):
+        # Changing the journal mode is a write; the primary sets WAL on the file
+        pragmas.pop("journal_mode", None)
+    for name, value in pragmas.items():
+        # The raw connection, so the pragmas don't show up as queries
+        connection.connection.execute(f"PRAGMA {name} = {value}")
+
+
+def has_replica() -> bool:
+    return REPLICA in connections.settings
+
+
+@contextmanager
+def read_replica() -> Iterator[None]:
+    """Route the reads made in this context to the replica, if there is one."""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+@contextmanager
+def read_primary() -> Iterator[None]:
+    """Route the reads made in this context to the default database."""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReadReplicaRouter:
+    """Reads inside read_replica() go to REPLICA; all writes to the default."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            _use_replica.get()
+            and has_replica()
+            and not recently_written(getattr(settings, "REPLICA_MAX_LAG", 5))
+        ):
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Also for instances that were loaded from the replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        aliases = {DEFAULT_DB_ALIAS, REPLICA}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class ReadReplicaMixin:
+    """Serve safe (read-only) requests of a view from the replica."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with read_replica():
+            return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,83 @@
+"""
+Normalized genres.
+
+IMDb stores a title's genres as one comma-separated string ("Adventure,
+Animation"), which Movie.genre keeps for the API. Filtering on it with
+`icontains` scans the table and matches substrings ("Music" matches
+"Musical"). Movie.genres mirrors it as rows in an indexed join table, so
+genre filters become index lookups on (genre, movie).
+"""
+
+from collections.abc import Iterable
+
+from django.db.models import QuerySet
+from django.db.models.functions import Lower
+
+from .models import Genre, Movie, MovieGenre
+
+GENRE_MATCHES = ("any", "all")
+
+
+def split_genres(value: str | None) -> list[str]:
+    """'Adventure,Animation' -> ['Adventure', 'Animation']."""
+    if not value:
+        return []
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def get_genre_ids(names: Iterable[str]) -> dict[str, int]:
+    """Ids of the named genres, creating missing ones."""
+    names = set(names)
+    ids = dict(Genre.objects.filter(name__in=names).values_list("name", "id"))
+    missing = names - ids.keys()
+    if missing:
+        Genre.objects.bulk_create(
+            [Genre(name=name) for name in missing], ignore_conflicts=True
+        )
+        ids.update(Genre.objects.filter(name__in=missing).values_list("name", "id"))
+    return ids
+
+
+def sync_movie_genres(movies: Iterable[Movie]) -> None:
+    """Rewrite the genre rows of `movies` from their `genre` strings."""
+    movies = list(movies)
+    if not movies:
+        return
+    wanted = {movie.pk: split_genres(movie.genre) for movie in movies}
+    ids = get_genre_ids(name for names in wanted.values() for name in names)
+
+    MovieGenre.objects.filter(movie_id__in=wanted).delete()
+    MovieGenre.objects.bulk_create(
+        [
+            MovieGenre(movie_id=pk, genre_id=ids[name])
+            for pk, names in wanted.items()
+            for name in dict.fromkeys(names)
+        ]
+    )
+
+
+def filter_genres(queryset: QuerySet, value: str, match: str = "any") -> QuerySet:
+    """
+    Movies with any (or, with match="all", every) genre in the
+    comma-separated `value`. Names match exactly, ignoring case.
+    """
+    wanted = {name.lower() for name in split_genres(value)}
+    if not wanted:
+        return queryset
+    ids = list(
+        Genre.objects.annotate(lower_name=Lower("name"))
+        .filter(lower_name__in=wanted)
+        .values_list("id", flat=True)
+    )
+    if not ids or (match == "all" and len(ids) < len(wanted)):
+        return queryset.none()
+
+    if match == "all":
+        for genre_id in ids:
+            queryset = queryset.filter(
+                pk__in=MovieGenre.objects.filter(genre_id=genre_id).values("movie_id")
+            )
+        return queryset
+    return queryset.filter(
+        pk__in=MovieGenre.objects.filter(genre_id__in=ids).values("movie_id")
+    )
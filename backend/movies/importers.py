@@ -0,0 +1,120 @@
+"""
+Helpers shared by the IMDb import management commands.
+"""
+
+import hashlib
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+from .models import ImportedFile, RowFingerprint
+
+
+def clean(value: Any) -> Any:
+    """Map IMDb's '\\N' placeholder (and empty values) to None."""
+    if value is None or value == "\\N" or value == "":
+        return None
+    return value
+
+
+def clean_int(value: Any) -> int | None:
+    """clean() for integer columns; anything non-numeric becomes None."""
+    value = clean(value)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def row_digest(values: Sequence[Any]) -> str:
+    """
+    Stable digest of a row's imported values. Two rows hash equal only if
+    every value matches, so a changed digest means the row needs rewriting.
+    """
+    payload = "\x1f".join("\\N" if v is None else str(v) for v in values)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def files_unchanged(checksums: dict[str, str]) -> bool:
+    """True if `checksums` matches what the last successful import recorded."""
+    if not checksums:
+        return False
+    recorded = dict(ImportedFile.objects.values_list("name", "checksum"))
+    return recorded == checksums
+
+
+def record_files(checksums: dict[str, str]) -> None:
+    """Remember the source checksums of a successful import."""
+    ImportedFile.objects.exclude(name__in=checksums).delete()
+    for name, checksum in checksums.items():
+        ImportedFile.objects.update_or_create(
+            name=name, defaults={"checksum": checksum}
+        )
+
+
+class FingerprintDiff:
+    """
+    Classifies incoming rows of one source table as inserted, updated or
+    unchanged by comparing them with the stored RowFingerprint digests.
+    Keys that were stored but never seen again are the deletes.
+    """
+
+    def __init__(self, table: str) -> None:
+        self.table = table
+        self.stored: dict[str, str] = dict(
+            RowFingerprint.objects.filter(table=table).values_list("key", "digest")
+        )
+        self.seen: set[str] = set()
+        self.pending: dict[str, str] = {}
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+
+    def changed(self, key: str, values: Sequence[Any]) -> bool:
+        """Record `key` as seen and return True if its row is new or different."""
+        digest = row_digest(values)
+        self.seen.add(key)
+        previous = self.stored.get(key)
+        if previous == digest:
+            self.unchanged += 1
+            return False
+        if previous is None:
+            self.inserted += 1
+        else:
+            self.updated += 1
+        self.pending[key] = digest
+        return True
+
+    def flush(self) -> None:
+        """Persist the digests of rows written since the last flush."""
+        if not self.pending:
+            return
+        RowFingerprint.objects.bulk_create(
+            [
+                RowFingerprint(table=self.table, key=key, digest=digest)
+                for key, digest in self.pending.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["table", "key"],
+            update_fields=["digest"],
+        )
+        self.pending = {}
+
+    def deleted_keys(self) -> list[str]:
+        """Keys present in the previous import but missing from this one."""
+        return sorted(self.stored.keys() - self.seen)
+
+    def forget(self, keys: Iterable[str]) -> None:
+        """Drop the fingerprints of deleted rows."""
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            RowFingerprint.objects.filter(
+                table=self.table, key__in=keys[start : start + 500]
+            ).delete()
+
+    def summary(self) -> str:
+        return (
+            f"{self.inserted} inserted, {self.updated} updated, "
+            f"{self.unchanged} unchanged"
+        )
@@ -2,111 +2,65 @@ import csv
 import gzip
 import logging
 import os
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 
 import requests
 from django.core.management.base import BaseCommand
-from movies.models import Movie, Rating
+from django.db import transaction
 from tqdm import tqdm
 
+from movies.cache import bump_generation
+from movies.materialized import people_of, refresh_filmographies
+from movies.models import Movie, Rating
+
 logger = logging.getLogger(__name__)
 
 IMDB_RATINGS_GZ_URL = "https://datasets.imdbws.com/title.ratings.tsv.gz"
-LOCAL_UNCOMPRESSED = "title.ratings.tsv"  # local uncompressed file
+LOCAL_GZ = "title.ratings.tsv.gz"  # local compressed download
+LOCAL_UNCOMPRESSED = "title.ratings.tsv"  # optional pre-extracted file
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def open_ratings(path):
+    """Open a ratings TSV for reading, decompressing on the fly if gzipped."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
 
 
 class Command(BaseCommand):
     """
-    Downloads 'title.ratings.tsv.gz' from IMDb, decompresses to 'title.ratings.tsv'
-    if not already present, and imports ratings for existing Movies.
+    Downloads 'title.ratings.tsv.gz' from IMDb if no local copy is present,
+    streams it without decompressing to disk, and upserts ratings for
+    existing Movies in batches.
     """
 
-    help = "Fetches compressed 'title.ratings.tsv.gz' from IMDb, writes 'title.ratings.tsv' uncompressed, and imports data."
+    help = (
+        "Fetches 'title.ratings.tsv.gz' from IMDb and imports ratings for known movies."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            help=(
+                "Ratings file to import (.tsv or .tsv.gz). Defaults to "
+                f"'{LOCAL_UNCOMPRESSED}' or '{LOCAL_GZ}', downloading the latter if missing."
+            ),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Ratings upserted per bulk query (default: {DEFAULT_BATCH_SIZE}).",
+        )
 
     def handle(self, *args, **options):
-        self.stdout.write(f"Checking for local '{LOCAL_UNCOMPRESSED}' file.")
         logger.info("Starting IMDb ratings import process...")
 
         try:
-            if os.path.exists(LOCAL_UNCOMPRESSED):
-                # We already have an uncompressed file; skip re-download
-                self.stdout.write(
-                    f"File '{LOCAL_UNCOMPRESSED}' already exists. Skipping download."
-                )
-                logger.info("Skipping download; file already present.")
-            else:
-                # 1) Download the gzipped file
-                gz_filename = "title.ratings.tsv.gz"
-                self.stdout.write(f"Downloading from {IMDB_RATINGS_GZ_URL}...")
-                logger.info("Downloading from %s", IMDB_RATINGS_GZ_URL)
-                response = requests.get(IMDB_RATINGS_GZ_URL, stream=True)
-                response.raise_for_status()
-
-                with open(gz_filename, "wb") as gz_file:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            gz_file.write(chunk)
-
-                self.stdout.write(f"Downloaded '{gz_filename}'. Now decompressing...")
-
-                # 2) Decompress local .gz -> local uncompressed
-                with open(gz_filename, "rb") as gz_in:
-                    with gzip.GzipFile(fileobj=gz_in) as gz_file:
-                        with open(LOCAL_UNCOMPRESSED, "wb") as tsv_out:
-                            for line in gz_file:
-                                tsv_out.write(line)
-
-                # (Optional) Remove the .gz file if you don't need it
-                os.remove(gz_filename)
-                self.stdout.write(
-                    f"Decompressed to '{LOCAL_UNCOMPRESSED}' and removed '{gz_filename}'."
-                )
-
-            # 3) Parse local uncompressed file
-            count = 0
-            if os.path.exists(LOCAL_UNCOMPRESSED):
-                self.stdout.write(f"Parsing '{LOCAL_UNCOMPRESSED}' for import...")
-                with open(LOCAL_UNCOMPRESSED, encoding="utf-8") as tsv_file:
-                    reader = csv.DictReader(tsv_file, delimiter="\t")
-                    # Expected columns: tconst, averageRating, numVotes
-
-                    for row in tqdm(reader, desc="Importing IMDb ratings"):
-                        tconst = row["tconst"]
-                        avg = row["averageRating"]
-                        votes = row["numVotes"]
-
-                        # Only update if matching Movie is in DB
-                        try:
-                            movie = Movie.objects.get(tconst=tconst)
-                        except Movie.DoesNotExist:
-                            logger.info(
-                                "Skipping rating for non-existent Movie '%s'.", tconst
-                            )
-                            continue
-
-                        try:
-                            avg = Decimal(avg)
-                            votes = int(votes)
-                        except ValueError:
-                            # Skip if rating/votes are not valid numbers
-                            continue
-
-                        try:
-                            Rating.objects.update_or_create(
-                                tconst=movie,
-                                defaults={"average_rating": avg, "num_votes": votes},
-                            )
-                            count += 1
-                        except Exception as e:
-                            logger.exception("Failed to import rating record.")
-                            self.stderr.write(self.style.ERROR(f"Error: {e}"))
-            else:
-                self.stderr.write(
-                    self.style.ERROR(
-                        f"Error: '{LOCAL_UNCOMPRESSED}' file not found for import."
-                    )
-                )
-                logger.error("File '%s' not found for import.", LOCAL_UNCOMPRESSED)
+            path = options["path"] or self.resolve_source()
+            count = self.import_ratings(path, options["batch_size"])
 
             self.stdout.write(
                 self.style.SUCCESS(
@@ -118,3 +72,86 @@ class Command(BaseCommand):
         except Exception as e:
             logger.exception("Failed to import IMDb ratings.")
             self.stderr.write(self.style.ERROR(f"Error: {e}"))
+
+    def resolve_source(self):
+        """Return a local ratings file, downloading the gzipped dump if needed."""
+        for path in (LOCAL_UNCOMPRESSED, LOCAL_GZ):
+            if os.path.exists(path):
+                self.stdout.write(f"File '{path}' already exists. Skipping download.")
+                logger.info("Skipping download; '%s' already present.", path)
+                return path
+
+        self.stdout.write(f"Downloading from {IMDB_RATINGS_GZ_URL}...")
+        logger.info("Downloading from %s", IMDB_RATINGS_GZ_URL)
+        response = requests.get(IMDB_RATINGS_GZ_URL, stream=True)
+        response.raise_for_status()
+
+        with open(LOCAL_GZ, "wb") as gz_file:
+            for chunk in response.iter_content(chunk_size=8192):
+                if chunk:
+                    gz_file.write(chunk)
+
+        self.stdout.write(f"Downloaded '{LOCAL_GZ}'.")
+        return LOCAL_GZ
+
+    def import_ratings(self, path, batch_size):
+        # Load every known tconst once; almost all IMDb rows miss this set
+        known_tconsts = set(Movie.objects.values_list("tconst", flat=True))
+        # Current ratings, to find the filmographies that need a refresh
+        previous = {
+            tconst: (avg, votes)
+            for tconst, avg, votes in Rating.objects.values_list(
+                "tconst_id", "average_rating", "num_votes"
+            )
+        }
+        changed = set()
+        self.stdout.write(f"Parsing '{path}' for {len(known_tconsts)} known movies...")
+
+        count = 0
+        batch: list[Rating] = []
+        try:
+            with open_ratings(path) as tsv_file:
+                reader = csv.DictReader(tsv_file, delimiter="\t")
+                # Expected columns: tconst, averageRating, numVotes
+
+                for row in tqdm(reader, desc="Importing IMDb ratings"):
+                    tconst = row["tconst"]
+                    if tconst not in known_tconsts:
+                        continue
+
+                    try:
+                        avg = Decimal(row["averageRating"])
+                        votes = int(row["numVotes"])
+                    except (InvalidOperation, ValueError):
+                        # Skip if rating/votes are not valid numbers
+                        continue
+
+                    if previous.get(tconst) != (avg, votes):
+                        changed.add(tconst)
+                    batch.append(
+                        Rating(tconst_id=tconst, average_rating=avg, num_votes=votes)
+                    )
+                    if len(batch) >= batch_size:
+                        count += self.upsert(batch)
+                        batch = []
+
+            if batch:
+                count += self.upsert(batch)
+        finally:
+            # bulk_create sends no signals; invalidate cached reads explicitly,
+            # including after a failure part-way through the committed batches
+            bump_generation(Rating)
+        # Filmographies embed each title's rating
+        refreshed = refresh_filmographies(people_of(changed))
+        self.stdout.write(f"Refreshed {refreshed} filmographies.")
+        return count
+
+    def upsert(self, ratings):
+        with transaction.atomic():
+            Rating.objects.bulk_create(
+                ratings,
+                update_conflicts=True,
+                unique_fields=["tconst"],
+                update_fields=["average_rating", "num_votes"],
+            )
+        return len(ratings)
@@ -0,0 +1,470 @@
+import gzip
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from movies.cache import bump_generation
+from movies.models import Movie, Name, Principal, Rating
+
+# Dump files by source, as published on datasets.imdbws.com
+DEFAULT_FILES = {
+    "basics": "title.basics.tsv",
+    "names": "name.basics.tsv",
+    "principals": "title.principals.tsv",
+    "ratings": "title.ratings.tsv",
+}
+
+# Staging table and TSV columns (in file order) per source
+STAGING = {
+    "basics": (
+        "staging_title_basics",
+        (
+            "tconst",
+            "title_type",
+            "primary_title",
+            "original_title",
+            "is_adult",
+            "start_year",
+            "end_year",
+            "runtime_minutes",
+            "genres",
+        ),
+    ),
+    "names": (
+        "staging_name_basics",
+        (
+            "nconst",
+            "primary_name",
+            "birth_year",
+            "death_year",
+            "primary_profession",
+            "known_for_titles",
+        ),
+    ),
+    "principals": (
+        "staging_title_principals",
+        ("tconst", "ordering", "nconst", "category", "job", "characters"),
+    ),
+    "ratings": (
+        "staging_title_ratings",
+        ("tconst", "average_rating", "num_votes"),
+    ),
+}
+
+# Tables written by the merge. Their secondary indexes and foreign keys are
+# dropped for the load and rebuilt afterwards; indexes backing primary keys
+# and unique constraints (used by ON CONFLICT) are kept.
+TARGET_TABLES = [
+    "movies_movie",
+    "movies_name",
+    "movies_principal",
+    "movies_rating",
+    "movies_moviegenre",
+    "movies_principalcharacter",
+]
+
+# IMDb's TSVs are not CSV: fields are never quoted and may contain quotes,
+# so use a quote character that cannot occur. \N is IMDb's NULL.
+COPY_OPTIONS = "FORMAT csv, DELIMITER E'\\t', QUOTE E'\\b', NULL '\\N', HEADER true"
+
+
+def as_int(column: str) -> str:
+    """SQL casting a text column to integer, NULL when not a plain number."""
+    return f"CASE WHEN {column} ~ '^[0-9]+$' THEN {column}::integer END"
+
+
+MERGE_MOVIES = f"""
+    WITH upserted AS (
+        INSERT INTO movies_movie (
+            tconst, title_type, title, original_title, is_adult, year,
+            end_year, runtime, genre
+        )
+        SELECT DISTINCT ON (tconst)
+            tconst,
+            left(title_type, 50),
+            left(primary_title, 200),
+            left(original_title, 200),
+            is_adult = '1',
+            {as_int("start_year")},
+            {as_int("end_year")},
+            {as_int("runtime_minutes")},
+            left(genres, 200)
+        FROM staging_title_basics
+        WHERE primary_title IS NOT NULL
+            AND (%(title_types)s::text[] IS NULL OR title_type = ANY(%(title_types)s))
+        ORDER BY tconst
+        ON CONFLICT (tconst) DO UPDATE SET
+            title_type = EXCLUDED.title_type,
+            title = EXCLUDED.title,
+            original_title = EXCLUDED.original_title,
+            is_adult = EXCLUDED.is_adult,
+            year = EXCLUDED.year,
+            end_year = EXCLUDED.end_year,
+            runtime = EXCLUDED.runtime,
+            genre = EXCLUDED.genre
+        WHERE (
+            movies_movie.title_type, movies_movie.title,
+            movies_movie.original_title, movies_movie.is_adult,
+            movies_movie.year, movies_movie.end_year, movies_movie.runtime,
+            movies_movie.genre
+        ) IS DISTINCT FROM (
+            EXCLUDED.title_type, EXCLUDED.title, EXCLUDED.original_title,
+            EXCLUDED.is_adult, EXCLUDED.year, EXCLUDED.end_year,
+            EXCLUDED.runtime, EXCLUDED.genre
+        )
+        RETURNING tconst, genre
+    )
+    INSERT INTO changed_movies SELECT tconst, genre FROM upserted
+"""
+
+MERGE_NAMES = f"""
+    INSERT INTO movies_name (
+        nconst, name, birth_year, death_year, primary_professions,
+        known_for_titles
+    )
+    SELECT DISTINCT ON (nconst)
+        nconst,
+        left(coalesce(primary_name, ''), 200),
+        {as_int("birth_year")},
+        {as_int("death_year")},
+        left(primary_profession, 200),
+        known_for_titles
+    FROM staging_name_basics
+    {{where}}
+    ORDER BY nconst
+    ON CONFLICT (nconst) DO UPDATE SET
+        name = EXCLUDED.name,
+        birth_year = EXCLUDED.birth_year,
+        death_year = EXCLUDED.death_year,
+        primary_professions = EXCLUDED.primary_professions,
+        known_for_titles = EXCLUDED.known_for_titles
+    WHERE (
+        movies_name.name, movies_name.birth_year, movies_name.death_year,
+        movies_name.primary_professions, movies_name.known_for_titles
+    ) IS DISTINCT FROM (
+        EXCLUDED.name, EXCLUDED.birth_year, EXCLUDED.death_year,
+        EXCLUDED.primary_professions, EXCLUDED.known_for_titles
+    )
+"""
+
+# When principals are loaded too, only the people credited on a movie
+CREDITED_ONLY = """
+    WHERE nconst IN (
+        SELECT p.nconst
+        FROM staging_title_principals p
+        JOIN movies_movie m ON m.tconst = p.tconst
+    )
+"""
+
+MERGE_PRINCIPALS = """
+    WITH upserted AS (
+        INSERT INTO movies_principal (
+            tconst_id, nconst_id, ordering, category, job, characters
+        )
+        SELECT DISTINCT ON (p.tconst, p.ordering::integer)
+            p.tconst,
+            p.nconst,
+            p.ordering::integer,
+            left(coalesce(p.category, 'unknown'), 50),
+            left(p.job, 200),
+            p.characters::jsonb
+        FROM staging_title_principals p
+        JOIN movies_movie m ON m.tconst = p.tconst
+        JOIN movies_name n ON n.nconst = p.nconst
+        WHERE p.ordering ~ '^[0-9]+$'
+        ORDER BY p.tconst, p.ordering::integer
+        ON CONFLICT (tconst_id, ordering) DO UPDATE SET
+            nconst_id = EXCLUDED.nconst_id,
+            category = EXCLUDED.category,
+            job = EXCLUDED.job,
+            characters = EXCLUDED.characters
+        WHERE (
+            movies_principal.nconst_id, movies_principal.category,
+            movies_principal.job, movies_principal.characters
+        ) IS DISTINCT FROM (
+            EXCLUDED.nconst_id, EXCLUDED.category, EXCLUDED.job,
+            EXCLUDED.characters
+        )
+        RETURNING id, characters
+    )
+    INSERT INTO changed_principals SELECT id, characters FROM upserted
+"""
+
+MERGE_RATINGS = """
+    INSERT INTO movies_rating (tconst_id, average_rating, num_votes)
+    SELECT DISTINCT ON (r.tconst)
+        r.tconst, r.average_rating::numeric, r.num_votes::integer
+    FROM staging_title_ratings r
+    JOIN movies_movie m ON m.tconst = r.tconst
+    ORDER BY r.tconst
+    ON CONFLICT (tconst_id) DO UPDATE SET
+        average_rating = EXCLUDED.average_rating,
+        num_votes = EXCLUDED.num_votes
+    WHERE (movies_rating.average_rating, movies_rating.num_votes)
+        IS DISTINCT FROM (EXCLUDED.average_rating, EXCLUDED.num_votes)
+"""
+
+# The set-based equivalents of genres.sync_movie_genres and
+# characters.sync_principal_characters, for the rows the merge changed
+SYNC_GENRES = [
+    """
+    INSERT INTO movies_genre (name)
+    SELECT DISTINCT btrim(g.name)
+    FROM changed_movies c, unnest(string_to_array(c.genre, ',')) AS g(name)
+    WHERE btrim(g.name) <> ''
+    ON CONFLICT (name) DO NOTHING
+    """,
+    """
+    DELETE FROM movies_moviegenre mg
+    USING changed_movies c
+    WHERE mg.movie_id = c.tconst
+    """,
+    """
+    INSERT INTO movies_moviegenre (movie_id, genre_id)
+    SELECT DISTINCT c.tconst, g.id
+    FROM changed_movies c, unnest(string_to_array(c.genre, ',')) AS s(name)
+    JOIN movies_genre g ON g.name = btrim(s.name)
+    """,
+]
+
+SYNC_CHARACTERS = [
+    """
+    DELETE FROM movies_principalcharacter pc
+    USING changed_principals c
+    WHERE pc.principal_id = c.id
+    """,
+    """
+    INSERT INTO movies_principalcharacter (principal_id, name)
+    SELECT c.id, e.name
+    FROM changed_principals c,
+        jsonb_array_elements_text(
+            CASE WHEN jsonb_typeof(c.characters) = 'array' THEN c.characters
+            ELSE '[]' END
+        ) AS e(name)
+    WHERE e.name <> ''
+    """,
+]
+
+
+def open_dump(path):
+    """Binary stream of a dump, decompressing on the fly if gzipped."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def resolve_dump(path):
+    """`path`, or its gzipped variant if only that exists; None if neither."""
+    for candidate in (path, f"{path}.gz"):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def secondary_indexes(cursor, tables):
+    """(name, definition) of the indexes on `tables` not backing a constraint."""
+    cursor.execute(
+        """
+        SELECT i.relname, pg_get_indexdef(i.oid)
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_class t ON t.oid = x.indrelid
+        WHERE t.relname = ANY(%s)
+            AND pg_table_is_visible(t.oid)
+            AND NOT EXISTS (
+                SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid
+            )
+        ORDER BY i.relname
+        """,
+        [tables],
+    )
+    return cursor.fetchall()
+
+
+def foreign_keys(cursor, tables):
+    """(table, name, definition) of the foreign keys declared on `tables`."""
+    cursor.execute(
+        """
+        SELECT t.relname, c.conname, pg_get_constraintdef(c.oid)
+        FROM pg_constraint c
+        JOIN pg_class t ON t.oid = c.conrelid
+        WHERE c.contype = 'f'
+            AND t.relname = ANY(%s)
+            AND pg_table_is_visible(t.oid)
+        ORDER BY t.relname, c.conname
+        """,
+        [tables],
+    )
+    return cursor.fetchall()
+
+
+class Command(BaseCommand):
+    """
+    Bulk loads the IMDb TSV dumps (plain or gzipped) into PostgreSQL:
+    each file is streamed into a temporary staging table with COPY FROM
+    STDIN, then merged into the movie, name, principal and rating tables
+    with one INSERT ... ON CONFLICT statement per table. Rows that did not
+    change are not rewritten, and rows missing from the dumps are kept.
+
+    Everything runs in one transaction, with the secondary indexes and
+    foreign keys of the target tables dropped during the merge and rebuilt
+    at the end.
+    """
+
+    help = "Loads the IMDb TSV dumps into PostgreSQL with COPY and set-based merges."
+
+    def add_arguments(self, parser):
+        for source, path in DEFAULT_FILES.items():
+            parser.add_argument(
+                f"--{source}",
+                default=path,
+                help=f"Path of the {path} dump, .gz or not (default: {path}).",
+            )
+        parser.add_argument(
+            "--title-types",
+            default="movie",
+            help=(
+                "Comma-separated title types to load from title.basics, "
+                "or '*' for all (default: movie)."
+            ),
+        )
+        parser.add_argument(
+            "--keep-indexes",
+            action="store_true",
+            help=(
+                "Merge with the secondary indexes and foreign keys in place "
+                "instead of rebuilding them."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError(
+                "load_imdb_dumps needs PostgreSQL; use import.py and "
+                "migrate_imdb_data on SQLite."
+            )
+
+        dumps = {}
+        for source in DEFAULT_FILES:
+            path = resolve_dump(options[source])
+            if path is None:
+                self.stdout.write(f"No {options[source]}; skipping {source}.")
+            else:
+                dumps[source] = path
+        if not dumps:
+            raise CommandError("None of the dump files exist.")
+
+        title_types = options["title_types"]
+        title_types = None if title_types == "*" else title_types.split(",")
+
+        started = time.perf_counter()
+        with transaction.atomic(), connection.cursor() as cursor:
+            for source, path in dumps.items():
+                self.stage(cursor, source, path)
+
+            indexes, constraints = [], []
+            if not options["keep_indexes"]:
+                indexes = secondary_indexes(cursor, TARGET_TABLES)
+                constraints = foreign_keys(cursor, TARGET_TABLES)
+                # The merge only writes rows whose references exist; checking
+                # each row through a deferred trigger is far slower than
+                # validating the whole table once when the key is re-added
+                for table, name, _ in constraints:
+                    cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')
+                for name, _ in indexes:
+                    cursor.execute(f'DROP INDEX "{name}"')
+                self.stdout.write(
+                    f"Dropped {len(indexes)} indexes and {len(constraints)} "
+                    "foreign keys."
+                )
+
+            self.merge(cursor, dumps, title_types)
+
+            for name, definition in indexes:
+                self.timed(f"index {name}", cursor.execute, definition)
+            for table, name, definition in constraints:
+                self.timed(
+                    f"foreign key {name}",
+                    cursor.execute,
+                    f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}',
+                )
+
+            # Materialized casts/filmographies are rebuilt on their next read
+            cursor.execute("TRUNCATE movies_moviecast, movies_filmography")
+            cursor.execute(
+                "ANALYZE movies_movie, movies_name, movies_principal, movies_rating"
+            )
+            # ON COMMIT DROP only applies to the outermost transaction
+            staged = [STAGING[source][0] for source in dumps]
+            cursor.execute(
+                f"DROP TABLE {', '.join(staged)}, changed_movies, changed_principals"
+            )
+
+        bump_generation(Movie, Name, Principal, Rating)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Loaded the IMDb dumps in {time.perf_counter() - started:.1f}s."
+            )
+        )
+
+    def timed(self, label, fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        self.stdout.write(f"  {label}: {time.perf_counter() - started:.1f}s")
+        return result
+
+    def stage(self, cursor, source, path):
+        table, columns = STAGING[source]
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {table} "
+            f"({', '.join(f'{column} text' for column in columns)}) ON COMMIT DROP"
+        )
+        started = time.perf_counter()
+        with open_dump(path) as f:
+            cursor.copy_expert(
+                f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH ({COPY_OPTIONS})",
+                f,
+            )
+        rows = cursor.rowcount
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(
+            f"  copied {path}: {rows:,} rows ({rows / elapsed:,.0f} rows/sec)"
+        )
+
+    def merge(self, cursor, dumps, title_types):
+        cursor.execute(
+            "CREATE TEMPORARY TABLE changed_movies (tconst text, genre text) "
+            "ON COMMIT DROP"
+        )
+        cursor.execute(
+            "CREATE TEMPORARY TABLE changed_principals (id bigint, characters jsonb) "
+            "ON COMMIT DROP"
+        )
+        steps = []
+        if "basics" in dumps:
+            steps.append(("movies", MERGE_MOVIES, {"title_types": title_types}))
+        if "names" in dumps:
+            where = CREDITED_ONLY if "principals" in dumps else ""
+            steps.append(("names", MERGE_NAMES.format(where=where), {}))
+        if "principals" in dumps:
+            steps.append(("principals", MERGE_PRINCIPALS, {}))
+        if "ratings" in dumps:
+            steps.append(("ratings", MERGE_RATINGS, {}))
+
+        for label, sql, params in steps:
+            rows = self.timed(
+                f"merged {label}", self.run_statement, cursor, sql, params
+            )
+            self.stdout.write(f"  {label}: {rows:,} rows inserted or updated")
+        self.timed("genres", self.run_all, cursor, SYNC_GENRES)
+        self.timed("characters", self.run_all, cursor, SYNC_CHARACTERS)
+
+    def run_all(self, cursor, statements):
+        for sql in statements:
+            cursor.execute(sql)
+
+    def run_statement(self, cursor, sql, params):
+        cursor.execute(sql, params)
+        return cursor.rowcount
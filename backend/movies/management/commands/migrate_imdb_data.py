@@ -1,29 +1,252 @@
+import json
 import sqlite3
+import time
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from movies.cache import bump_generation
+from movies.characters import sync_principal_characters
+from movies.genres import sync_movie_genres
+from movies.importers import (
+    FingerprintDiff,
+    clean,
+    clean_int,
+    files_unchanged,
+    record_files,
+)
+from movies.materialized import (
+    affected_keys,
+    people_of,
+    refresh_all,
+    refresh_casts,
+    refresh_filmographies,
+)
 from movies.models import Movie, Name, Principal
 
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # optional, only needed for --parquet
+    pq = None
+
 # Path to your existing SQLite database
 OLD_DB_PATH = "../imdb_subset.db"
 
+DEFAULT_BATCH_SIZE = 5000
+
+# Columns read from each table of the subset, in the order the rows unpack
+MOVIE_COLUMNS = (
+    "tconst",
+    "titleType",
+    "primaryTitle",
+    "originalTitle",
+    "isAdult",
+    "startYear",
+    "endYear",
+    "runtimeMinutes",
+    "genres",
+)
+NAME_COLUMNS = (
+    "nconst",
+    "primaryName",
+    "birthYear",
+    "deathYear",
+    "primaryProfession",
+    "knownForTitles",
+)
+PRINCIPAL_COLUMNS = ("tconst", "ordering", "nconst", "category", "job", "characters")
+
+
+def fetch_batches(cursor, sql, batch_size):
+    """Stream rows from the old database in batches instead of fetchall()."""
+    cursor.execute(sql)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield rows
+
+
+def parquet_batches(path, columns, batch_size):
+    """
+    Read a Parquet file in record batches, yielding row tuples like
+    fetch_batches(). Each batch is converted a column at a time from its
+    Arrow buffers, which skips the per-row dicts of RecordBatch.to_pylist().
+    This is not zero-copy: the ORM needs Python objects, so every value is
+    still copied out of Arrow memory.
+    """
+    for batch in pq.ParquetFile(path).iter_batches(
+        batch_size=batch_size, columns=list(columns)
+    ):
+        yield list(zip(*(column.to_pylist() for column in batch.columns)))
+
+
+def source_checksums(cursor):
+    """TSV checksums recorded by import.py, or {} for older subset databases."""
+    try:
+        cursor.execute("SELECT file, checksum FROM import_state")
+    except sqlite3.OperationalError:
+        return {}
+    return dict(cursor.fetchall())
+
+
+class SQLiteSubset:
+    """The filtered subset as the SQLite database written by import.py."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+
+    def checksums(self):
+        return source_checksums(self.conn.cursor())
+
+    def batches(self, table, columns, batch_size):
+        sql = f"SELECT {', '.join(columns)} FROM {table}"
+        return fetch_batches(self.conn.cursor(), sql, batch_size)
+
+    def close(self):
+        self.conn.close()
+
+
+class ParquetSubset:
+    """
+    The filtered subset as the typed Parquet files written by
+    import.py --parquet: one file per table plus import_state.json.
+    """
+
+    def __init__(self, directory):
+        if pq is None:
+            raise CommandError("--parquet needs pyarrow (pip install pyarrow).")
+        self.directory = Path(directory)
+        if not (self.directory / "movies.parquet").exists():
+            raise CommandError(f"No movies.parquet in {self.directory}.")
+
+    def checksums(self):
+        try:
+            return json.loads((self.directory / "import_state.json").read_text())
+        except FileNotFoundError:
+            return {}
+
+    def batches(self, table, columns, batch_size):
+        return parquet_batches(self.directory / f"{table}.parquet", columns, batch_size)
+
+    def close(self):
+        pass
+
+
+def principal_key(tconst, ordering, nconst, category):
+    if ordering is None:
+        return f"{tconst}:{nconst}:{category}"
+    return f"{tconst}:{ordering}"
+
 
 class Command(BaseCommand):
     help = "Migrate IMDb data from an existing SQLite database"
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Rows fetched and written per transaction (default: {DEFAULT_BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            "--db-path",
+            default=OLD_DB_PATH,
+            help=f"Path to the filtered IMDb SQLite database (default: {OLD_DB_PATH}).",
+        )
+        parser.add_argument(
+            "--parquet",
+            metavar="DIR",
+            help=(
+                "Read the subset from the Parquet files written by "
+                "import.py --parquet instead of the SQLite database."
+            ),
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help=(
+                "Only write rows whose fingerprint changed since the last import, "
+                "and delete rows that disappeared from the source."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        db_path = options["db_path"]
+        incremental = options["incremental"]
+
         self.stdout.write("Starting data migration...")
-        self.stdout.write(f"Connecting to the old database at {OLD_DB_PATH}...")
-        conn = sqlite3.connect(OLD_DB_PATH)
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT
-                tconst, titleType, primaryTitle, originalTitle, isAdult, startYear, endYear, runtimeMinutes, genres
-            FROM movies
-        """)
-        movies = cursor.fetchall()
-        for movie in movies:
-            (
+        if options["parquet"]:
+            self.stdout.write(f"Reading the Parquet subset in {options['parquet']}...")
+            source = ParquetSubset(options["parquet"])
+        else:
+            self.stdout.write(f"Connecting to the old database at {db_path}...")
+            source = SQLiteSubset(db_path)
+        try:
+            checksums = source.checksums()
+            if incremental and files_unchanged(checksums):
+                self.stdout.write("Source files unchanged since the last import.")
+                return
+
+            # Movies/people whose cast or filmography may have changed
+            self.touched_movies = set()
+            self.touched_names = set()
+            movies = FingerprintDiff("movies")
+            names = FingerprintDiff("names")
+            principals = FingerprintDiff("principals")
+
+            self.migrate_movies(source, batch_size, movies, incremental)
+            self.stdout.write(f"Movies: {movies.summary()}.")
+            self.migrate_names(source, batch_size, names, incremental)
+            self.stdout.write(f"Names: {names.summary()}.")
+            gone = set()
+            if incremental:
+                gone.update(movies.deleted_keys(), names.deleted_keys())
+            skipped = self.migrate_principals(
+                source, batch_size, principals, incremental, gone
+            )
+            self.stdout.write(
+                f"Principals: {principals.summary()}, "
+                f"skipped {skipped} due to missing references."
+            )
+
+            if incremental:
+                # Resolve the links of rows about to be deleted first
+                casts, filmographies = affected_keys(
+                    self.touched_movies
+                    | set(movies.deleted_keys())
+                    | {key.partition(":")[0] for key in principals.deleted_keys()},
+                    self.touched_names | set(names.deleted_keys()),
+                )
+                self.delete_missing(movies, names, principals)
+                casts = refresh_casts(casts)
+                filmographies = refresh_filmographies(filmographies)
+            else:
+                casts, filmographies = refresh_all()
+            self.stdout.write(
+                f"Refreshed {casts} casts and {filmographies} filmographies."
+            )
+            record_files(checksums)
+        finally:
+            source.close()
+            # Bulk writes send no signals; invalidate cached reads explicitly,
+            # including after a failure part-way through the committed batches
+            bump_generation(Movie, Name, Principal)
+        self.stdout.write("Data migration completed!")
+
+    def report_progress(self, label, rows, started):
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(f"  {label}: {rows} rows ({rows / elapsed:,.0f} rows/sec)")
+
+    def migrate_movies(self, source, batch_size, diff, incremental):
+        started = time.perf_counter()
+        count = 0
+        for rows in source.batches("movies", MOVIE_COLUMNS, batch_size):
+            movies = []
+            for (
                 tconst,
                 title_type,
                 primary_title,
@@ -33,79 +256,189 @@ class Command(BaseCommand):
                 end_year,
                 runtime_minutes,
                 genres,
-            ) = movie
-            Movie.objects.update_or_create(
-                tconst=tconst,
-                title_type=title_type,
-                title=primary_title,
-                original_title=original_title if original_title else None,
-                is_adult=bool(int(is_adult)) if is_adult else False,
-                year=start_year if start_year != "\\N" else None,
-                end_year=end_year if end_year != "\\N" else None,
-                runtime=runtime_minutes if runtime_minutes != "\\N" else None,
-                genre=genres if genres != "\\N" else None,
-            )
-        self.stdout.write(f"Imported {len(movies)} movies.")
-
-        cursor.execute("""
-            SELECT
-                nconst, primaryName, birthYear, deathYear, primaryProfession, knownForTitles
-            FROM names
-        """)
-        names = cursor.fetchall()
-        for name in names:
-            (
+            ) in rows:
+                movie = Movie(
+                    tconst=tconst,
+                    title_type=title_type,
+                    title=primary_title,
+                    original_title=original_title if original_title else None,
+                    is_adult=bool(int(is_adult)) if clean(is_adult) else False,
+                    year=clean_int(start_year),
+                    end_year=clean_int(end_year),
+                    runtime=clean_int(runtime_minutes),
+                    genre=clean(genres),
+                )
+                values = (
+                    movie.title_type,
+                    movie.title,
+                    movie.original_title,
+                    movie.is_adult,
+                    movie.year,
+                    movie.end_year,
+                    movie.runtime,
+                    movie.genre,
+                )
+                if diff.changed(tconst, values) or not incremental:
+                    movies.append(movie)
+            with transaction.atomic():
+                Movie.objects.bulk_create(
+                    movies,
+                    update_conflicts=True,
+                    unique_fields=["tconst"],
+                    update_fields=[
+                        "title_type",
+                        "title",
+                        "original_title",
+                        "is_adult",
+                        "year",
+                        "end_year",
+                        "runtime",
+                        "genre",
+                    ],
+                )
+                sync_movie_genres(movies)
+                diff.flush()
+            self.touched_movies.update(movie.tconst for movie in movies)
+            count += len(rows)
+            self.report_progress("movies", count, started)
+
+    def migrate_names(self, source, batch_size, diff, incremental):
+        started = time.perf_counter()
+        count = 0
+        for rows in source.batches("names", NAME_COLUMNS, batch_size):
+            names = []
+            for (
                 nconst,
                 primary_name,
                 birth_year,
                 death_year,
                 primary_professions,
                 known_for_titles,
-            ) = name
-            Name.objects.update_or_create(
-                nconst=nconst,
-                name=primary_name,
-                birth_year=birth_year if birth_year != "\\N" else None,
-                death_year=death_year if death_year != "\\N" else None,
-                primary_professions=primary_professions
-                if primary_professions != "\\N"
-                else None,
-                known_for_titles=known_for_titles
-                if known_for_titles != "\\N"
-                else None,
-            )
-        self.stdout.write(f"Imported {len(names)} names.")
-
-        cursor.execute("""
-            SELECT
-                tconst, nconst, category, job, characters
-            FROM principals
-        """)
-        principals = cursor.fetchall()
-        for principal in principals:
-            tconst, nconst, category, job, characters = principal
-            try:
-                movie = Movie.objects.get(tconst=tconst)
-                name = Name.objects.get(nconst=nconst)
-                try:
-                    Principal.objects.create(
-                        tconst=movie,
-                        nconst=name,
-                        category=category if category else "unknown",
-                        job=job if job != "\\N" else None,
-                        characters=characters if characters != "\\N" else None,
-                    )
-                except Exception as e:
-                    self.stderr.write(
-                        f"Failed to import principal with tconst={tconst}, nconst={nconst}."
+            ) in rows:
+                name = Name(
+                    nconst=nconst,
+                    name=primary_name,
+                    birth_year=clean_int(birth_year),
+                    death_year=clean_int(death_year),
+                    primary_professions=clean(primary_professions),
+                    known_for_titles=clean(known_for_titles),
+                )
+                values = (
+                    name.name,
+                    name.birth_year,
+                    name.death_year,
+                    name.primary_professions,
+                    name.known_for_titles,
+                )
+                if diff.changed(nconst, values) or not incremental:
+                    names.append(name)
+            with transaction.atomic():
+                Name.objects.bulk_create(
+                    names,
+                    update_conflicts=True,
+                    unique_fields=["nconst"],
+                    update_fields=[
+                        "name",
+                        "birth_year",
+                        "death_year",
+                        "primary_professions",
+                        "known_for_titles",
+                    ],
+                )
+                diff.flush()
+            self.touched_names.update(name.nconst for name in names)
+            count += len(rows)
+            self.report_progress("names", count, started)
+
+    def migrate_principals(self, source, batch_size, diff, incremental, gone=()):
+        # Resolve foreign keys from in-memory key sets instead of a .get() per row.
+        # Movies/names about to be deleted must not be referenced.
+        movie_keys = set(Movie.objects.values_list("tconst", flat=True))
+        name_keys = set(Name.objects.values_list("nconst", flat=True))
+        movie_keys.difference_update(gone)
+        name_keys.difference_update(gone)
+
+        started = time.perf_counter()
+        count = 0
+        skipped = 0
+        for rows in source.batches("principals", PRINCIPAL_COLUMNS, batch_size):
+            principals = []
+            for tconst, ordering, nconst, category, job, characters in rows:
+                if tconst not in movie_keys or nconst not in name_keys:
+                    skipped += 1
+                    continue
+                principal = Principal(
+                    tconst_id=tconst,
+                    nconst_id=nconst,
+                    ordering=clean_int(ordering),
+                    category=category if category else "unknown",
+                    job=clean(job),
+                    characters=clean(characters),
+                )
+                key = principal_key(tconst, principal.ordering, nconst, category)
+                values = (
+                    tconst,
+                    nconst,
+                    principal.category,
+                    principal.job,
+                    principal.characters,
+                )
+                if diff.changed(key, values) or not incremental:
+                    principals.append(principal)
+            tconsts = {principal.tconst_id for principal in principals}
+            if incremental:
+                # An upsert may replace the person at an ordering
+                self.touched_names.update(people_of(tconsts))
+            with transaction.atomic():
+                Principal.objects.bulk_create(
+                    principals,
+                    update_conflicts=True,
+                    unique_fields=["tconst", "ordering"],
+                    update_fields=["nconst", "category", "job", "characters"],
+                )
+                # bulk_create does not return upserted ids; reload by movie
+                sync_principal_characters(
+                    Principal.objects.filter(tconst_id__in=tconsts).only(
+                        "id", "characters"
                     )
-                    self.stderr.write(f"Error: {e}")
-            except (Movie.DoesNotExist, Name.DoesNotExist):
-                self.stdout.write(
-                    f"Skipped principal with tconst={tconst}, nconst={nconst} due to missing reference."
                 )
-                continue
-        self.stdout.write(f"Imported {len(principals)} principals.")
+                diff.flush()
+            self.touched_movies.update(tconsts)
+            self.touched_names.update(p.nconst_id for p in principals)
+            count += len(rows)
+            self.report_progress("principals", count, started)
+        return skipped
 
-        conn.close()
-        self.stdout.write("Data migration completed!")
+    def delete_missing(self, movies, names, principals):
+        """Remove rows that were imported before but are gone from the source."""
+        with transaction.atomic():
+            deleted = principals.deleted_keys()
+            for start in range(0, len(deleted), 500):
+                query = Q()
+                for key in deleted[start : start + 500]:
+                    tconst, _, ordering = key.partition(":")
+                    if ordering.isdigit():
+                        query |= Q(tconst_id=tconst, ordering=int(ordering))
+                    else:
+                        nconst, _, category = ordering.partition(":")
+                        query |= Q(
+                            tconst_id=tconst,
+                            nconst_id=nconst,
+                            category=category,
+                            ordering__isnull=True,
+                        )
+                Principal.objects.filter(query).delete()
+            principals.forget(deleted)
+            self.stdout.write(f"Deleted {len(deleted)} principals.")
+
+            for diff, model, field in (
+                (movies, Movie, "tconst"),
+                (names, Name, "nconst"),
+            ):
+                deleted = diff.deleted_keys()
+                for start in range(0, len(deleted), 500):
+                    model.objects.filter(
+                        **{f"{field}__in": deleted[start : start + 500]}
+                    ).delete()
+                diff.forget(deleted)
+                self.stdout.write(f"Deleted {len(deleted)} {diff.table}.")
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from movies.cache import bump_generation
+from movies.models import Movie, Name, Principal
+from movies.search import rebuild_sqlite_indexes
+
+
+class Command(BaseCommand):
+    """
+    The SQLite FTS5 tables behind title and name search point at the implicit
+    rowids of movies_movie and movies_name, which have text primary keys.
+    VACUUM may renumber those rowids and leave the index matching the wrong
+    rows, so VACUUM through this command (--vacuum), or run it after one.
+    """
+
+    help = "Rebuilds the SQLite text search indexes, optionally after a VACUUM."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--vacuum",
+            action="store_true",
+            help="VACUUM the database before rebuilding the indexes.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            self.stdout.write("Only the SQLite text indexes need rebuilding.")
+            return
+
+        if options["vacuum"]:
+            self.stdout.write("Vacuuming the database...")
+            with connection.cursor() as cursor:
+                cursor.execute("VACUUM")
+        with transaction.atomic():
+            rebuild_sqlite_indexes(connection)
+        # Searches cached while the index was wrong
+        bump_generation(Movie, Name, Principal)
+        self.stdout.write("Rebuilt the text search indexes.")
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import Resolver404, resolve
+
+from movies.views import run_with_own_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_TOP = 100
+
+# The request line of a common/combined format access log entry
+LOG_REQUEST = re.compile(r'"GET (?P<path>/api/\S*) HTTP/[\d.]+" (?P<status>\d{3})')
+
+
+def read_query_file(path):
+    """One request path per line, e.g. `/api/search/?title=Moana`."""
+    with open(path, encoding="utf-8") as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith("#")]
+
+
+def read_access_log(path, top):
+    """The `top` most requested successful GET /api/ paths in an access log."""
+    counts = Counter()
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = LOG_REQUEST.search(line)
+            if match and match["status"] == "200":
+                counts[match["path"]] += 1
+    return [path for path, _ in counts.most_common(top)]
+
+
+class Command(BaseCommand):
+    """
+    Replays GET requests through the API views so that the search, list page
+    and object caches are filled exactly as a real request would fill them
+    (same cache keys, same serializers). Meant to run after a deploy or a
+    cache flush.
+    """
+
+    help = "Precomputes cached search results and list pages from a query list or access log."
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument(
+            "--file", help="File with one request path per line (# for comments)."
+        )
+        source.add_argument(
+            "--log", help="Access log (common/combined format) to replay from."
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=DEFAULT_TOP,
+            help=f"With --log, replay the N most frequent paths (default: {DEFAULT_TOP}).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=DEFAULT_WORKERS,
+            help=f"Requests replayed concurrently (default: {DEFAULT_WORKERS}).",
+        )
+        parser.add_argument(
+            "--host",
+            default="localhost",
+            help="Host the API is served under; pagination links embed it.",
+        )
+
+    def handle(self, *args, **options):
+        if options["file"]:
+            paths = read_query_file(options["file"])
+        else:
+            paths = read_access_log(options["log"], options["top"])
+        if not paths:
+            raise CommandError("No requests to replay.")
+
+        self.factory = RequestFactory(HTTP_HOST=options["host"])
+        self.stdout.write(
+            f"Warming {len(paths)} requests with {options['workers']} workers..."
+        )
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, options["workers"])) as pool:
+            statuses = list(
+                pool.map(lambda p: run_with_own_connection(self.replay, p), paths)
+            )
+        elapsed = time.perf_counter() - started
+
+        failed = [p for p, code in zip(paths, statuses) if code >= 500 or code == 0]
+        for path in failed:
+            self.stderr.write(f"  failed: {path}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Warmed {len(paths) - len(failed)}/{len(paths)} requests in "
+                f"{elapsed:.2f}s ({len(paths) / elapsed:,.1f} requests/sec)."
+            )
+        )
+
+    def replay(self, path):
+        """Run one GET through its view; returns the status code (0 if unroutable)."""
+        try:
+            match = resolve(path.split("?", 1)[0])
+        except Resolver404:
+            return 0
+        request = self.factory.get(path)
+        try:
+            response = match.func(request, *match.args, **match.kwargs)
+            if asyncio.iscoroutine(response):
+                # /api/async/ views; each worker thread runs its own loop
+                response = asyncio.run(response)
+        except Exception:
+            logger.exception("Replaying %s failed.", path)
+            return 500
+        return response.status_code
@@ -0,0 +1,223 @@
+"""
+Materialized read tables for casts and filmographies.
+
+A movie's cast or a person's filmography would otherwise be a Principal
+query joined to Movie/Name/Rating per request. MovieCast and Filmography
+store the finished, ordered lists, so the endpoints serve them with a single
+primary key lookup.
+
+They are kept fresh in three ways:
+
+* the import commands refresh the rows affected by what they wrote
+  (affected_keys + refresh_casts/refresh_filmographies);
+* single-row writes evict the affected rows (see movies.signals);
+* the endpoints rebuild a missing row on first read (get_cast/get_filmography).
+"""
+
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from django.db import transaction
+from django.db.models import F
+
+from .characters import parse_characters
+from .db import read_primary
+from .models import Filmography, Movie, MovieCast, Name, Principal
+
+# Keys per IN (...) query; well below SQLite's bound parameter limit
+CHUNK_SIZE = 500
+
+
+def chunked(keys: Iterable[str], size: int = CHUNK_SIZE) -> Iterator[list[str]]:
+    keys = sorted(set(keys))
+    for start in range(0, len(keys), size):
+        yield keys[start : start + size]
+
+
+def people_of(tconsts: Iterable[str]) -> set[str]:
+    people = set()
+    for chunk in chunked(tconsts):
+        people.update(
+            Principal.objects.filter(tconst_id__in=chunk).values_list(
+                "nconst_id", flat=True
+            )
+        )
+    return people
+
+
+def movies_of(nconsts: Iterable[str]) -> set[str]:
+    movies = set()
+    for chunk in chunked(nconsts):
+        movies.update(
+            Principal.objects.filter(nconst_id__in=chunk).values_list(
+                "tconst_id", flat=True
+            )
+        )
+    return movies
+
+
+def affected_keys(
+    tconsts: Iterable[str], nconsts: Iterable[str]
+) -> tuple[set[str], set[str]]:
+    """
+    Casts and filmographies that may change when the given movies and
+    people (or principals linking them) change. Call it before deleting
+    anything, so the links of deleted rows are still visible.
+    """
+    tconsts, nconsts = set(tconsts), set(nconsts)
+    return tconsts | movies_of(nconsts), nconsts | people_of(tconsts)
+
+
+def build_casts(tconsts: list[str]) -> dict[str, list[dict[str, Any]]]:
+    casts: dict[str, list[dict[str, Any]]] = {tconst: [] for tconst in tconsts}
+    rows = (
+        Principal.objects.filter(tconst_id__in=tconsts)
+        .order_by("tconst_id", F("ordering").asc(nulls_last=True), "id")
+        .values(
+            "tconst_id",
+            "nconst_id",
+            "nconst__name",
+            "category",
+            "job",
+            "characters",
+            "ordering",
+        )
+    )
+    for row in rows:
+        casts[row["tconst_id"]].append(
+            {
+                "nconst": row["nconst_id"],
+                "name": row["nconst__name"],
+                "category": row["category"],
+                "job": row["job"],
+                "characters": parse_characters(row["characters"]),
+                "ordering": row["ordering"],
+            }
+        )
+    return casts
+
+
+def build_filmographies(nconsts: list[str]) -> dict[str, list[dict[str, Any]]]:
+    films: dict[str, list[dict[str, Any]]] = {nconst: [] for nconst in nconsts}
+    rows = (
+        Principal.objects.filter(nconst_id__in=nconsts)
+        .order_by(
+            "nconst_id",
+            F("tconst__year").desc(nulls_last=True),
+            "tconst__title",
+            "id",
+        )
+        .values(
+            "nconst_id",
+            "tconst_id",
+            "tconst__title",
+            "tconst__title_type",
+            "tconst__year",
+            "category",
+            "job",
+            "characters",
+            "tconst__rating__average_rating",
+            "tconst__rating__num_votes",
+        )
+    )
+    for row in rows:
+        rating = row["tconst__rating__average_rating"]
+        films[row["nconst_id"]].append(
+            {
+                "tconst": row["tconst_id"],
+                "title": row["tconst__title"],
+                "title_type": row["tconst__title_type"],
+                "year": row["tconst__year"],
+                "category": row["category"],
+                "job": row["job"],
+                "characters": parse_characters(row["characters"]),
+                # Same representation as RatingSerializer
+                "average_rating": None if rating is None else str(rating),
+                "num_votes": row["tconst__rating__num_votes"],
+            }
+        )
+    return films
+
+
+def refresh_casts(tconsts: Iterable[str]) -> int:
+    """Rebuild the MovieCast rows of `tconsts` (existing movies only)."""
+    count = 0
+    for chunk in chunked(tconsts):
+        existing = list(
+            Movie.objects.filter(tconst__in=chunk).values_list("tconst", flat=True)
+        )
+        casts = build_casts(existing)
+        with transaction.atomic():
+            MovieCast.objects.bulk_create(
+                [MovieCast(movie_id=t, members=casts[t]) for t in existing],
+                update_conflicts=True,
+                unique_fields=["movie"],
+                update_fields=["members", "refreshed_at"],
+            )
+        count += len(existing)
+    return count
+
+
+def refresh_filmographies(nconsts: Iterable[str]) -> int:
+    """Rebuild the Filmography rows of `nconsts` (existing people only)."""
+    count = 0
+    for chunk in chunked(nconsts):
+        known_for = dict(
+            Name.objects.filter(nconst__in=chunk).values_list(
+                "nconst", "known_for_titles"
+            )
+        )
+        films = build_filmographies(list(known_for))
+        with transaction.atomic():
+            Filmography.objects.bulk_create(
+                [
+                    Filmography(
+                        person_id=n,
+                        known_for=[t for t in (titles or "").split(",") if t],
+                        titles=films[n],
+                    )
+                    for n, titles in known_for.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["person"],
+                update_fields=["known_for", "titles", "refreshed_at"],
+            )
+        count += len(known_for)
+    return count
+
+
+def refresh_all() -> tuple[int, int]:
+    """Rebuild every cast and filmography, e.g. after a full import."""
+    return (
+        refresh_casts(Movie.objects.values_list("tconst", flat=True)),
+        refresh_filmographies(Name.objects.values_list("nconst", flat=True)),
+    )
+
+
+def evict(tconsts: Iterable[str] = (), nconsts: Iterable[str] = ()) -> None:
+    """Drop materialized rows; they are rebuilt on their next read."""
+    for chunk in chunked(tconsts):
+        MovieCast.objects.filter(movie_id__in=chunk).delete()
+    for chunk in chunked(nconsts):
+        Filmography.objects.filter(person_id__in=chunk).delete()
+
+
+def get_cast(tconst: str) -> MovieCast | None:
+    """The materialized cast of a movie, built on a miss; None if no movie."""
+    cast = MovieCast.objects.filter(pk=tconst).first()
+    if cast is None:
+        # A lagging replica may have neither the principals nor the new row
+        with read_primary():
+            if refresh_casts([tconst]):
+                cast = MovieCast.objects.filter(pk=tconst).first()
+    return cast
+
+
+def get_filmography(nconst: str) -> Filmography | None:
+    """The materialized filmography of a person, built on a miss; None if no person."""
+    filmography = Filmography.objects.filter(pk=nconst).first()
+    if filmography is None:
+        with read_primary():
+            if refresh_filmographies([nconst]):
+                filmography = Filmography.objects.filter(pk=nconst).first()
+    return filmography
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.17 on 2026-10-17 02:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0002_rating_alter_movie_genre_alter_movie_title_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportedFile",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=200, primary_key=True, serialize=False),
+                ),
+                ("checksum", models.CharField(max_length=64)),
+                ("imported_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="RowFingerprint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("table", models.CharField(max_length=20)),
+                ("key", models.CharField(max_length=50)),
+                ("digest", models.CharField(max_length=32)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="principal",
+            name="ordering",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="principal",
+            constraint=models.UniqueConstraint(
+                fields=("tconst", "ordering"), name="unique_principal_ordering"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="rowfingerprint",
+            constraint=models.UniqueConstraint(
+                fields=("table", "key"), name="unique_row_fingerprint"
+            ),
+        ),
+    ]
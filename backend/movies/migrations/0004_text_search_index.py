@@ -0,0 +1,13 @@
+from django.db import migrations
+
+from movies.search import drop_text_indexes, install_text_indexes
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0003_import_fingerprints"),
+    ]
+
+    operations = [
+        migrations.RunPython(install_text_indexes, drop_text_indexes),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations, models
+
+from movies.search import install_text_indexes
+
+# Columns converted from CharField to IntegerField
+INTEGER_COLUMNS = {
+    "movie": ("year", "end_year", "runtime"),
+    "name": ("birth_year", "death_year"),
+}
+
+
+def null_non_numeric(apps, schema_editor):
+    """Values that cannot be cast to an integer (e.g. a stray '\\N') become NULL."""
+    for model_name, fields in INTEGER_COLUMNS.items():
+        model = apps.get_model("movies", model_name)
+        for field in fields:
+            model.objects.exclude(**{f"{field}__isnull": True}).exclude(
+                **{f"{field}__regex": r"^[0-9]+$"}
+            ).update(**{field: None})
+
+
+def reinstall_text_indexes(apps, schema_editor):
+    """
+    On SQLite, altering a column rebuilds movies_movie and movies_name,
+    which drops the search index triggers and renumbers rowids.
+    """
+    install_text_indexes(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0004_text_search_index"),
+    ]
+
+    operations = [
+        # Reverse order: this runs last when unapplying
+        migrations.RunPython(migrations.RunPython.noop, reinstall_text_indexes),
+        migrations.RunPython(null_non_numeric, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="movie",
+            name="end_year",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="movie",
+            name="runtime",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="movie",
+            name="year",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="name",
+            name="birth_year",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="name",
+            name="death_year",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="movie",
+            index=models.Index(fields=["year", "title"], name="movie_year_title_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="movie",
+            index=models.Index(
+                fields=["title_type", "year"], name="movie_type_year_idx"
+            ),
+        ),
+        migrations.RunPython(reinstall_text_indexes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,104 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+from movies.search import install_text_indexes
+
+
+def reinstall_text_indexes(apps, schema_editor):
+    """SQLite rebuilds movies_movie for AddField, dropping the index triggers."""
+    install_text_indexes(apps, schema_editor)
+
+
+def populate_genres(apps, schema_editor):
+    """Split the existing comma-separated Movie.genre strings into rows."""
+    Movie = apps.get_model("movies", "Movie")
+    Genre = apps.get_model("movies", "Genre")
+    MovieGenre = apps.get_model("movies", "MovieGenre")
+
+    genre_ids = {}
+    batch = []
+    movies = Movie.objects.exclude(genre__isnull=True).values_list("tconst", "genre")
+    for tconst, value in movies.iterator(chunk_size=5000):
+        names = dict.fromkeys(n.strip() for n in value.split(",") if n.strip())
+        for name in names:
+            if name not in genre_ids:
+                genre_ids[name] = Genre.objects.get_or_create(name=name)[0].pk
+            batch.append(MovieGenre(movie_id=tconst, genre_id=genre_ids[name]))
+        if len(batch) >= 5000:
+            MovieGenre.objects.bulk_create(batch)
+            batch = []
+    MovieGenre.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0005_typed_year_columns"),
+    ]
+
+    operations = [
+        # Reverse order: this runs last when unapplying
+        migrations.RunPython(migrations.RunPython.noop, reinstall_text_indexes),
+        migrations.CreateModel(
+            name="Genre",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="MovieGenre",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "genre",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="movies.genre"
+                    ),
+                ),
+                (
+                    "movie",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="movies.movie"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="movie",
+            name="genres",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="movies",
+                through="movies.MovieGenre",
+                to="movies.genre",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="moviegenre",
+            index=models.Index(fields=["genre", "movie"], name="genre_movie_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="moviegenre",
+            constraint=models.UniqueConstraint(
+                fields=("movie", "genre"), name="unique_movie_genre"
+            ),
+        ),
+        migrations.RunPython(reinstall_text_indexes, migrations.RunPython.noop),
+        migrations.RunPython(populate_genres, migrations.RunPython.noop),
+    ]
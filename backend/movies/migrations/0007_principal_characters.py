@@ -0,0 +1,67 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+from movies.characters import parse_characters
+from movies.search import CHARACTER_INDEX, drop_text_index, install_text_index
+
+
+def populate_characters(apps, schema_editor):
+    """One row per character name of every existing principal."""
+    Principal = apps.get_model("movies", "Principal")
+    PrincipalCharacter = apps.get_model("movies", "PrincipalCharacter")
+
+    batch = []
+    principals = Principal.objects.exclude(characters__isnull=True)
+    for pk, characters in principals.values_list("id", "characters").iterator(
+        chunk_size=5000
+    ):
+        batch.extend(
+            PrincipalCharacter(principal_id=pk, name=name)
+            for name in parse_characters(characters)
+        )
+        if len(batch) >= 5000:
+            PrincipalCharacter.objects.bulk_create(batch)
+            batch = []
+    PrincipalCharacter.objects.bulk_create(batch)
+
+
+def install_character_index(apps, schema_editor):
+    install_text_index(schema_editor, CHARACTER_INDEX)
+
+
+def drop_character_index(apps, schema_editor):
+    drop_text_index(schema_editor, CHARACTER_INDEX)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0006_movie_genres"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PrincipalCharacter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.TextField()),
+                (
+                    "principal",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="character_names",
+                        to="movies.principal",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(populate_characters, migrations.RunPython.noop),
+        migrations.RunPython(install_character_index, drop_character_index),
+    ]
@@ -0,0 +1,46 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0007_principal_characters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Filmography",
+            fields=[
+                (
+                    "person",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="filmography",
+                        serialize=False,
+                        to="movies.name",
+                    ),
+                ),
+                ("known_for", models.JSONField(default=list)),
+                ("titles", models.JSONField(default=list)),
+                ("refreshed_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="MovieCast",
+            fields=[
+                (
+                    "movie",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="cast",
+                        serialize=False,
+                        to="movies.movie",
+                    ),
+                ),
+                ("members", models.JSONField(default=list)),
+                ("refreshed_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations
+
+# Keys per IN (...) query; well below SQLite's bound parameter limit
+CHUNK_SIZE = 500
+
+
+def backfill_ordering(apps, schema_editor):
+    """
+    Principals created before 0003 have no ordering. NULLs never conflict in
+    the importers' (tconst, ordering) upserts, so the next import would add a
+    second copy of each of them. Where a movie already has imported orderings
+    its NULL rows are such copies and are deleted; the others are numbered in
+    insertion order, which is the order the dumps list them in.
+    """
+    Principal = apps.get_model("movies", "Principal")
+    MovieCast = apps.get_model("movies", "MovieCast")
+    Filmography = apps.get_model("movies", "Filmography")
+
+    legacy = Principal.objects.filter(ordering__isnull=True)
+    tconsts, nconsts = set(), set()
+    for tconst, nconst in legacy.values_list("tconst_id", "nconst_id").iterator(
+        chunk_size=5000
+    ):
+        tconsts.add(tconst)
+        nconsts.add(nconst)
+    if not tconsts:
+        return
+
+    imported = Principal.objects.filter(ordering__isnull=False)
+    legacy.filter(tconst_id__in=imported.values("tconst_id")).delete()
+
+    # Read the ids up front; SQLite does not isolate a cursor from the updates
+    rows = list(legacy.order_by("tconst_id", "id").values_list("id", "tconst_id"))
+    batch = []
+    previous = None
+    ordering = 0
+    for pk, tconst in rows:
+        ordering = ordering + 1 if tconst == previous else 1
+        previous = tconst
+        batch.append(Principal(id=pk, ordering=ordering))
+        if len(batch) >= 5000:
+            Principal.objects.bulk_update(batch, ["ordering"])
+            batch = []
+    Principal.objects.bulk_update(batch, ["ordering"])
+
+    # Rebuilt from the remaining principals on their next read
+    tconsts, nconsts = sorted(tconsts), sorted(nconsts)
+    for start in range(0, len(tconsts), CHUNK_SIZE):
+        MovieCast.objects.filter(
+            movie_id__in=tconsts[start : start + CHUNK_SIZE]
+        ).delete()
+    for start in range(0, len(nconsts), CHUNK_SIZE):
+        Filmography.objects.filter(
+            person_id__in=nconsts[start : start + CHUNK_SIZE]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0008_materialized_reads"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_ordering, migrations.RunPython.noop),
+    ]
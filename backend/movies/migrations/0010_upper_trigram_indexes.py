@@ -0,0 +1,27 @@
+from django.db import migrations
+
+from movies.search import (
+    CHARACTER_INDEX,
+    TEXT_INDEXES,
+    drop_postgres_index,
+    install_postgres_index,
+)
+
+
+def rebuild_trigram_indexes(apps, schema_editor):
+    """Replace the plain column trigram indexes with ones on UPPER(column)."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for index in (*TEXT_INDEXES, CHARACTER_INDEX):
+        drop_postgres_index(schema_editor, index)
+        install_postgres_index(schema_editor, index)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0009_backfill_principal_ordering"),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_trigram_indexes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+from movies.search import CHARACTER_INDEX, install_sqlite_index
+
+
+def reinstall_character_index(apps, schema_editor):
+    """Point the character FTS5 rows at the id primary key, not the rowid."""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    install_sqlite_index(schema_editor, CHARACTER_INDEX)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0010_upper_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(reinstall_character_index, migrations.RunPython.noop),
+    ]
@@ -2,10 +2,12 @@ from django.db import models
 from django.db.models import (
     BooleanField,
     CharField,
+    DateTimeField,
     DecimalField,
     ForeignKey,
     IntegerField,
     JSONField,
+    ManyToManyField,
     OneToOneField,
     TextField,
 )
@@ -23,23 +25,61 @@ class Movie(models.Model):
     )  # Often filtered or sorted
     original_title: CharField = CharField(max_length=200, blank=True, null=True)
     is_adult: BooleanField = BooleanField(default=False)
-    year: CharField = CharField(max_length=4, blank=True, null=True, db_index=True)
-    end_year: CharField = CharField(max_length=4, blank=True, null=True)
-    runtime: CharField = CharField(max_length=10, blank=True, null=True)
+    year: IntegerField = IntegerField(blank=True, null=True)
+    end_year: IntegerField = IntegerField(blank=True, null=True)
+    runtime: IntegerField = IntegerField(blank=True, null=True)
     genre: CharField = CharField(max_length=200, blank=True, null=True, db_index=True)
+    # Normalized copy of `genre`, kept in sync by movies.genres
+    genres: ManyToManyField = ManyToManyField(
+        "Genre", through="MovieGenre", related_name="movies", blank=True
+    )
+
+    class Meta:
+        indexes = [
+            # Year filters and ranges, sorted by year then title (filter_movies)
+            models.Index(fields=["year", "title"], name="movie_year_title_idx"),
+            # Title type + year, e.g. movies from the 1990s
+            models.Index(fields=["title_type", "year"], name="movie_type_year_idx"),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.year})"
 
 
+class Genre(models.Model):
+    """One IMDb genre, e.g. "Animation"."""
+
+    name: CharField = CharField(max_length=50, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class MovieGenre(models.Model):
+    movie: ForeignKey = ForeignKey(Movie, on_delete=models.CASCADE)
+    genre: ForeignKey = ForeignKey(Genre, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["movie", "genre"], name="unique_movie_genre"
+            )
+        ]
+        # Genre filters look up movies by genre; the index covers that query
+        indexes = [models.Index(fields=["genre", "movie"], name="genre_movie_idx")]
+
+    def __str__(self):
+        return f"{self.movie_id}: {self.genre_id}"
+
+
 class Name(models.Model):
     # Primary key for unique names
     nconst: CharField = CharField(max_length=20, primary_key=True)
 
     # Index 'name' if frequently searched
     name: CharField = CharField(max_length=200, db_index=True)
-    birth_year: CharField = CharField(max_length=4, blank=True, null=True)
-    death_year: CharField = CharField(max_length=4, blank=True, null=True)
+    birth_year: IntegerField = IntegerField(blank=True, null=True)
+    death_year: IntegerField = IntegerField(blank=True, null=True)
     primary_professions: CharField = CharField(max_length=200, blank=True, null=True)
     known_for_titles: TextField = TextField(blank=True, null=True)
 
@@ -53,11 +93,35 @@ class Principal(models.Model):
     category: CharField = CharField(max_length=50)
     job: CharField = CharField(max_length=200, blank=True, null=True)
     characters: JSONField = JSONField(blank=True, null=True)
+    # IMDb's row number within a title; (tconst, ordering) identifies a principal
+    ordering: IntegerField = IntegerField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tconst", "ordering"], name="unique_principal_ordering"
+            )
+        ]
 
     def __str__(self):
         return f"{self.nconst.name} in {self.tconst.title} ({self.category})"
 
 
+class PrincipalCharacter(models.Model):
+    """
+    One character name from Principal.characters, searchable through the
+    CHARACTER_INDEX text index. Kept in sync by movies.characters.
+    """
+
+    principal: ForeignKey = ForeignKey(
+        Principal, on_delete=models.CASCADE, related_name="character_names"
+    )
+    name: TextField = TextField()
+
+    def __str__(self):
+        return self.name
+
+
 class Rating(models.Model):
     """
     Stores IMDb rating data for a movie.
@@ -77,15 +141,83 @@ class Rating(models.Model):
         return f"Rating for {self.tconst.title}: {self.average_rating} ({self.num_votes} votes)"
 
 
+class MovieCast(models.Model):
+    """
+    Materialized, ordered cast and crew of a movie, with names resolved,
+    so a movie's cast is one primary key lookup. See movies.materialized.
+    """
+
+    movie: OneToOneField = OneToOneField(
+        Movie, on_delete=models.CASCADE, primary_key=True, related_name="cast"
+    )
+    members: JSONField = JSONField(default=list)
+    refreshed_at: DateTimeField = DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Cast of {self.movie_id} ({len(self.members)})"
+
+
+class Filmography(models.Model):
+    """
+    Materialized filmography of a person (titles with years and ratings,
+    newest first) plus their parsed known-for titles. See movies.materialized.
+    """
+
+    person: OneToOneField = OneToOneField(
+        Name, on_delete=models.CASCADE, primary_key=True, related_name="filmography"
+    )
+    known_for: JSONField = JSONField(default=list)
+    titles: JSONField = JSONField(default=list)
+    refreshed_at: DateTimeField = DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Filmography of {self.person_id} ({len(self.titles)})"
+
+
+class ImportedFile(models.Model):
+    """
+    Checksum of a source file as of the last successful import.
+    Lets incremental imports skip sources that have not changed.
+    """
+
+    name: CharField = CharField(max_length=200, primary_key=True)
+    checksum: CharField = CharField(max_length=64)
+    imported_at: DateTimeField = DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.checksum[:12]})"
+
+
+class RowFingerprint(models.Model):
+    """
+    Digest of an imported row, keyed by source table and natural key.
+    Incremental imports compare against it to find inserts, updates and deletes.
+    """
+
+    table: CharField = CharField(max_length=20)
+    key: CharField = CharField(max_length=50)
+    digest: CharField = CharField(max_length=32)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["table", "key"], name="unique_row_fingerprint"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.table}:{self.key}"
+
+
 class MovieInput(BaseModel):
     tconst: str
     title_type: str
     title: str
     original_title: str | None = None
     is_adult: bool
-    year: str | None = None
-    end_year: str | None = None
-    runtime: str | None = None
+    year: int | None = None
+    end_year: int | None = None
+    runtime: int | None = None
     genre: str | None = None
 
 
@@ -107,14 +239,24 @@ class SearchQueryParams(BaseModel):
     name: str | None = None
     title: str | None = None
     genre: str | None = None
+    genre_match: str | None = None
     year: str | None = None
+    min_year: str | None = None
+    max_year: str | None = None
     category: str | None = None
     job: str | None = None
     characters: str | None = None
+    min_rating: str | None = None
+    nconsts: str | None = None
     sort: str | None = Field(default=None)
     order: str = Field(default="asc")
     exact: bool | str = Field(default=False)
 
+    @validator("sort", "order", pre=True)
+    def lowercase(cls, v: object) -> object:
+        """Sort fields and directions are matched case-insensitively."""
+        return v.lower() if isinstance(v, str) else v
+
     @validator("exact", pre=True)
     def parse_exact(cls, v: object) -> bool:
         """Convert strings like "true", "false" into booleans."""
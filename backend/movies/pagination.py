@@ -0,0 +1,336 @@
+"""
+Pagination classes for the list and search endpoints.
+
+StandardResultsSetPagination is page-number based and lets clients choose
+how the total is counted (see CountingPaginator).
+
+Page-number pagination runs a COUNT(*) and an `OFFSET n` query per page, so
+deep pages get linearly slower. KeysetPagination instead remembers the sort
+value and primary key of the last row served and asks for the rows after
+it, which an index on the sort column answers in constant time.
+
+Clients opt in with `?pagination=cursor`; the `next`/`previous` links then
+carry an opaque `cursor` param. There is no `count` in this mode.
+"""
+
+import base64
+import json
+from decimal import Decimal
+from typing import Any
+
+from django.core.exceptions import EmptyResultSet, ObjectDoesNotExist
+from django.core.paginator import EmptyPage, Page
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db.models import F, Q, QuerySet
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .cache import dependencies, fingerprint, get_generations
+from .tiered_cache import hot_cache
+
+COUNT_MODES = ("exact", "cached", "estimate", "none")
+
+
+def count_cache_key(queryset: QuerySet) -> str | None:
+    """
+    Cache key for the row count of `queryset`. The SQL of the unordered
+    query is a normalized form of the filter set: the same filters produce
+    the same key whatever order or spelling the query params used. The
+    model generations make writes invalidate the cached count.
+    """
+    try:
+        sql = str(queryset.order_by().query)
+    except EmptyResultSet:
+        return None
+    label = queryset.model._meta.label_lower
+    generations = get_generations(dependencies([label]))
+    return f"count:{label}:{fingerprint(sql, generations)}"
+
+
+class UncountedPage(Page):
+    """A page whose successor is known from fetching one extra row."""
+
+    def __init__(self, object_list, number, paginator, more):
+        super().__init__(object_list, number, paginator)
+        self.more = more
+
+    def has_next(self):
+        return self.more
+
+
+class CountingPaginator(DjangoPaginator):
+    """
+    Django paginator with a choice of how `count` is obtained:
+
+    * exact: COUNT(*) over the filtered queryset (the default).
+    * cached: the exact count, cached under the normalized filter set.
+    * estimate: COUNT(*) over at most `estimate_cap + 1` rows; larger
+      results are reported as e.g. "1000+".
+    * none: no count at all.
+
+    When the count is unknown, the page is fetched with one extra row to
+    tell whether there is a next page.
+    """
+
+    cache_timeout = 60 * 5
+
+    def __init__(self, object_list, per_page, mode="exact", estimate_cap=1000):
+        super().__init__(object_list, per_page)
+        self.mode = mode
+        self.estimate_cap = estimate_cap
+        self.total: int | None = None
+        self.capped = False
+        if mode == "cached":
+            self.total = self.cached_count()
+        elif mode == "estimate":
+            limited = self.object_list.order_by()[: estimate_cap + 1].count()
+            self.capped = limited > estimate_cap
+            self.total = None if self.capped else limited
+        elif mode == "exact":
+            self.total = self.count
+
+    def cached_count(self) -> int:
+        key = count_cache_key(self.object_list)
+        if key is None:
+            return 0
+        count = hot_cache.get(key)
+        if count is None:
+            count = self.count
+            hot_cache.set(key, count, timeout=self.cache_timeout)
+        return count
+
+    @property
+    def display_count(self) -> int | str | None:
+        if self.capped:
+            return f"{self.estimate_cap}+"
+        return self.total
+
+    def validate_number(self, number):
+        if self.total is not None:
+            # Paginator.count is a cached_property; reuse the known total
+            self.__dict__["count"] = self.total
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            return super().validate_number(number)
+        if number < 1:
+            raise EmptyPage(_("That page number is less than 1"))
+        return number
+
+    def page(self, number):
+        if self.total is not None:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_("That page contains no results"))
+        more = len(rows) > self.per_page
+        return UncountedPage(rows[: self.per_page], number, self, more)
+
+    @property
+    def num_pages(self):
+        if self.total is not None:
+            return super().num_pages
+        # Unknown: report no more pages than have been proven to exist
+        return 1
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    """
+    Pagination settings for API responses.
+
+    `?count=exact|cached|estimate|none` picks how the total is counted;
+    clients that do not need an exact total can skip the COUNT(*).
+    """
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 50
+    count_query_param = "count"
+    estimate_cap = 1000
+
+    def get_count_mode(self, request) -> str:
+        mode = request.query_params.get(self.count_query_param, "exact")
+        return mode if mode in COUNT_MODES else "exact"
+
+    def django_paginator_class(self, queryset, page_size):
+        """Called by paginate_queryset() in place of a Paginator class."""
+        return CountingPaginator(
+            queryset,
+            page_size,
+            mode=self.get_count_mode(self.request),
+            estimate_cap=self.estimate_cap,
+        )
+
+    def get_total(self, queryset, request) -> int | str | None:
+        """
+        The total of `queryset` in the requested count mode, for a request
+        whose page is out of range (e.g. a search branch with fewer pages).
+        """
+        self.request = request
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        return paginator.display_count
+
+    def get_page_count(self) -> int | str | None:
+        return self.page.paginator.display_count
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.get_page_count(),
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+
+def resolve(obj: Any, path: str) -> Any:
+    """Follow a `rating__average_rating` style path; missing relations are None."""
+    for attr in path.split("__"):
+        try:
+            obj = getattr(obj, attr)
+        except ObjectDoesNotExist:
+            return None
+        if obj is None:
+            return None
+    return obj
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginates on (sort field, primary key). The sort field comes from the
+    queryset's ordering as set by filter_movies/filter_names/filter_principals,
+    and the primary key is the unique tiebreaker. NULLs sort as the smallest
+    value on every database so the position predicate is well defined.
+    """
+
+    cursor_query_param = "cursor"
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 50
+
+    @classmethod
+    def requested(cls, request: Request) -> bool:
+        params = request.query_params
+        return cls.cursor_query_param in params or params.get("pagination") == "cursor"
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def get_sort(self, queryset: QuerySet) -> tuple[str, bool, str]:
+        """(sort field, descending?, primary key name) for the queryset."""
+        pk = queryset.model._meta.pk.name
+        ordering = [o for o in queryset.query.order_by if isinstance(o, str)]
+        field = ordering[0] if ordering else pk
+        descending = field.startswith("-")
+        return field.lstrip("-"), descending, pk
+
+    def decode_cursor(self, encoded: str) -> tuple[Any, Any, bool]:
+        try:
+            value, pk, reverse = json.loads(base64.urlsafe_b64decode(encoded))
+        except (ValueError, TypeError):
+            raise NotFound("Invalid cursor.") from None
+        return value, pk, bool(reverse)
+
+    def encode_cursor(self, obj: Any, reverse: bool) -> str:
+        value = resolve(obj, self.field)
+        if isinstance(value, Decimal):
+            value = str(value)
+        payload = json.dumps([value, resolve(obj, self.pk), reverse])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def after(self, value: Any, pk: Any, descending: bool) -> Q:
+        """Rows strictly after (value, pk) in the given direction."""
+        field, pk_name = self.field, self.pk
+        tie = Q(**{f"{pk_name}__lt" if descending else f"{pk_name}__gt": pk})
+        if value is None:
+            # NULLs come first ascending and last descending
+            null_tie = Q(**{f"{field}__isnull": True}) & tie
+            if descending:
+                return null_tie
+            return null_tie | Q(**{f"{field}__isnull": False})
+        beyond = Q(**{f"{field}__lt" if descending else f"{field}__gt": value})
+        if descending:
+            beyond |= Q(**{f"{field}__isnull": True})
+        return beyond | (Q(**{field: value}) & tie)
+
+    def order(self, queryset: QuerySet, descending: bool) -> QuerySet:
+        if descending:
+            return queryset.order_by(
+                F(self.field).desc(nulls_last=True), F(self.pk).desc()
+            )
+        return queryset.order_by(F(self.field).asc(nulls_first=True), F(self.pk).asc())
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.field, descending, self.pk = self.get_sort(queryset)
+        page_size = self.get_page_size(request)
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        reverse = False
+        if encoded:
+            value, pk, reverse = self.decode_cursor(encoded)
+            # A reverse cursor walks backwards from the first row of a page
+            queryset = queryset.filter(self.after(value, pk, descending ^ reverse))
+
+        rows = list(self.order(queryset, descending ^ reverse)[: page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, bool(encoded)
+        self.page = rows
+        return rows
+
+    def get_link(self, obj: Any, reverse: bool) -> str:
+        url = replace_query_param(
+            self.request.build_absolute_uri(), "pagination", "cursor"
+        )
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(obj, reverse)
+        )
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next or not self.page:
+            return None
+        return self.get_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self) -> str | None:
+        if not self.has_previous or not self.page:
+            return None
+        return self.get_link(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
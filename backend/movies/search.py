@@ -0,0 +1,241 @@
+"""
+Indexed substring search for movie titles and person names.
+
+filter_movies and filter_names used to run `icontains` lookups, which become
+`LIKE '%x%'` full table scans. The backends here keep the same semantics
+(case-insensitive substring match) but answer them from a trigram index:
+
+* SQLite: an FTS5 virtual table with the trigram tokenizer, kept in sync
+  with the source table by triggers (see `install_sqlite_index`). The FTS
+  rows point at the `rowid` column of the source table: see TextIndex for
+  why that is fragile and what keeps it right.
+* PostgreSQL: pg_trgm GIN indexes on UPPER(column), the expression that
+  Django's `icontains` compares (`UPPER(col::text) LIKE UPPER('%x%')`), so
+  the planner can answer the unchanged lookup from them.
+* Anything else: plain `icontains`.
+"""
+
+from dataclasses import dataclass
+
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.db.models.expressions import RawSQL
+
+# Trigram indexes cannot answer terms shorter than one trigram
+MIN_TRIGRAM_LENGTH = 3
+
+
+@dataclass(frozen=True)
+class TextIndex:
+    """
+    A set of text columns on one table that share a search index.
+
+    `rowid` is the integer column the SQLite FTS5 rows point at. Tables with
+    an INTEGER PRIMARY KEY use it, and it never changes. Tables with a text
+    primary key (movies_movie, movies_name) have no stable integer column,
+    so they use the implicit rowid. VACUUM and the table remakes that SQLite
+    migrations do may renumber it, and searches would then return the wrong
+    rows. reinstall_sqlite_indexes rebuilds the indexes after migrations and
+    the rebuild_text_indexes command after a VACUUM.
+    """
+
+    table: str
+    pk: str
+    fields: tuple[str, ...]
+    rowid: str = "rowid"
+
+    @property
+    def fts_table(self) -> str:
+        return f"{self.table}_fts"
+
+
+MOVIE_TITLE_INDEX = TextIndex("movies_movie", "tconst", ("title", "original_title"))
+NAME_INDEX = TextIndex("movies_name", "nconst", ("name",))
+
+TEXT_INDEXES = (MOVIE_TITLE_INDEX, NAME_INDEX)
+
+# Installed by its own migration, after the table exists
+CHARACTER_INDEX = TextIndex("movies_principalcharacter", "id", ("name",), rowid="id")
+
+
+class IContainsBackend:
+    """Fallback: an OR of `icontains` lookups over the index fields."""
+
+    def match(self, index: TextIndex, term: str) -> Q:
+        query = Q()
+        for field in index.fields:
+            query |= Q(**{f"{field}__icontains": term})
+        return query
+
+
+class SQLiteFTSBackend(IContainsBackend):
+    """Substring match answered by the FTS5 trigram table."""
+
+    def match(self, index: TextIndex, term: str) -> Q:
+        if len(term) < MIN_TRIGRAM_LENGTH:
+            return super().match(index, term)
+        # A quoted FTS5 string matches the term as a literal substring
+        phrase = '"' + term.replace('"', '""') + '"'
+        return Q(
+            pk__in=RawSQL(
+                f"SELECT {index.pk} FROM {index.table} WHERE {index.rowid} IN "
+                f"(SELECT rowid FROM {index.fts_table} "
+                f"WHERE {index.fts_table} MATCH %s)",
+                [phrase],
+            )
+        )
+
+
+class PostgresTrigramBackend(IContainsBackend):
+    """
+    `icontains` is served by the pg_trgm GIN indexes on UPPER(column), so
+    the lookup itself stays `icontains`.
+    """
+
+
+def get_search_backend(alias: str) -> IContainsBackend:
+    vendor = connections[alias].vendor
+    if vendor == "sqlite":
+        return SQLiteFTSBackend()
+    if vendor == "postgresql":
+        return PostgresTrigramBackend()
+    return IContainsBackend()
+
+
+def search_filter(queryset: QuerySet, index: TextIndex, term: str) -> QuerySet:
+    """Filter `queryset` to rows whose index fields contain `term`."""
+    backend = get_search_backend(queryset.db)
+    return queryset.filter(backend.match(index, term))
+
+
+def install_sqlite_index(schema_editor, index: TextIndex) -> None:
+    """
+    Create (or recreate) the FTS5 table and sync triggers for `index` and
+    rebuild it from the source table.
+
+    SQLite migrations that alter the source table rebuild it, which drops the
+    triggers and may renumber implicit rowids; reinstall_sqlite_indexes calls
+    this again after them. VACUUM may renumber implicit rowids too; see
+    rebuild_sqlite_indexes.
+    """
+    table, fts, rowid = index.table, index.fts_table, index.rowid
+    columns = ", ".join(index.fields)
+    new_values = ", ".join(f"new.{f}" for f in index.fields)
+    old_values = ", ".join(f"old.{f}" for f in index.fields)
+
+    drop_sqlite_index(schema_editor, index)
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({columns}, "
+        f"content='{table}', content_rowid='{rowid}', tokenize='trigram')"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.{rowid}, {new_values}); "
+        f"END"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) "
+        f"VALUES ('delete', old.{rowid}, {old_values}); "
+        f"END"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) "
+        f"VALUES ('delete', old.{rowid}, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.{rowid}, {new_values}); "
+        f"END"
+    )
+    schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def rebuild_sqlite_indexes(connection) -> None:
+    """
+    Re-read every FTS5 table from its source table. movies_movie and
+    movies_name have text primary keys, so their FTS rows point at implicit
+    rowids, which VACUUM may renumber: rebuild after every VACUUM (the
+    rebuild_text_indexes command does both).
+    """
+    with connection.cursor() as cursor:
+        for index in (*TEXT_INDEXES, CHARACTER_INDEX):
+            fts = index.fts_table
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def reinstall_sqlite_indexes(sender, using, plan=None, **kwargs) -> None:
+    """
+    post_migrate receiver: reinstall the SQLite search indexes after any
+    migration of this app, so one that remakes an indexed table cannot leave
+    the index without triggers or pointing at renumbered rowids. Indexes
+    whose FTS5 table does not exist (not installed yet, or migrated away)
+    are left alone.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    if not any(migration.app_label == sender.label for migration, _ in plan or ()):
+        return
+    tables = set(connection.introspection.table_names())
+    with connection.schema_editor() as schema_editor:
+        for index in (*TEXT_INDEXES, CHARACTER_INDEX):
+            if index.fts_table in tables:
+                install_sqlite_index(schema_editor, index)
+
+
+def drop_sqlite_index(schema_editor, index: TextIndex) -> None:
+    fts = index.fts_table
+    for suffix in ("ai", "ad", "au"):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {fts}")
+
+
+def trigram_index_name(index: TextIndex, field: str) -> str:
+    return f"{index.table}_{field}_upper_trgm"
+
+
+def install_postgres_index(schema_editor, index: TextIndex) -> None:
+    """
+    Index UPPER(field::text) rather than the column: a trigram index on the
+    plain column cannot serve the `UPPER(...) LIKE` that `icontains` emits.
+    """
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for field in index.fields:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {trigram_index_name(index, field)} "
+            f"ON {index.table} USING gin ((UPPER({field}::text)) gin_trgm_ops)"
+        )
+
+
+def drop_postgres_index(schema_editor, index: TextIndex) -> None:
+    for field in index.fields:
+        schema_editor.execute(
+            f"DROP INDEX IF EXISTS {trigram_index_name(index, field)}"
+        )
+        # Plain column index built before 0010
+        schema_editor.execute(f"DROP INDEX IF EXISTS {index.table}_{field}_trgm")
+
+
+def install_text_index(schema_editor, index: TextIndex) -> None:
+    """Build the search index for `index` on the current vendor."""
+    if schema_editor.connection.vendor == "sqlite":
+        install_sqlite_index(schema_editor, index)
+    elif schema_editor.connection.vendor == "postgresql":
+        install_postgres_index(schema_editor, index)
+
+
+def drop_text_index(schema_editor, index: TextIndex) -> None:
+    if schema_editor.connection.vendor == "sqlite":
+        drop_sqlite_index(schema_editor, index)
+    elif schema_editor.connection.vendor == "postgresql":
+        drop_postgres_index(schema_editor, index)
+
+
+def install_text_indexes(apps, schema_editor) -> None:
+    """RunPython entry point: build the title and name search indexes."""
+    for index in TEXT_INDEXES:
+        install_text_index(schema_editor, index)
+
+
+def drop_text_indexes(apps, schema_editor) -> None:
+    for index in TEXT_INDEXES:
+        drop_text_index(schema_editor, index)
@@ -1,3 +1,9 @@
+import functools
+from collections.abc import Callable, Iterable
+from operator import itemgetter
+from typing import Any
+
+from django.db.models import QuerySet
 from rest_framework import serializers
 
 from .models import Movie, Name, Principal, Rating
@@ -38,3 +44,83 @@ class MovieSerializer(serializers.ModelSerializer):
             "genre",
             "rating",
         ]
+
+
+# Fields whose to_representation() returns what values() already yields
+IDENTITY_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.JSONField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class FastSerializer:
+    """
+    Read-only fast path for a ModelSerializer: rows are fetched with
+    `values()` and turned into dicts by getters compiled once per serializer
+    class, skipping per-object field binding and attribute lookups. The
+    output equals `serializer_class(obj).data`.
+
+    Supports plain model fields and nested serializers of one-to-one /
+    forward relations (e.g. MovieSerializer.rating).
+    """
+
+    def __init__(self, serializer_class: type[serializers.ModelSerializer]):
+        self.columns: list[str] = []
+        self.getters = self.compile(serializer_class(), prefix="")
+
+    def compile(self, serializer, prefix: str) -> list[tuple[str, Callable]]:
+        getters = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if "." in field.source or field.source == "*":
+                raise ValueError(f"Unsupported source for {name}: {field.source!r}")
+            column = prefix + field.source
+
+            if isinstance(field, serializers.BaseSerializer):
+                # A missing related row shows up as a NULL primary key
+                presence = f"{column}__{field.Meta.model._meta.pk.name}"
+                self.columns.append(presence)
+                nested = self.compile(field, prefix=f"{column}__")
+                getters.append((name, self.nested_getter(presence, nested)))
+            else:
+                self.columns.append(column)
+                getters.append((name, self.field_getter(column, field)))
+        return getters
+
+    @staticmethod
+    def field_getter(column: str, field) -> Callable:
+        if isinstance(field, IDENTITY_FIELDS):
+            return itemgetter(column)
+
+        def get(row):
+            value = row[column]
+            return None if value is None else field.to_representation(value)
+
+        return get
+
+    @staticmethod
+    def nested_getter(presence: str, getters: list[tuple[str, Callable]]) -> Callable:
+        def get(row):
+            if row[presence] is None:
+                return None
+            return {name: getter(row) for name, getter in getters}
+
+        return get
+
+    def values(self, queryset: QuerySet) -> QuerySet:
+        return queryset.values(*self.columns)
+
+    def to_representation(self, row: dict[str, Any]) -> dict[str, Any]:
+        return {name: getter(row) for name, getter in self.getters}
+
+    def serialize(self, rows: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+        return [self.to_representation(row) for row in rows]
+
+
+@functools.cache
+def fast_serializer(serializer_class: type[serializers.ModelSerializer]):
+    return FastSerializer(serializer_class)
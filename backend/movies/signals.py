@@ -0,0 +1,59 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_generation
+from .characters import sync_principal_characters
+from .genres import sync_movie_genres
+from .materialized import evict, movies_of, people_of
+from .models import Movie, Name, Principal, Rating
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=Name)
+@receiver(post_save, sender=Principal)
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=Name)
+@receiver(post_delete, sender=Principal)
+@receiver(post_delete, sender=Rating)
+def invalidate_cached_reads(sender, instance, **kwargs):
+    """
+    Single-row writes invalidate the cached reads of their model, including
+    the movies a rating is nested in (see cache.DEPENDENCIES).
+    """
+    bump_generation(sender)
+
+
+@receiver(post_save, sender=Movie)
+def sync_genres(sender, instance, update_fields=None, **kwargs):
+    """Keep Movie.genres in step with the `genre` string on every save."""
+    if update_fields is None or "genre" in update_fields:
+        sync_movie_genres([instance])
+
+
+@receiver(post_save, sender=Principal)
+def sync_characters(sender, instance, update_fields=None, **kwargs):
+    """Keep the searchable character names in step with `characters`."""
+    if update_fields is None or "characters" in update_fields:
+        sync_principal_characters([instance])
+
+
+@receiver(post_save, sender=Principal)
+@receiver(post_delete, sender=Principal)
+def evict_principal_lists(sender, instance, **kwargs):
+    evict(tconsts=[instance.tconst_id], nconsts=[instance.nconst_id])
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def evict_movie_filmographies(sender, instance, **kwargs):
+    """Filmographies embed title, year and rating of each movie."""
+    tconst = instance.pk if sender is Movie else instance.tconst_id
+    evict(nconsts=people_of([tconst]))
+
+
+@receiver(post_save, sender=Name)
+def evict_person_lists(sender, instance, **kwargs):
+    """Casts embed the person's name; the filmography their known-for titles."""
+    evict(tconsts=movies_of([instance.pk]), nconsts=[instance.pk])
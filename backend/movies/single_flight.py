@@ -0,0 +1,211 @@
+"""
+Stampede protection for expensive cache fills.
+
+When a popular entry expires, every concurrent request would miss and
+recompute it. get_or_compute() lets one worker (in any process) take a short
+lock in the shared cache and recompute, while the others serve the previous
+value if there is one, or wait for the winner to store the new one.
+
+Entries are stored as envelopes with a logical expiry. They physically
+live `stale_grace` seconds longer, so a stale value is available while it
+is being refreshed. With `beta > 0`, entries are also refreshed early with a
+probability that rises as the expiry approaches and with the time the value
+took to compute ("XFetch", Vattani et al.), so hot keys are usually
+refreshed before they ever expire.
+
+The lock holds a token unique to its holder, and is released only if it
+still holds that token: a fill that outlives LOCK_TIMEOUT must not delete
+the lock another worker took after it expired.
+"""
+
+import asyncio
+import math
+import random
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .tiered_cache import hot_cache
+
+# Upper bound on how long a crashed winner can block refreshes
+LOCK_TIMEOUT = 30
+# How long losers without a stale value wait before computing themselves
+WAIT_TIMEOUT = 10
+POLL_INTERVAL = 0.05
+
+# Deletes KEYS[1] only if it still holds the caller's token (ARGV[1])
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def lock_key(key: str) -> str:
+    return f"lock:{key}"
+
+
+def acquire_lock(key: str) -> str | None:
+    """Take the refresh lock of `key`; its token, or None if it is held."""
+    token = uuid.uuid4().hex
+    if cache.add(lock_key(key), token, timeout=LOCK_TIMEOUT):
+        return token
+    return None
+
+
+def release_lock(key: str, token: str) -> None:
+    """Release the refresh lock of `key` if it still holds `token`."""
+    client = getattr(cache, "client", None)
+    if hasattr(client, "get_client"):
+        # django_redis: compare and delete atomically on the server
+        client.get_client(write=True).eval(
+            RELEASE_SCRIPT, 1, client.make_key(lock_key(key)), client.encode(token)
+        )
+    elif cache.get(lock_key(key)) == token:
+        cache.delete(lock_key(key))
+
+
+async def aacquire_lock(key: str) -> str | None:
+    token = uuid.uuid4().hex
+    if await cache.aadd(lock_key(key), token, timeout=LOCK_TIMEOUT):
+        return token
+    return None
+
+
+def needs_refresh(entry: dict[str, Any], beta: float) -> bool:
+    now = time.time()
+    if beta > 0:
+        # 1 - random() is in (0, 1], so the log is finite and <= 0
+        now -= entry["delta"] * beta * math.log(1 - random.random())
+    return now >= entry["expires"]
+
+
+def make_entry(value: Any, timeout: int, delta: float) -> dict[str, Any]:
+    return {"value": value, "expires": time.time() + timeout, "delta": delta}
+
+
+def lookup(key: str, beta: float) -> tuple[dict[str, Any] | None, bool]:
+    """(entry, fresh?) for `key`, rechecking the shared tier if stale locally."""
+    entry = hot_cache.get(key)
+    if entry is None or not needs_refresh(entry, beta):
+        return entry, entry is not None
+    # Another process may already have refreshed it
+    shared = cache.get(key)
+    if shared is not None and shared["expires"] > entry["expires"]:
+        hot_cache.local.set(key, shared)
+        return shared, not needs_refresh(shared, beta)
+    return entry, False
+
+
+async def alookup(key: str, beta: float) -> tuple[dict[str, Any] | None, bool]:
+    entry = await hot_cache.aget(key)
+    if entry is None or not needs_refresh(entry, beta):
+        return entry, entry is not None
+    shared = await cache.aget(key)
+    if shared is not None and shared["expires"] > entry["expires"]:
+        hot_cache.local.set(key, shared)
+        return shared, not needs_refresh(shared, beta)
+    return entry, False
+
+
+def store(key: str, value: Any, timeout: int, delta: float, grace: int) -> None:
+    hot_cache.set(key, make_entry(value, timeout, delta), timeout=timeout + grace)
+
+
+def get_or_compute(
+    key: str,
+    compute: Callable[[], Any],
+    timeout: int,
+    *,
+    beta: float | None = None,
+    stale_grace: int | None = None,
+) -> Any:
+    """
+    Return the cached value for `key`, computing and caching it at most
+    once across concurrent callers. `compute` may return None; that result
+    is cached too so that waiters see it.
+    """
+    if beta is None:
+        beta = getattr(settings, "CACHE_EARLY_REFRESH_BETA", 1.0)
+    if stale_grace is None:
+        stale_grace = getattr(settings, "CACHE_STALE_GRACE", 60)
+
+    entry, fresh = lookup(key, beta)
+    if fresh:
+        return entry["value"]
+
+    def fill():
+        started = time.monotonic()
+        value = compute()
+        store(key, value, timeout, time.monotonic() - started, stale_grace)
+        return value
+
+    token = acquire_lock(key)
+    if token is not None:
+        try:
+            return fill()
+        finally:
+            release_lock(key, token)
+    if entry is not None:
+        # Someone else is refreshing; serve the previous value meanwhile
+        return entry["value"]
+
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = hot_cache.get(key)
+        if entry is not None:
+            return entry["value"]
+    return fill()
+
+
+async def aget_or_compute(
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    timeout: int,
+    *,
+    beta: float | None = None,
+    stale_grace: int | None = None,
+) -> Any:
+    """Async variant of get_or_compute for the ASGI views."""
+    if beta is None:
+        beta = getattr(settings, "CACHE_EARLY_REFRESH_BETA", 1.0)
+    if stale_grace is None:
+        stale_grace = getattr(settings, "CACHE_STALE_GRACE", 60)
+
+    entry, fresh = await alookup(key, beta)
+    if fresh:
+        return entry["value"]
+
+    async def fill():
+        started = time.monotonic()
+        value = await compute()
+        await hot_cache.aset(
+            key,
+            make_entry(value, timeout, time.monotonic() - started),
+            timeout=timeout + stale_grace,
+        )
+        return value
+
+    token = await aacquire_lock(key)
+    if token is not None:
+        try:
+            return await fill()
+        finally:
+            await sync_to_async(release_lock)(key, token)
+    if entry is not None:
+        return entry["value"]
+
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        entry = await hot_cache.aget(key)
+        if entry is not None:
+            return entry["value"]
+    return await fill()
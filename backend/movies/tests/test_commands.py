@@ -0,0 +1,479 @@
+import gzip
+import importlib
+import sqlite3
+from io import StringIO
+
+import pytest
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from movies.cache import get_generations
+from movies.management.commands.warm_cache import read_access_log
+from movies.models import (
+    Filmography,
+    Genre,
+    Movie,
+    MovieCast,
+    Name,
+    Principal,
+    PrincipalCharacter,
+    Rating,
+)
+from movies.tiered_cache import hot_cache
+from movies.utils import filter_movies
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def old_db(tmp_path):
+    """
+    Build a small imdb_subset.db shaped like the output of import.py.
+    """
+    path = tmp_path / "imdb_subset.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE movies (
+            tconst TEXT, titleType TEXT, primaryTitle TEXT, originalTitle TEXT,
+            isAdult TEXT, startYear TEXT, endYear TEXT, runtimeMinutes TEXT,
+            genres TEXT
+        );
+        CREATE TABLE names (
+            nconst TEXT, primaryName TEXT, birthYear TEXT, deathYear TEXT,
+            primaryProfession TEXT, knownForTitles TEXT
+        );
+        CREATE TABLE principals (
+            tconst TEXT, ordering TEXT, nconst TEXT, category TEXT, job TEXT,
+            characters TEXT
+        );
+        INSERT INTO movies VALUES
+            ('tt0000001', 'movie', 'Moana', 'Moana', '0', '2016', NULL, '107',
+             'Adventure,Animation'),
+            ('tt0000002', 'movie', 'Up', 'Up', '0', '2009', '\\N', '96', NULL);
+        INSERT INTO names VALUES
+            ('nm0000001', 'Auli''i Cravalho', '2000', NULL, 'actress', 'tt0000001'),
+            ('nm0000002', 'Ed Asner', '1929', '2021', 'actor', 'tt0000002');
+        INSERT INTO principals VALUES
+            ('tt0000001', '1', 'nm0000001', 'actress', NULL, '["Moana"]'),
+            ('tt0000002', '1', 'nm0000002', 'actor', '\\N', '["Carl"]'),
+            ('tt0000002', '2', 'nm9999999', 'actor', NULL, '["Missing"]');
+        CREATE TABLE import_state (file TEXT PRIMARY KEY, checksum TEXT);
+        INSERT INTO import_state VALUES ('title_basics', 'abc');
+    """)
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.mark.django_db
+class TestMigrateImdbData:
+    """Tests for the migrate_imdb_data management command."""
+
+    def test_migrates_all_tables(self, old_db):
+        out = StringIO()
+        call_command("migrate_imdb_data", db_path=str(old_db), batch_size=1, stdout=out)
+
+        assert Movie.objects.count() == 2
+        assert Name.objects.count() == 2
+        # The principal pointing at an unknown name is skipped
+        assert Principal.objects.count() == 2
+        assert "skipped 1 due to missing references" in out.getvalue()
+        assert "rows/sec" in out.getvalue()
+
+        up = Movie.objects.get(tconst="tt0000002")
+        assert (up.year, up.end_year, up.runtime) == (2009, None, 96)
+        assert up.genre is None
+        assert list(PrincipalCharacter.objects.values_list("name", flat=True)) == [
+            "Moana",
+            "Carl",
+        ]
+        moana = Movie.objects.get(tconst="tt0000001")
+        assert sorted(moana.genres.values_list("name", flat=True)) == [
+            "Adventure",
+            "Animation",
+        ]
+        assert Name.objects.get(nconst="nm0000002").death_year == 2021
+
+        cast = MovieCast.objects.get(pk="tt0000002").members
+        assert [(m["name"], m["characters"]) for m in cast] == [("Ed Asner", ["Carl"])]
+        filmography = Filmography.objects.get(pk="nm0000001")
+        assert filmography.known_for == ["tt0000001"]
+        assert [t["title"] for t in filmography.titles] == ["Moana"]
+
+    def test_rerun_updates_existing_rows(self, old_db):
+        Movie.objects.create(tconst="tt0000001", title_type="movie", title="Stale")
+        call_command("migrate_imdb_data", db_path=str(old_db), stdout=StringIO())
+
+        assert Movie.objects.count() == 2
+        assert Movie.objects.get(tconst="tt0000001").title == "Moana"
+        # Re-running a full import does not duplicate principals
+        call_command("migrate_imdb_data", db_path=str(old_db), stdout=StringIO())
+        assert Principal.objects.count() == 2
+
+    def test_backfilled_legacy_principals_are_not_duplicated(self, old_db):
+        migration = importlib.import_module(
+            "movies.migrations.0009_backfill_principal_ordering"
+        )
+        moana = Movie.objects.create(tconst="tt0000001", title="Moana")
+        up = Movie.objects.create(tconst="tt0000002", title="Up")
+        cravalho = Name.objects.create(nconst="nm0000001", name="Auli'i Cravalho")
+        asner = Name.objects.create(nconst="nm0000002", name="Ed Asner")
+        # Created before orderings were imported; Moana's was imported since
+        Principal.objects.create(tconst=up, nconst=asner, category="actor")
+        Principal.objects.create(tconst=moana, nconst=cravalho, category="actress")
+        Principal.objects.create(
+            tconst=moana, nconst=cravalho, category="actress", ordering=1
+        )
+
+        migration.backfill_ordering(apps, None)
+        assert sorted(Principal.objects.values_list("tconst_id", "ordering")) == [
+            ("tt0000001", 1),
+            ("tt0000002", 1),
+        ]
+        call_command("migrate_imdb_data", db_path=str(old_db), stdout=StringIO())
+        assert Principal.objects.count() == 2
+
+    def test_incremental_applies_only_changes(self, old_db):
+        call_command("migrate_imdb_data", db_path=str(old_db), stdout=StringIO())
+
+        conn = sqlite3.connect(old_db)
+        conn.executescript("""
+            UPDATE movies SET primaryTitle = 'Up!' WHERE tconst = 'tt0000002';
+            DELETE FROM principals WHERE tconst = 'tt0000001';
+            DELETE FROM names WHERE nconst = 'nm0000001';
+            INSERT INTO movies VALUES
+                ('tt0000003', 'movie', 'Coco', 'Coco', '0', '2017', NULL, '105', NULL);
+            UPDATE import_state SET checksum = 'def';
+        """)
+        conn.commit()
+        conn.close()
+
+        out = StringIO()
+        call_command(
+            "migrate_imdb_data", db_path=str(old_db), incremental=True, stdout=out
+        )
+
+        assert "Movies: 1 inserted, 1 updated, 1 unchanged" in out.getvalue()
+        assert Movie.objects.get(tconst="tt0000002").title == "Up!"
+        assert Movie.objects.filter(tconst="tt0000003").exists()
+        assert not Name.objects.filter(nconst="nm0000001").exists()
+        assert list(Principal.objects.values_list("tconst", flat=True)) == ["tt0000002"]
+
+        # Only the affected materialized rows were rebuilt
+        assert "Refreshed 3 casts and 1 filmographies" in out.getvalue()
+        assert MovieCast.objects.get(pk="tt0000001").members == []
+        assert not Filmography.objects.filter(pk="nm0000001").exists()
+        titles = Filmography.objects.get(pk="nm0000002").titles
+        assert [t["title"] for t in titles] == ["Up!"]
+
+    def test_incremental_skips_unchanged_sources(self, old_db):
+        call_command("migrate_imdb_data", db_path=str(old_db), stdout=StringIO())
+        Movie.objects.filter(tconst="tt0000001").update(title="Edited")
+
+        out = StringIO()
+        call_command(
+            "migrate_imdb_data", db_path=str(old_db), incremental=True, stdout=out
+        )
+
+        assert "Source files unchanged" in out.getvalue()
+        assert Movie.objects.get(tconst="tt0000001").title == "Edited"
+
+    def test_migrates_from_parquet(self, old_db, tmp_path):
+        pa = pytest.importorskip("pyarrow")
+        pq = pytest.importorskip("pyarrow.parquet")
+        # The typed files import.py --parquet writes from the same subset
+        types = {
+            "isAdult": pa.bool_(),
+            "startYear": pa.int32(),
+            "endYear": pa.int32(),
+            "runtimeMinutes": pa.int32(),
+            "ordering": pa.int32(),
+            "birthYear": pa.int32(),
+            "deathYear": pa.int32(),
+        }
+        conn = sqlite3.connect(old_db)
+        conn.execute("UPDATE movies SET endYear = NULL WHERE endYear = '\\N'")
+        for table in ("movies", "names", "principals"):
+            cursor = conn.execute(f"SELECT * FROM {table}")
+            columns = [column[0] for column in cursor.description]
+            rows = list(zip(*cursor.fetchall()))
+            pq.write_table(
+                pa.table(
+                    {
+                        column: pa.array(values).cast(types.get(column, pa.string()))
+                        for column, values in zip(columns, rows)
+                    }
+                ),
+                tmp_path / f"{table}.parquet",
+            )
+        conn.close()
+        (tmp_path / "import_state.json").write_text('{"title_basics": "abc"}')
+
+        out = StringIO()
+        call_command(
+            "migrate_imdb_data", parquet=str(tmp_path), batch_size=1, stdout=out
+        )
+        assert "skipped 1 due to missing references" in out.getvalue()
+        up = Movie.objects.get(tconst="tt0000002")
+        assert (up.year, up.end_year, up.runtime, up.is_adult) == (
+            2009,
+            None,
+            96,
+            False,
+        )
+        assert Principal.objects.get(tconst_id="tt0000002").ordering == 1
+        assert Name.objects.get(nconst="nm0000002").death_year == 2021
+
+        # The typed values match the text ones: nothing changed, nothing to do
+        call_command("migrate_imdb_data", db_path=str(old_db), stdout=StringIO())
+        Movie.objects.filter(tconst="tt0000001").update(title="Edited")
+        (tmp_path / "import_state.json").write_text('{"title_basics": "def"}')
+        out = StringIO()
+        call_command(
+            "migrate_imdb_data", parquet=str(tmp_path), incremental=True, stdout=out
+        )
+        assert "Movies: 0 inserted, 0 updated, 2 unchanged" in out.getvalue()
+        assert "Principals: 0 inserted, 0 updated, 2 unchanged" in out.getvalue()
+
+    def test_parquet_directory_must_hold_a_subset(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        with pytest.raises(CommandError, match="No movies.parquet"):
+            call_command("migrate_imdb_data", parquet=str(tmp_path), stdout=StringIO())
+
+
+@pytest.mark.django_db
+class TestImportRatings:
+    """Tests for the import_ratings management command."""
+
+    def test_upserts_ratings_from_gzip(self, tmp_path):
+        Movie.objects.create(tconst="tt0000001", title_type="movie", title="Moana")
+        Movie.objects.create(tconst="tt0000002", title_type="movie", title="Up")
+        Rating.objects.create(tconst_id="tt0000002", average_rating=1, num_votes=1)
+
+        path = tmp_path / "title.ratings.tsv.gz"
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write("tconst\taverageRating\tnumVotes\n")
+            f.write("tt0000001\t7.6\t350000\n")
+            f.write("tt0000002\t8.3\t1100000\n")
+            f.write("tt0000003\t5.0\t10\n")  # unknown movie
+            f.write("tt0000001\tbad\t1\n")  # invalid number
+
+        out = StringIO()
+        call_command(
+            "import_ratings", path=str(path), batch_size=1, stdout=out, stderr=out
+        )
+
+        assert "Imported/updated 2 rating records" in out.getvalue()
+        assert Rating.objects.count() == 2
+        up = Rating.objects.get(tconst_id="tt0000002")
+        assert str(up.average_rating) == "8.3"
+        assert up.num_votes == 1100000
+
+    def test_invalidates_cached_reads(self, tmp_path):
+        Movie.objects.create(tconst="tt0000001", title_type="movie", title="Moana")
+        before = get_generations(["movies.rating"])
+
+        path = tmp_path / "title.ratings.tsv"
+        path.write_text("tconst\taverageRating\tnumVotes\ntt0000001\t7.6\t350000\n")
+        call_command("import_ratings", path=str(path), stdout=StringIO())
+
+        assert get_generations(["movies.rating"]) != before
+
+    def test_invalidates_cached_reads_after_a_failure(self, tmp_path):
+        Movie.objects.create(tconst="tt0000001", title_type="movie", title="Moana")
+        before = get_generations(["movies.rating"])
+
+        # An interrupted download: the rows inflate, the gzip trailer is missing
+        data = gzip.compress(
+            b"tconst\taverageRating\tnumVotes\ntt0000001\t7.6\t350000\n"
+        )
+        path = tmp_path / "title.ratings.tsv.gz"
+        path.write_bytes(data[:-8])
+        out = StringIO()
+        call_command(
+            "import_ratings", path=str(path), batch_size=1, stdout=out, stderr=out
+        )
+
+        assert "Error: Compressed file ended" in out.getvalue()
+        assert Rating.objects.filter(tconst_id="tt0000001").exists()
+        assert get_generations(["movies.rating"]) != before
+
+    def test_refreshes_filmographies_of_changed_ratings(self, tmp_path):
+        movie = Movie.objects.create(tconst="tt0000001", title="Moana")
+        Movie.objects.create(tconst="tt0000002", title="Up")
+        Name.objects.create(nconst="nm0000001", name="Auli'i Cravalho")
+        Name.objects.create(nconst="nm0000002", name="Ed Asner")
+        Principal.objects.create(tconst=movie, nconst_id="nm0000001", ordering=1)
+        Principal.objects.create(tconst_id="tt0000002", nconst_id="nm0000002")
+        Rating.objects.create(tconst_id="tt0000002", average_rating=8.3, num_votes=5)
+
+        path = tmp_path / "title.ratings.tsv"
+        path.write_text(
+            "tconst\taverageRating\tnumVotes\n"
+            "tt0000001\t7.6\t350000\n"
+            "tt0000002\t8.3\t5\n"
+        )
+        out = StringIO()
+        call_command("import_ratings", path=str(path), stdout=out)
+
+        assert "Refreshed 1 filmographies" in out.getvalue()
+        titles = Filmography.objects.get(pk="nm0000001").titles
+        assert titles[0]["average_rating"] == "7.6"
+        assert not Filmography.objects.filter(pk="nm0000002").exists()
+
+
+@pytest.fixture
+def dumps(tmp_path):
+    """Tiny IMDb TSV dumps, gzipped like the published ones."""
+    files = {
+        "basics": (
+            "tconst\ttitleType\tprimaryTitle\toriginalTitle\tisAdult\t"
+            "startYear\tendYear\truntimeMinutes\tgenres\n"
+            "tt0000001\tmovie\tMoana\tMoana\t0\t2016\t\\N\t107\t"
+            "Adventure,Animation\n"
+            'tt0000002\tmovie\tUp "Too"\tUp\t0\t2009\t\\N\t96\t\\N\n'
+            "tt0000003\ttvEpisode\tPilot\tPilot\t0\t2001\t\\N\t30\tDrama\n"
+        ),
+        "names": (
+            "nconst\tprimaryName\tbirthYear\tdeathYear\tprimaryProfession\t"
+            "knownForTitles\n"
+            "nm0000001\tAuli'i Cravalho\t2000\t\\N\tactress\ttt0000001\n"
+            "nm0000002\tEd Asner\t1929\t2021\tactor\ttt0000002\n"
+            "nm0000003\tUncredited\t1950\t\\N\tactor\t\\N\n"
+        ),
+        "principals": (
+            "tconst\tordering\tnconst\tcategory\tjob\tcharacters\n"
+            'tt0000001\t1\tnm0000001\tactress\t\\N\t["Moana"]\n'
+            'tt0000002\t1\tnm0000002\tactor\t\\N\t["Carl"]\n'
+        ),
+        "ratings": (
+            "tconst\taverageRating\tnumVotes\n"
+            "tt0000001\t7.6\t350000\n"
+            "tt0000003\t9.0\t10\n"
+        ),
+    }
+    paths = {}
+    for source, content in files.items():
+        paths[source] = str(tmp_path / f"{source}.tsv.gz")
+        with gzip.open(paths[source], "wt", encoding="utf-8") as f:
+            f.write(content)
+    return paths
+
+
+@pytest.mark.django_db
+class TestLoadImdbDumps:
+    """Tests for the load_imdb_dumps management command."""
+
+    @pytest.mark.skipif(connection.vendor == "postgresql", reason="SQLite only")
+    def test_requires_postgresql(self, dumps):
+        with pytest.raises(CommandError, match="needs PostgreSQL"):
+            call_command("load_imdb_dumps", **dumps, stdout=StringIO())
+
+    @pytest.mark.skipif(connection.vendor != "postgresql", reason="uses COPY")
+    def test_loads_and_merges_dumps(self, dumps):
+        Movie.objects.create(tconst="tt0000001", title="Stale")
+        out = StringIO()
+        call_command("load_imdb_dumps", **dumps, stdout=out)
+
+        assert sorted(Movie.objects.values_list("tconst", "title")) == [
+            ("tt0000001", "Moana"),
+            ("tt0000002", 'Up "Too"'),
+        ]
+        moana = Movie.objects.get(pk="tt0000001")
+        assert (moana.year, moana.end_year, moana.runtime) == (2016, None, 107)
+        assert sorted(Genre.objects.values_list("name", flat=True)) == [
+            "Adventure",
+            "Animation",
+        ]
+        # Only people credited on a loaded movie
+        assert sorted(Name.objects.values_list("nconst", flat=True)) == [
+            "nm0000001",
+            "nm0000002",
+        ]
+        assert Principal.objects.get(tconst_id="tt0000002").characters == ["Carl"]
+        assert list(
+            PrincipalCharacter.objects.order_by("name").values_list("name", flat=True)
+        ) == ["Carl", "Moana"]
+        assert list(Rating.objects.values_list("tconst_id", flat=True)) == ["tt0000001"]
+
+        # A rerun rewrites nothing and keeps the indexes
+        indexes = connection.introspection.get_constraints(
+            connection.cursor(), "movies_movie"
+        )
+        out = StringIO()
+        call_command("load_imdb_dumps", **dumps, stdout=out)
+        assert "movies: 0 rows inserted or updated" in out.getvalue()
+        assert (
+            connection.introspection.get_constraints(
+                connection.cursor(), "movies_movie"
+            ).keys()
+            == indexes.keys()
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="FTS5 tables")
+class TestRebuildTextIndexes:
+    """Tests for the rebuild_text_indexes management command."""
+
+    def test_vacuums_and_rebuilds(self):
+        Movie.objects.create(tconst="tt0000001", title="Moana")
+        with connection.cursor() as cursor:
+            # As after a VACUUM that renumbered rowids: the index matches nothing
+            cursor.execute(
+                "INSERT INTO movies_movie_fts(movies_movie_fts) VALUES ('delete-all')"
+            )
+        assert filter_movies({"title": "moana"}).count() == 0
+
+        out = StringIO()
+        call_command("rebuild_text_indexes", vacuum=True, stdout=out)
+        assert "Rebuilt the text search indexes" in out.getvalue()
+        assert filter_movies({"title": "moana"}).count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+class TestWarmCache:
+    """Tests for the warm_cache management command."""
+
+    @pytest.fixture(autouse=True)
+    def catalog(self):
+        cache.clear()
+        hot_cache.clear()
+        for i in range(3):
+            Movie.objects.create(tconst=f"tt000010{i}", title=f"Moana {i}")
+
+    def test_replays_queries_into_the_cache(self, tmp_path, django_assert_num_queries):
+        queries = tmp_path / "queries.txt"
+        queries.write_text(
+            "# popular\n/api/search/?title=Moana\n/api/movies/?page_size=2\n"
+            "/api/nowhere/\n"
+        )
+        out, err = StringIO(), StringIO()
+        call_command(
+            "warm_cache", file=str(queries), host="testserver", stdout=out, stderr=err
+        )
+        assert "Warmed 2/3 requests" in out.getvalue()
+        assert "failed: /api/nowhere/" in err.getvalue()
+
+        client = APIClient()
+        with django_assert_num_queries(0):
+            search = client.get("/api/search/?title=moana")
+            movies = client.get("/api/movies/", {"page_size": 2})
+        assert search.data["count"] == 3
+        assert len(movies.data["results"]) == 2
+
+    def test_reads_most_frequent_paths_from_access_log(self, tmp_path):
+        log = tmp_path / "access.log"
+        line = '127.0.0.1 - - [01/Jan/2025:00:00:00 +0000] "GET {} HTTP/1.1" {} 512\n'
+        log.write_text(
+            line.format("/api/search/?title=Moana", 200) * 3
+            + line.format("/api/movies/", 200) * 2
+            + line.format("/api/search/?title=Nope", 404) * 5
+            + line.format("/static/app.js", 200)
+        )
+        assert read_access_log(log, top=1) == ["/api/search/?title=Moana"]
+        assert read_access_log(log, top=10) == [
+            "/api/search/?title=Moana",
+            "/api/movies/",
+        ]
@@ -0,0 +1,112 @@
+import time
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.urls import reverse
+from movies import db
+from movies.cache import LAST_WRITE_KEY, bump_generation, local_generations
+from movies.db import REPLICA, ReadReplicaRouter, read_replica
+from movies.materialized import get_cast, get_filmography
+from movies.models import Movie, Name, Principal
+from rest_framework.test import APIClient
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite pragmas")
+def test_sqlite_connections_are_tuned():
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA synchronous")
+        assert cursor.fetchone()[0] == 1  # NORMAL
+        cursor.execute("PRAGMA cache_size")
+        assert cursor.fetchone()[0] == -64 * 1024
+
+
+class TestReadReplicaRouter:
+    """Reads inside read_replica() go to the replica, writes never do."""
+
+    @pytest.fixture
+    def replica(self, monkeypatch):
+        monkeypatch.setattr(db, "has_replica", lambda: True)
+        # No write of an earlier test keeps the reads on the primary
+        cache.delete(LAST_WRITE_KEY)
+        local_generations.clear()
+
+    @pytest.mark.usefixtures("replica")
+    def test_routes_reads_only_inside_read_replica(self):
+        router = ReadReplicaRouter()
+        assert router.db_for_read(Movie) is None
+        with read_replica():
+            assert router.db_for_read(Movie) == REPLICA
+            assert router.db_for_write(Movie) == DEFAULT_DB_ALIAS
+        assert router.db_for_read(Movie) is None
+
+    @pytest.mark.usefixtures("replica")
+    def test_reads_stay_on_the_primary_after_a_write(self, monkeypatch):
+        router = ReadReplicaRouter()
+        bump_generation(Movie)
+        with read_replica():
+            assert router.db_for_read(Movie) is None
+
+            now = time.time()
+            monkeypatch.setattr(time, "time", lambda: now + settings.REPLICA_MAX_LAG)
+            assert router.db_for_read(Movie) == REPLICA
+
+    @pytest.mark.django_db
+    @pytest.mark.usefixtures("replica")
+    def test_materialized_rebuilds_read_the_primary(self, monkeypatch):
+        movie = Movie.objects.create(tconst="tt0000001", title="Moana")
+        person = Name.objects.create(nconst="nm0000001", name="Auli'i Cravalho")
+        Principal.objects.create(tconst=movie, nconst=person, ordering=1)
+        # Long enough ago for the replica to have applied them
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + settings.REPLICA_MAX_LAG)
+        routed = []
+        real = ReadReplicaRouter.db_for_read
+
+        def spy(self, model, **hints):
+            # Reads the default: the test database has no replica alias
+            routed.append(real(self, model, **hints))
+
+        monkeypatch.setattr(ReadReplicaRouter, "db_for_read", spy)
+        with read_replica():
+            cast = get_cast("tt0000001")
+            filmography = get_filmography("nm0000001")
+        assert cast.members[0]["nconst"] == "nm0000001"
+        assert filmography.titles[0]["tconst"] == "tt0000001"
+        # Only the lookups that missed were routed to the replica
+        assert routed.count(REPLICA) == 2
+
+    def test_falls_back_without_a_replica(self):
+        with read_replica():
+            assert ReadReplicaRouter().db_for_read(Movie) is None
+
+    def test_replica_is_never_migrated(self):
+        router = ReadReplicaRouter()
+        assert router.allow_migrate(REPLICA, "movies") is False
+        assert router.allow_migrate(DEFAULT_DB_ALIAS, "movies") is True
+
+    @pytest.mark.django_db
+    def test_get_requests_read_from_the_replica(self, monkeypatch):
+        seen = []
+        real = ReadReplicaRouter.db_for_read
+
+        def spy(self, model, **hints):
+            seen.append(db._use_replica.get())
+            return real(self, model, **hints)
+
+        monkeypatch.setattr(ReadReplicaRouter, "db_for_read", spy)
+        Movie.objects.create(tconst="tt0000001", title="Moana")
+        seen.clear()
+
+        client = APIClient()
+        assert (
+            client.get(reverse("movie-detail", args=["tt0000001"])).status_code == 200
+        )
+        assert seen and all(seen)
+        seen.clear()
+        client.patch(
+            reverse("movie-detail", args=["tt0000001"]), {"title": "Up"}, format="json"
+        )
+        assert seen and not any(seen)
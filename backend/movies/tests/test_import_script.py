@@ -0,0 +1,188 @@
+import importlib
+import sqlite3
+import sys
+from io import StringIO
+from itertools import pairwise
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+from movies.models import Movie, Name, Principal
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+# import.py is a script; "import" cannot be imported with a statement
+imdb_import = importlib.import_module("import")
+
+HEADER = b"tconst\tcategory\tcharacters"
+LINES = [
+    b"tt0000001\tactor\t\\N",
+    b"tt0000002\tactor\tWoody",
+    b"tt0000001\tdirector\t\\N",
+    b"tt0000003\tactress\tMoana",
+    b"tt0000003\tactor\tMaui",
+    b"tt0000004\tactor\tBuzz",
+    b"tt0000003\tactor\tTamatoa",
+]
+VALUES = {"tt0000001", "tt0000003"}
+REQUIRED = {"category": "actor"}
+
+FILES = {
+    "lf": HEADER + b"\n" + b"\n".join(LINES) + b"\n",
+    "crlf": HEADER + b"\r\n" + b"\r\n".join(LINES) + b"\r\n",
+    "no final newline": HEADER + b"\n" + b"\n".join(LINES),
+    "crlf, no final newline": HEADER + b"\r\n" + b"\r\n".join(LINES),
+    "header only": HEADER + b"\n",
+    "header only, no newline": HEADER,
+}
+
+
+def naive_filter(data):
+    """The rows filter_range keeps, from the whole file at once."""
+    header, *lines = data.splitlines()
+    columns = header.decode().split("\t")
+    rows = []
+    for line in lines:
+        fields = line.decode().split("\t")
+        record = dict(zip(columns, fields))
+        if record["tconst"] in VALUES and all(
+            record[column] == value for column, value in REQUIRED.items()
+        ):
+            rows.append(tuple(None if field == "\\N" else field for field in fields))
+    return columns, rows, len(lines)
+
+
+@pytest.fixture
+def subset():
+    """An imdb_subset.db as import.py writes it, with a few malformed values."""
+    conn = sqlite3.connect(":memory:")
+    conn.executescript("""
+        CREATE TABLE movies (
+            tconst TEXT, titleType TEXT, primaryTitle TEXT, originalTitle TEXT,
+            isAdult TEXT, startYear TEXT, endYear TEXT, runtimeMinutes TEXT,
+            genres TEXT
+        );
+        CREATE TABLE names (
+            nconst TEXT, primaryName TEXT, birthYear TEXT, deathYear TEXT,
+            primaryProfession TEXT, knownForTitles TEXT
+        );
+        CREATE TABLE principals (
+            tconst TEXT, ordering TEXT, nconst TEXT, category TEXT, job TEXT,
+            characters TEXT
+        );
+        INSERT INTO movies VALUES
+            ('tt0000001', 'movie', 'Moana', 'Moana', '0', '2016', NULL, '107',
+             'Adventure,Animation'),
+            ('tt0000002', 'movie', 'Up', 'Up', 'no', '2009', '\\N', '96 min',
+             NULL),
+            ('tt0000003', 'movie', 'Coco', 'Coco', '1', '20170000000', '', '105',
+             'Animation');
+        INSERT INTO names VALUES
+            ('nm0000001', 'Auli''i Cravalho', '2000', NULL, 'actress', 'tt0000001'),
+            ('nm0000002', 'Ed Asner', 'c. 1929', '2021', 'actor', 'tt0000002');
+        INSERT INTO principals VALUES
+            ('tt0000001', '1', 'nm0000001', 'actress', NULL, '["Moana"]'),
+            ('tt0000002', '1', 'nm0000002', 'actor', '\\N', '["Carl"]');
+    """)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(params=FILES, ids=str)
+def tsv(request, tmp_path):
+    path = tmp_path / "title.principals.tsv"
+    path.write_bytes(FILES[request.param])
+    return path
+
+
+class TestByteRanges:
+    """Every line belongs to exactly one byte range, however the file is split."""
+
+    def test_ranges_cover_the_file(self, tsv):
+        size = tsv.stat().st_size
+        for parts in range(1, size + 2):
+            ranges = imdb_import.byte_ranges(tsv, parts)
+            assert ranges[0][0] == 0
+            assert ranges[-1][1] == size
+            assert all(a[1] == b[0] for a, b in pairwise(ranges))
+
+    def test_ranges_keep_what_a_naive_filter_keeps(self, tsv):
+        columns, expected, lines = naive_filter(tsv.read_bytes())
+        imdb_import.init_worker(VALUES)
+        # Up to one range per byte, so every offset is a boundary once
+        for parts in range(1, tsv.stat().st_size + 2):
+            rows, keys, rows_read = [], set(), 0
+            for start, end in imdb_import.byte_ranges(tsv, parts):
+                found = imdb_import.filter_range(
+                    (tsv, start, end, "tconst", "characters", REQUIRED)
+                )
+                assert found[0] == columns
+                rows += found[1]
+                keys |= found[2]
+                rows_read += found[3]
+            assert rows == expected, parts
+            assert keys == {row[2] for row in expected if row[2] is not None}
+            assert rows_read == lines
+
+    def test_parallel_filter_writes_the_rows_in_file_order(self, tsv):
+        columns, expected, _ = naive_filter(tsv.read_bytes())
+        conn = sqlite3.connect(":memory:")
+        imdb_import.parallel_filter(
+            tsv,
+            "principals",
+            "principals",
+            conn,
+            2,
+            "tconst",
+            VALUES,
+            key_column="tconst",
+            required=REQUIRED,
+        )
+        cursor = conn.execute("SELECT * FROM principals ORDER BY rowid")
+        assert [d[0] for d in cursor.description] == columns
+        assert cursor.fetchall() == expected
+
+
+class TestExportParquet:
+    """import.py --parquet writes typed columns, nulling values that don't parse."""
+
+    def test_unparseable_values_become_null(self, subset, tmp_path):
+        pq = pytest.importorskip("pyarrow.parquet")
+        imdb_import.export_parquet(subset, tmp_path, {"title_basics": "abc"}, 2)
+
+        movies = pq.read_table(tmp_path / "movies.parquet").to_pydict()
+        assert movies["isAdult"] == [False, None, True]
+        assert movies["startYear"] == [2016, 2009, None]
+        assert movies["endYear"] == [None, None, None]
+        assert movies["runtimeMinutes"] == [107, None, 105]
+        assert movies["genres"] == ["Adventure,Animation", None, "Animation"]
+        names = pq.read_table(tmp_path / "names.parquet").to_pydict()
+        assert names["birthYear"] == [2000, None]
+        assert names["deathYear"] == [None, 2021]
+        assert (tmp_path / "import_state.json").exists()
+
+    @pytest.mark.django_db
+    def test_round_trips_into_migrate_imdb_data(self, subset, tmp_path):
+        pytest.importorskip("pyarrow")
+        imdb_import.export_parquet(subset, tmp_path, {"title_basics": "abc"}, 2)
+        call_command("migrate_imdb_data", parquet=str(tmp_path), stdout=StringIO())
+
+        movies = Movie.objects.order_by("tconst").values_list(
+            "title", "is_adult", "year", "end_year", "runtime"
+        )
+        assert list(movies) == [
+            ("Moana", False, 2016, None, 107),
+            ("Up", False, 2009, None, None),
+            ("Coco", True, None, None, 105),
+        ]
+        names = Name.objects.order_by("nconst").values_list("birth_year", "death_year")
+        assert list(names) == [(2000, None), (None, 2021)]
+        assert Principal.objects.get(tconst_id="tt0000002").ordering == 1
+
+        # Re-exporting the same subset changes nothing
+        imdb_import.export_parquet(subset, tmp_path, {"title_basics": "def"}, 2)
+        out = StringIO()
+        call_command(
+            "migrate_imdb_data", parquet=str(tmp_path), incremental=True, stdout=out
+        )
+        assert "Movies: 0 inserted, 0 updated, 3 unchanged" in out.getvalue()
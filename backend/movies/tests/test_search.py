@@ -1,5 +1,26 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
-from movies.models import Movie, Name, Principal
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations import Migration
+from movies import cache as generations_module
+from movies import single_flight
+from movies.cache import bump_generation, generation_key, local_generations
+from movies.models import Movie, Name, Principal, Rating
+from movies.search import (
+    CHARACTER_INDEX,
+    MOVIE_TITLE_INDEX,
+    NAME_INDEX,
+    reinstall_sqlite_indexes,
+    trigram_index_name,
+)
+from movies.single_flight import get_or_compute, lock_key
+from movies.tiered_cache import MISSING, LocalLRUCache, hot_cache
+from movies.utils import filter_movies, filter_names, filter_principals
 from rest_framework.test import APIClient
 
 
@@ -9,6 +30,43 @@ def api_client():
     return APIClient()
 
 
+class CountingCache:
+    """Records the methods called on the wrapped cache."""
+
+    def __init__(self, wrapped):
+        self.wrapped = wrapped
+        self.calls = []
+
+    def __getattr__(self, name):
+        self.calls.append(name)
+        return getattr(self.wrapped, name)
+
+
+def explain_with_bitmap_scans(queryset):
+    """
+    The PostgreSQL plan of `queryset` with sequential and plain index scans
+    disabled. Only a bitmap scan on an index that can answer the filter is
+    left, so the plan shows whether one exists even on tiny test tables.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SET enable_seqscan = off")
+        cursor.execute("SET enable_indexscan = off")
+        try:
+            return queryset.explain()
+        finally:
+            cursor.execute("RESET enable_seqscan")
+            cursor.execute("RESET enable_indexscan")
+
+
+def assert_uses_text_index(queryset, index):
+    """The text search in `queryset` is answered by `index`, not a scan."""
+    if connection.vendor == "sqlite":
+        assert f"{index.fts_table} MATCH" in str(queryset.query)
+    elif connection.vendor == "postgresql":
+        plan = explain_with_bitmap_scans(queryset)
+        assert trigram_index_name(index, index.fields[0]) in plan
+
+
 @pytest.mark.django_db
 class TestSearchAPI:
     """Comprehensive tests for the /api/search/ endpoint."""
@@ -104,3 +162,330 @@ class TestSearchAPI:
         # Should have 1 result
         assert len(response_page_2.data["results"]) == 1
         assert response_page_2.data["results"][0]["data"]["tconst"] == "tt0000003"
+
+    def test_search_api_query_budget(
+        self, api_client, django_assert_max_num_queries, settings
+    ):
+        """Each search branch costs a COUNT plus one page query."""
+        # Run the branches inline so every query is seen on this connection
+        settings.SEARCH_MAX_WORKERS = 1
+        cache.clear()
+        for i in range(20):
+            movie = Movie.objects.create(
+                tconst=f"tt60000{i:02d}", title_type="movie", title=f"Budget {i}"
+            )
+            Rating.objects.create(tconst=movie, average_rating=6, num_votes=i)
+            person = Name.objects.create(nconst=f"nm60000{i:02d}", name=f"Budget {i}")
+            Principal.objects.create(tconst=movie, nconst=person, category="actor")
+
+        with django_assert_max_num_queries(6):
+            response = api_client.get(
+                "/api/search/?title=Budget&name=Budget&category=actor&page_size=50"
+            )
+        assert response.status_code == 200
+        assert len(response.data["results"]) == 60
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentSearch:
+    """
+    With several branches the search runs them on worker threads, which use
+    their own connections and therefore need committed data.
+    """
+
+    def test_branches_have_their_own_pagination(self, api_client):
+        cache.clear()
+        for i in range(3):
+            Movie.objects.create(tconst=f"tt500000{i}", title=f"Coco {i}")
+        for i in range(12):
+            Name.objects.create(nconst=f"nm500000{i:02d}", name=f"Coco Fan {i}")
+
+        response = api_client.get("/api/search/?title=Coco&name=Coco&page_size=5")
+        assert response.status_code == 200
+        assert response.data["count"] == 15
+        sections = response.data["sections"]
+        assert sections["movie"]["count"] == 3
+        assert sections["movie"]["next"] is None
+        assert sections["name"]["count"] == 12
+        assert "page=2" in sections["name"]["next"]
+        assert response.data["next"] == sections["name"]["next"]
+        types = [r["type"] for r in response.data["results"]]
+        assert types == ["movie"] * 3 + ["name"] * 5
+
+        # Page 3 is past the end of the movies but still has names
+        response = api_client.get(
+            "/api/search/?title=Coco&name=Coco&page_size=5&page=3"
+        )
+        assert response.status_code == 200
+        assert response.data["sections"]["movie"]["count"] == 3
+        assert [r["type"] for r in response.data["results"]] == ["name"] * 2
+
+
+@pytest.mark.django_db
+class TestTextSearchIndex:
+    """The indexed title/name search must behave like icontains."""
+
+    def test_substring_match_uses_index(self):
+        Movie.objects.create(tconst="tt0000010", title="Moana", original_title="Vaiana")
+        Movie.objects.create(tconst="tt0000011", title="Up")
+
+        queryset = filter_movies({"title": "aian"})
+        assert_uses_text_index(queryset, MOVIE_TITLE_INDEX)
+        assert [m.tconst for m in queryset] == ["tt0000010"]
+        assert filter_movies({"title": "MOAN"}).count() == 1
+
+    @pytest.mark.skipif(connection.vendor != "postgresql", reason="pg_trgm indexes")
+    def test_postgres_search_uses_trigram_indexes(self):
+        plan = explain_with_bitmap_scans(filter_movies({"title": "moana"}))
+        assert trigram_index_name(MOVIE_TITLE_INDEX, "title") in plan
+        assert trigram_index_name(MOVIE_TITLE_INDEX, "original_title") in plan
+        plan = explain_with_bitmap_scans(filter_names({"name": "wayne"}))
+        assert trigram_index_name(NAME_INDEX, "name") in plan
+        plan = explain_with_bitmap_scans(filter_principals({"characters": "simba"}))
+        assert trigram_index_name(CHARACTER_INDEX, "name") in plan
+
+    def test_index_follows_updates_and_deletes(self):
+        Name.objects.create(nconst="nm0000010", name="Dwayne Johnson")
+        assert filter_names({"name": "wayne"}).count() == 1
+
+        Name.objects.filter(nconst="nm0000010").update(name="The Rock")
+        assert filter_names({"name": "wayne"}).count() == 0
+        assert filter_names({"name": "rock"}).count() == 1
+
+        Name.objects.filter(nconst="nm0000010").delete()
+        assert filter_names({"name": "rock"}).count() == 0
+
+    def test_character_names_are_indexed(self):
+        movie = Movie.objects.create(tconst="tt0000013", title="The Lion King")
+        for i, characters in enumerate([["Simba"], '["Young Simba", "Amélie"]', None]):
+            person = Name.objects.create(nconst=f"nm000001{i}", name=f"Actor {i}")
+            Principal.objects.create(
+                tconst=movie, nconst=person, category="actor", characters=characters
+            )
+
+        queryset = filter_principals({"characters": "simba"})
+        assert_uses_text_index(queryset, CHARACTER_INDEX)
+        assert [p.nconst_id for p in queryset] == ["nm0000010", "nm0000011"]
+        assert filter_principals({"characters": "Amélie"}).count() == 1
+        assert filter_principals({"characters": "Simba", "exact": "true"}).count() == 1
+
+        Principal.objects.filter(nconst_id="nm0000010").first().delete()
+        assert filter_principals({"characters": "simba"}).count() == 1
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.skipif(connection.vendor != "sqlite", reason="FTS5 tables")
+    def test_migrations_that_remake_a_table_reinstall_its_index(self):
+        Movie.objects.create(tconst="tt0000014", title="Cars")
+        Movie.objects.create(tconst="tt0000015", title="Coco")
+        Movie.objects.filter(tconst="tt0000014").delete()
+        # As an AlterField does: the copy renumbers Coco's rowid, drops triggers
+        with connection.schema_editor() as schema_editor:
+            schema_editor._remake_table(Movie)
+        assert filter_movies({"title": "coco"}).count() == 0
+
+        movies = apps.get_app_config("movies")
+        plan = [(Migration("0012_alter_movie", "movies"), False)]
+        reinstall_sqlite_indexes(sender=movies, using="default", plan=plan)
+        assert filter_movies({"title": "coco"}).count() == 1
+        Movie.objects.create(tconst="tt0000016", title="Cocoon")
+        assert filter_movies({"title": "coco"}).count() == 2
+
+    def test_short_terms_fall_back_to_icontains(self):
+        Movie.objects.create(tconst="tt0000012", title="Up")
+        queryset = filter_movies({"title": "up"})
+        assert "MATCH" not in str(queryset.query)
+        assert queryset.count() == 1
+
+
+@pytest.mark.django_db
+class TestSearchCache:
+    """Search cache keys are normalized and invalidated by writes."""
+
+    @pytest.fixture(autouse=True)
+    def catalog(self):
+        cache.clear()
+        Movie.objects.create(tconst="tt0000020", title="Heat", year="1995")
+        Name.objects.create(nconst="nm0000020", name="Al Pacino")
+
+    def test_equivalent_queries_share_an_entry(self, api_client):
+        first = api_client.get("/api/search/?title=Heat&year=1995&page=1")
+        assert first.status_code == 200
+
+        # Bypass signals so only a cache hit can still return the old title
+        Movie.objects.filter(tconst="tt0000020").update(title="Heat 2")
+        for query in [
+            "year=1995&title=Heat",
+            "title=HEAT&year=1995&genre=&sort=",
+            "title=heat&year=1995&order=ASC",
+        ]:
+            response = api_client.get(f"/api/search/?{query}")
+            assert response.data["results"][0]["data"]["title"] == "Heat", query
+
+    def test_nconsts_are_matched_exactly(self, api_client):
+        response = api_client.get("/api/search/?name=Pacino&nconsts=NM0000020")
+        assert response.status_code == 404
+        response = api_client.get("/api/search/?name=Pacino&nconsts=nm0000020")
+        assert response.status_code == 200
+        assert response.data["results"][0]["data"]["nconst"] == "nm0000020"
+
+    def test_writes_invalidate_only_dependent_searches(self, api_client):
+        api_client.get("/api/search/?title=Heat")
+        api_client.get("/api/search/?name=Pacino")
+
+        Movie.objects.filter(tconst="tt0000020").update(title="Heat 2")
+        Name.objects.filter(nconst="nm0000020").update(name="Alfredo Pacino")
+        Movie.objects.create(tconst="tt0000021", title="Heat Wave")
+
+        titles = [
+            row["data"]["title"]
+            for row in api_client.get("/api/search/?title=Heat").data["results"]
+        ]
+        assert sorted(titles) == ["Heat 2", "Heat Wave"]
+        # No Name was saved through the ORM, so the name search is still cached
+        names = api_client.get("/api/search/?name=Pacino").data["results"]
+        assert names[0]["data"]["name"] == "Al Pacino"
+
+    def test_rating_writes_invalidate_movie_searches(self, api_client):
+        response = api_client.get("/api/search/?title=Heat")
+        assert response.data["results"][0]["data"]["rating"] is None
+
+        Rating.objects.create(
+            tconst_id="tt0000020", average_rating="8.3", num_votes=700000
+        )
+        response = api_client.get("/api/search/?title=Heat")
+        assert response.data["results"][0]["data"]["rating"] is not None
+
+    def test_bump_generation_invalidates_after_bulk_writes(self, api_client):
+        api_client.get("/api/search/?name=Pacino")
+        Name.objects.bulk_create([Name(nconst="nm0000021", name="Pacino Jr")])
+        assert api_client.get("/api/search/?name=Pacino").data["count"] == 1
+
+        bump_generation(Name)
+        assert api_client.get("/api/search/?name=Pacino").data["count"] == 2
+
+
+@pytest.mark.django_db
+class TestHotCache:
+    """The in-process tier answers repeated searches without the shared cache."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_tiers(self):
+        cache.clear()
+        hot_cache.clear()
+        Movie.objects.create(tconst="tt0000030", title="Toy Story")
+
+    def test_lru_evicts_least_recently_used(self):
+        local = LocalLRUCache(max_entries=2, timeout=60)
+        local.set("a", 1)
+        local.set("b", 2)
+        local.get("a")
+        local.set("c", 3)
+        assert local.get("a") == 1
+        assert local.get("b") is MISSING
+        assert len(local) == 2
+
+    def test_entries_expire(self, monkeypatch):
+        local = LocalLRUCache(max_entries=2, timeout=60)
+        local.set("a", 1, timeout=5)
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 6)
+        assert local.get("a") is MISSING
+
+    def test_repeated_search_hits_local_tier(self, api_client):
+        for _ in range(3):
+            assert api_client.get("/api/search/?title=Toy").status_code == 200
+
+        stats = api_client.get("/api/cache/stats/").data
+        assert stats["local"]["hits"] == 2
+        assert stats["shared"] == {"hits": 0, "misses": 1, "hit_ratio": 0.0}
+
+    def test_hot_hits_skip_the_shared_cache(self, api_client, monkeypatch):
+        api_client.get("/api/search/?title=Toy")
+        shared = CountingCache(cache)
+        monkeypatch.setattr(generations_module, "cache", shared)
+        monkeypatch.setattr(single_flight, "cache", shared)
+        monkeypatch.setattr(hot_cache, "shared", shared)
+        assert api_client.get("/api/search/?title=Toy").data["count"] == 1
+        assert shared.calls == []
+
+    def test_generation_bump_bypasses_local_entries(self, api_client):
+        api_client.get("/api/search/?title=Toy")
+        Movie.objects.bulk_create([Movie(tconst="tt0000031", title="Toy Story 2")])
+        bump_generation(Movie)
+        assert api_client.get("/api/search/?title=Toy").data["count"] == 2
+
+    def test_other_processes_bumps_are_seen_within_the_timeout(
+        self, api_client, monkeypatch
+    ):
+        api_client.get("/api/search/?title=Toy")
+        # As if another process saved a movie: only the shared counter moves
+        Movie.objects.bulk_create([Movie(tconst="tt0000031", title="Toy Story 2")])
+        cache.incr(generation_key("movies.movie"))
+        assert api_client.get("/api/search/?title=Toy").data["count"] == 1
+
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + local_generations.timeout)
+        assert api_client.get("/api/search/?title=Toy").data["count"] == 2
+
+
+class TestSingleFlight:
+    """Concurrent misses for one key compute the value once."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_tiers(self):
+        cache.clear()
+        hot_cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"count": 1}
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            futures = [
+                pool.submit(get_or_compute, "search:hot", compute, 60, beta=0)
+                for _ in range(5)
+            ]
+            results = [future.result() for future in futures]
+        assert len(calls) == 1
+        assert results == [{"count": 1}] * 5
+
+    def test_stale_value_is_served_while_refreshing(self):
+        get_or_compute("search:stale", lambda: "old", 60, beta=0)
+        entry = cache.get("search:stale")
+        entry["expires"] = time.time() - 1
+        cache.set("search:stale", entry)
+        hot_cache.clear()
+
+        # Another worker holds the refresh lock
+        cache.add(lock_key("search:stale"), 1)
+        assert get_or_compute("search:stale", lambda: "new", 60, beta=0) == "old"
+
+        cache.delete(lock_key("search:stale"))
+        assert get_or_compute("search:stale", lambda: "new", 60, beta=0) == "new"
+
+    def test_overrunning_fill_keeps_the_next_holders_lock(self):
+        def compute():
+            # The lock expired mid-fill and another worker took it
+            cache.set(lock_key("search:slow"), "another token")
+            return "value"
+
+        assert get_or_compute("search:slow", compute, 60, beta=0) == "value"
+        assert cache.get(lock_key("search:slow")) == "another token"
+
+        get_or_compute("search:quick", lambda: "value", 60, beta=0)
+        assert cache.get(lock_key("search:quick")) is None
+
+    def test_early_refresh(self, monkeypatch):
+        monkeypatch.setattr(random, "random", lambda: 0.5)
+        get_or_compute("search:early", lambda: "old", 60, beta=0)
+        entry = cache.get("search:early")
+        entry["delta"] = 1000.0  # an expensive value close to expiry
+        cache.set("search:early", entry)
+        hot_cache.clear()
+
+        assert get_or_compute("search:early", lambda: "new", 60, beta=0) == "old"
+        assert get_or_compute("search:early", lambda: "new", 60, beta=1) == "new"
@@ -1,6 +1,25 @@
+from datetime import UTC, datetime
+from decimal import Decimal
+
 import pytest
+from django.core.cache import cache
 from django.urls import reverse
-from movies.models import Movie, Name, Principal
+from movies.cache import (
+    bump_generation,
+    dependencies,
+    get_generations,
+    object_cache_key,
+)
+from movies.models import Filmography, Movie, MovieCast, Name, Principal, Rating
+from movies.renderers import ORJSONRenderer
+from movies.serializers import (
+    MovieSerializer,
+    NameSerializer,
+    PrincipalSerializer,
+    fast_serializer,
+)
+from movies.utils import filter_movies, filter_names, filter_principals
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
 
@@ -104,7 +123,54 @@ class TestMovieViewSet:
         response = api_client.get(url, {"year": "2022", "exact": "true"})
         assert response.status_code == 200, response.data
         assert response.data["count"] == 1
-        assert response.data["results"][0]["year"] == "2022"
+        assert response.data["results"][0]["year"] == 2022
+
+    def test_filter_by_genres(self, api_client):
+        for tconst, genre in [
+            ("tt0000801", "Music,Drama"),
+            ("tt0000802", "Musical,Comedy"),
+            ("tt0000803", "Drama,Comedy"),
+        ]:
+            Movie.objects.create(tconst=tconst, title=tconst, genre=genre)
+        url = reverse("movie-list")
+
+        def tconsts(params):
+            return [m["tconst"] for m in api_client.get(url, params).data["results"]]
+
+        assert tconsts({"genre": "music"}) == ["tt0000801"]
+        assert tconsts({"genre": "Music,Comedy"}) == [
+            "tt0000801",
+            "tt0000802",
+            "tt0000803",
+        ]
+        assert tconsts({"genre": "Drama,Comedy", "genre_match": "all"}) == ["tt0000803"]
+        assert tconsts({"genre": "Drama,Western", "genre_match": "all"}) == []
+
+    def test_genre_rows_follow_saves(self):
+        movie = Movie.objects.create(tconst="tt0000804", title="x", genre="Drama")
+        movie.genre = "Comedy,Horror"
+        movie.save()
+        assert sorted(movie.genres.values_list("name", flat=True)) == [
+            "Comedy",
+            "Horror",
+        ]
+
+    def test_filter_by_year_range_and_sort_numerically(self, api_client):
+        for tconst, year in [
+            ("tt0000901", 999),
+            ("tt0000902", 1995),
+            ("tt0000903", 2020),
+        ]:
+            Movie.objects.create(tconst=tconst, title=f"Year {year}", year=year)
+        url = reverse("movie-list")
+
+        response = api_client.get(url, {"min_year": "1000", "max_year": "2020"})
+        assert [m["year"] for m in response.data["results"]] == [1995, 2020]
+
+        response = api_client.get(url, {"sort": "year", "order": "desc"})
+        assert [m["year"] for m in response.data["results"]] == [2020, 1995, 999]
+
+        assert api_client.get(url, {"year": "19x5"}).data["count"] == 0
 
     @pytest.mark.usefixtures("setup_movies")
     def test_retrieve_movie(self, api_client):
@@ -334,3 +400,515 @@ class TestPrincipalViewSet:
         data = {"category": "director"}
         response = api_client.patch(url, data, format="json")
         assert response.status_code == 404, response.data
+
+
+@pytest.fixture
+def catalog():
+    """
+    Enough movies, ratings, names and principals to fill a 50-item page,
+    so per-row queries would show up in the query count.
+    """
+    cache.clear()
+    for i in range(30):
+        movie = Movie.objects.create(
+            tconst=f"tt70000{i:02d}", title_type="movie", title=f"Budget Movie {i}"
+        )
+        Rating.objects.create(tconst=movie, average_rating=7, num_votes=100 + i)
+        person = Name.objects.create(nconst=f"nm70000{i:02d}", name=f"Person {i}")
+        Principal.objects.create(
+            tconst=movie, nconst=person, category="actor", ordering=1
+        )
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("catalog")
+class TestQueryBudgets:
+    """
+    Each list endpoint should run a COUNT plus one page query, no matter
+    how many rows the page holds.
+    """
+
+    @pytest.mark.parametrize("url_name", ["movie-list", "principal-list", "name-list"])
+    def test_list_endpoints(self, api_client, django_assert_max_num_queries, url_name):
+        with django_assert_max_num_queries(2):
+            response = api_client.get(reverse(url_name), {"page_size": 50})
+        assert response.status_code == 200, response.data
+        assert len(response.data["results"]) == 30
+
+    def test_movie_list_includes_rating(self, api_client):
+        response = api_client.get(reverse("movie-list"), {"sort": "rating"})
+        assert response.data["results"][0]["rating"] == {
+            "average_rating": "7.0",
+            "num_votes": 100,
+        }
+
+    def test_movie_detail(self, api_client, django_assert_max_num_queries):
+        with django_assert_max_num_queries(1):
+            response = api_client.get(reverse("movie-detail", args=["tt7000001"]))
+        assert response.status_code == 200, response.data
+        assert response.data["rating"]["num_votes"] == 101
+
+
+@pytest.mark.django_db
+class TestAsyncViews:
+    """The /api/async/ endpoints mirror the DRF list/retrieve/search payloads."""
+
+    @pytest.fixture(autouse=True)
+    def _clear_cache(self):
+        cache.clear()
+
+    @pytest.mark.usefixtures("setup_movies")
+    def test_async_movie_list_matches_sync(self, api_client):
+        params = {"sort": "year", "order": "desc", "page_size": 1}
+        sync = api_client.get(reverse("movie-list"), params)
+        response = api_client.get(reverse("async-movie-list"), params)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == sync.data["count"] == 2
+        assert data["results"][0]["tconst"] == "tt2222222"
+        assert "page=2" in data["next"]
+        assert data["previous"] is None
+
+    @pytest.mark.usefixtures("setup_movies")
+    def test_async_movie_detail(self, api_client):
+        response = api_client.get(reverse("async-movie-detail", args=["tt1111111"]))
+        assert response.status_code == 200
+        assert response.json()["title"] == "Test Movie 1"
+
+        response = api_client.get(reverse("async-movie-detail", args=["tt0000000"]))
+        assert response.status_code == 404
+
+    @pytest.mark.usefixtures("setup_movies")
+    def test_async_reads_follow_writes(self, api_client):
+        detail_url = reverse("async-movie-detail", args=["tt1111111"])
+        list_url = reverse("async-movie-list")
+        assert api_client.get(detail_url).json()["title"] == "Test Movie 1"
+        assert api_client.get(list_url).json()["count"] == 2
+
+        response = api_client.patch(
+            reverse("movie-detail", args=["tt1111111"]),
+            {"title": "Renamed"},
+            format="json",
+        )
+        assert response.status_code == 200, response.data
+        assert api_client.get(detail_url).json()["title"] == "Renamed"
+        titles = [m["title"] for m in api_client.get(list_url).json()["results"]]
+        assert "Renamed" in titles
+
+        # Imports only bump generations
+        Movie.objects.bulk_create(
+            [Movie(tconst="tt3333333", title="Imported")],
+            update_conflicts=True,
+            unique_fields=["tconst"],
+            update_fields=["title"],
+        )
+        bump_generation(Movie)
+        assert api_client.get(list_url).json()["count"] == 3
+
+    def test_async_invalid_page(self, api_client):
+        response = api_client.get(reverse("async-name-list"), {"page": 5})
+        assert response.status_code == 404
+
+    def test_async_principals_by_tconst(self, api_client):
+        movie = Movie.objects.create(tconst="tt4000001", title="Coco")
+        person = Name.objects.create(nconst="nm4000001", name="Anthony Gonzalez")
+        Principal.objects.create(tconst=movie, nconst=person, category="actor")
+
+        response = api_client.get(
+            reverse("async-principal-list"), {"tconst": "tt4000001"}
+        )
+        assert response.status_code == 200
+        assert response.json()["results"][0]["nconst"] == "nm4000001"
+
+    def test_async_search(self, api_client):
+        Movie.objects.create(tconst="tt4000002", title="Coco")
+        Name.objects.create(nconst="nm4000002", name="Coco Cherry")
+
+        response = api_client.get(
+            reverse("async-search"), {"title": "Coco", "name": "Coco"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 2
+        assert data["sections"]["movie"]["count"] == 1
+        assert [r["type"] for r in data["results"]] == ["movie", "name"]
+
+        response = api_client.get(reverse("async-search"), {"title": "Nothing"})
+        assert response.status_code == 404
+
+    def test_sync_and_async_searches_link_to_themselves(self, api_client):
+        Movie.objects.bulk_create(
+            [Movie(tconst=f"tt400001{i}", title=f"Coco {i}") for i in range(3)]
+        )
+        params = {"title": "Coco", "page_size": 1}
+        for name in ("search", "async-search", "search"):
+            response = api_client.get(reverse(name), params)
+            assert response.status_code == 200
+            assert reverse(name) in response.json()["next"]
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+    """Opt-in cursor pagination must visit every row exactly once, in order."""
+
+    @pytest.fixture(autouse=True)
+    def movies(self):
+        cache.clear()
+        for i in range(23):
+            movie = Movie.objects.create(
+                tconst=f"tt30000{i:02d}",
+                title=f"Keyset {i % 5}",
+                # Duplicate and missing years exercise the tiebreaker and NULLs
+                year=None if i % 7 == 0 else str(2000 + i % 4),
+            )
+            if i % 3:
+                Rating.objects.create(tconst=movie, average_rating=i % 6, num_votes=i)
+
+    def walk(self, api_client, params):
+        response = api_client.get(
+            reverse("movie-list"), {**params, "pagination": "cursor", "page_size": 4}
+        )
+        pages = [response.data]
+        while pages[-1]["next"]:
+            pages.append(api_client.get(pages[-1]["next"]).data)
+        return pages
+
+    @pytest.mark.parametrize(
+        "sort,order",
+        [("title", "asc"), ("year", "desc"), ("year", "asc"), ("rating", "desc")],
+    )
+    def test_walks_all_rows_in_order(self, api_client, sort, order):
+        expected = [
+            m["tconst"]
+            for m in api_client.get(
+                reverse("movie-list"), {"sort": sort, "order": order, "page_size": 50}
+            ).data["results"]
+        ]
+        pages = self.walk(api_client, {"sort": sort, "order": order})
+        seen = [m["tconst"] for page in pages for m in page["results"]]
+        assert sorted(seen) == sorted(expected)
+        assert len(seen) == len(set(seen)) == 23
+        assert "count" not in pages[0]
+        assert pages[0]["previous"] is None
+
+        # Walking back from the last page revisits the pages in reverse
+        back = [pages[-1]]
+        while back[-1]["previous"]:
+            back.append(api_client.get(back[-1]["previous"]).data)
+        assert [p["results"] for p in reversed(back)] == [p["results"] for p in pages]
+
+    def test_invalid_cursor(self, api_client):
+        response = api_client.get(reverse("movie-list"), {"cursor": "nope"})
+        assert response.status_code == 404
+
+    def test_names_by_birth_year(self, api_client):
+        for i in range(7):
+            Name.objects.create(
+                nconst=f"nm30000{i:02d}", name=f"N{i}", birth_year=str(1950 + i % 2)
+            )
+        response = api_client.get(
+            reverse("name-list"),
+            {"sort": "birth_year", "pagination": "cursor", "page_size": 5},
+        )
+        second = api_client.get(response.data["next"]).data
+        names = [n["nconst"] for n in response.data["results"] + second["results"]]
+        assert len(set(names)) == 7
+        assert second["next"] is None
+
+
+@pytest.mark.django_db
+class TestCountModes:
+    """`?count=` lets clients trade the exact total for cheaper pages."""
+
+    @pytest.fixture(autouse=True)
+    def movies(self):
+        cache.clear()
+        for i in range(15):
+            Movie.objects.create(tconst=f"tt20000{i:02d}", title=f"Count {i}")
+
+    def test_none_skips_the_count(self, api_client, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = api_client.get(reverse("movie-list"), {"count": "none"})
+        assert response.data["count"] is None
+        assert len(response.data["results"]) == 10
+        assert "page=2" in response.data["next"]
+
+        response = api_client.get(response.data["next"])
+        assert len(response.data["results"]) == 5
+        assert response.data["next"] is None
+        assert response.data["previous"] is not None
+
+    def test_estimate_is_capped(self, api_client, monkeypatch):
+        from movies.pagination import StandardResultsSetPagination
+
+        monkeypatch.setattr(StandardResultsSetPagination, "estimate_cap", 12)
+        response = api_client.get(reverse("movie-list"), {"count": "estimate"})
+        assert response.data["count"] == "12+"
+        assert response.data["next"] is not None
+
+        response = api_client.get(
+            reverse("movie-list"), {"count": "estimate", "title": "Count 1"}
+        )
+        assert response.data["count"] == 6  # "Count 1", "Count 10".."Count 14"
+
+    def test_cached_count_is_keyed_by_filters(self, api_client):
+        url = reverse("movie-list")
+        first = api_client.get(url, {"count": "cached", "title": "Count", "page": 1})
+        assert first.data["count"] == 15
+
+        # bulk_create sends no signals, so the cached total is not invalidated
+        Movie.objects.bulk_create([Movie(tconst="tt2000099", title="Count 99")])
+        # Same filters in a different order and page reuse the cached total
+        again = api_client.get(url, {"page": 2, "title": "Count", "count": "cached"})
+        assert again.data["count"] == 15
+        assert api_client.get(url, {"title": "Count"}).data["count"] == 16
+
+    def test_search_branches_past_their_last_page_keep_the_mode(
+        self, api_client, settings
+    ):
+        # Branches on pool threads would not see this test's transaction
+        settings.SEARCH_MAX_WORKERS = 1
+        Name.objects.create(nconst="nm2000000", name="Count Basie")
+        params = {"title": "Count", "name": "Count", "page": 2, "page_size": 5}
+        for url in (reverse("search"), reverse("async-search")):
+            sections = api_client.get(url, {**params, "count": "none"}).json()[
+                "sections"
+            ]
+            assert sections["movie"]["count"] is None
+            assert sections["name"] == {"count": None, "next": None, "previous": None}
+            sections = api_client.get(url, params).json()["sections"]
+            assert sections["name"]["count"] == 1
+
+    def test_async_lists_paginate_like_the_viewsets(self, api_client):
+        for params in (
+            {"count": "none"},
+            {"count": "estimate", "page_size": 5},
+            {"pagination": "cursor", "page_size": 5},
+        ):
+            pages = [
+                api_client.get(reverse(name), params).json()
+                for name in ("movie-list", "async-movie-list")
+            ]
+            assert pages[0].keys() == pages[1].keys(), params
+            assert pages[0].get("count") == pages[1].get("count")
+            assert pages[0]["results"] == pages[1]["results"]
+            following = [api_client.get(page["next"]).json() for page in pages]
+            assert following[0]["results"] == following[1]["results"]
+
+        for name in ("movie-list", "async-movie-list"):
+            response = api_client.get(reverse(name), {"count": "none", "page": 9})
+            assert response.status_code == 404
+
+    def test_cached_count_is_invalidated_by_writes(self, api_client):
+        url = reverse("movie-list")
+        params = {"count": "cached", "title": "Count"}
+        assert api_client.get(url, {**params, "page": 1}).data["count"] == 15
+
+        Movie.objects.create(tconst="tt2000099", title="Count 99")
+        assert api_client.get(url, {**params, "page": 2}).data["count"] == 16
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("catalog")
+class TestReadThroughCache:
+    """List and retrieve responses come from the object cache until a write."""
+
+    def test_retrieve_is_cached_per_object(self, api_client, django_assert_num_queries):
+        url = reverse("movie-detail", args=["tt7000001"])
+        first = api_client.get(url)
+        with django_assert_num_queries(0):
+            again = api_client.get(url)
+        assert again.data == first.data
+
+    def test_list_pages_are_assembled_from_objects(
+        self, api_client, django_assert_num_queries
+    ):
+        url = reverse("movie-list")
+        first = api_client.get(url, {"page": 2, "page_size": 5})
+        # Detail entries were filled by the list, and param order is irrelevant
+        with django_assert_num_queries(0):
+            tconst = first.data["results"][0]["tconst"]
+            api_client.get(reverse("movie-detail", args=[tconst]))
+            again = api_client.get(url, {"page_size": 5, "page": 2})
+        assert again.data == first.data
+
+    def test_evicted_objects_are_reloaded(self, api_client, django_assert_num_queries):
+        url = reverse("name-list")
+        first = api_client.get(url)
+        generations = get_generations(dependencies(["movies.name"]))
+        nconst = first.data["results"][3]["nconst"]
+        cache.delete(object_cache_key("movies.name", nconst, generations))
+        with django_assert_num_queries(1):
+            again = api_client.get(url)
+        assert again.data == first.data
+
+    def test_writes_evict_what_they_touch(self, api_client):
+        list_url = reverse("movie-list")
+        detail_url = reverse("movie-detail", args=["tt7000000"])
+        api_client.get(list_url, {"page_size": 50})
+        api_client.get(detail_url)
+
+        response = api_client.patch(detail_url, {"title": "Renamed"}, format="json")
+        assert response.status_code == 200, response.data
+        assert api_client.get(detail_url).data["title"] == "Renamed"
+        titles = [
+            m["title"]
+            for m in api_client.get(list_url, {"page_size": 50}).data["results"]
+        ]
+        assert "Renamed" in titles
+
+        api_client.delete(reverse("movie-detail", args=["tt7000001"]))
+        assert api_client.get(list_url, {"page_size": 50}).data["count"] == 29
+
+    def test_rating_writes_evict_their_movie(self, api_client):
+        url = reverse("movie-detail", args=["tt7000002"])
+        assert api_client.get(url).data["rating"]["num_votes"] == 102
+
+        rating = Rating.objects.get(tconst_id="tt7000002")
+        rating.num_votes = 5000
+        rating.save()
+        assert api_client.get(url).data["rating"]["num_votes"] == 5000
+
+    def test_imports_retire_cached_objects(self, api_client):
+        url = reverse("movie-detail", args=["tt7000002"])
+        assert api_client.get(url).data["rating"]["num_votes"] == 102
+
+        # What import_ratings does: a bulk upsert (no signals), then a bump
+        Rating.objects.bulk_create(
+            [Rating(tconst_id="tt7000002", average_rating=8, num_votes=9000)],
+            update_conflicts=True,
+            unique_fields=["tconst"],
+            update_fields=["average_rating", "num_votes"],
+        )
+        bump_generation(Rating)
+        assert api_client.get(url).data["rating"]["num_votes"] == 9000
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("catalog")
+class TestMaterializedReads:
+    """Casts and filmographies are served from their materialized rows."""
+
+    @pytest.fixture(autouse=True)
+    def second_role(self, catalog):
+        Movie.objects.filter(tconst="tt7000003").update(year=1999)
+        Movie.objects.filter(tconst="tt7000004").update(year=2005)
+        Principal.objects.create(
+            tconst_id="tt7000004",
+            nconst_id="nm7000003",
+            category="director",
+            ordering=2,
+            characters='["Herself"]',
+        )
+
+    def test_cast_is_built_once_and_then_looked_up(
+        self, api_client, django_assert_num_queries
+    ):
+        url = reverse("movie-cast", args=["tt7000004"])
+        response = api_client.get(url)
+        assert response.status_code == 200, response.data
+        assert [m["nconst"] for m in response.data["cast"]] == [
+            "nm7000004",
+            "nm7000003",
+        ]
+        assert response.data["cast"][1]["name"] == "Person 3"
+        assert response.data["cast"][1]["characters"] == ["Herself"]
+        assert MovieCast.objects.filter(pk="tt7000004").exists()
+
+        with django_assert_num_queries(1):
+            assert api_client.get(url).data == response.data
+
+    def test_filmography_is_newest_first_with_ratings(self, api_client):
+        Name.objects.filter(nconst="nm7000003").update(
+            known_for_titles="tt7000004,tt7000003"
+        )
+        response = api_client.get(reverse("name-filmography", args=["nm7000003"]))
+        assert response.status_code == 200, response.data
+        assert response.data["known_for"] == ["tt7000004", "tt7000003"]
+        titles = response.data["filmography"]
+        assert [(t["tconst"], t["year"]) for t in titles] == [
+            ("tt7000004", 2005),
+            ("tt7000003", 1999),
+        ]
+        assert titles[1]["average_rating"] == "7.0"
+        assert titles[1]["num_votes"] == 103
+
+    def test_unknown_keys_are_404(self, api_client):
+        assert api_client.get(reverse("movie-cast", args=["tt0"])).status_code == 404
+        response = api_client.get(reverse("name-filmography", args=["nm0"]))
+        assert response.status_code == 404
+
+    def test_writes_evict_affected_rows(self, api_client):
+        cast_url = reverse("movie-cast", args=["tt7000004"])
+        filmography_url = reverse("name-filmography", args=["nm7000003"])
+        api_client.get(cast_url)
+        api_client.get(filmography_url)
+
+        person = Name.objects.get(pk="nm7000003")
+        person.name = "Renamed Person"
+        person.save()
+        assert not MovieCast.objects.filter(pk="tt7000004").exists()
+        assert api_client.get(cast_url).data["cast"][1]["name"] == "Renamed Person"
+
+        rating = Rating.objects.get(tconst_id="tt7000003")
+        rating.num_votes = 5000
+        rating.save()
+        assert not Filmography.objects.filter(pk="nm7000003").exists()
+        titles = api_client.get(filmography_url).data["filmography"]
+        assert titles[1]["num_votes"] == 5000
+
+        Principal.objects.filter(tconst_id="tt7000004", ordering=2).get().delete()
+        assert [
+            t["tconst"] for t in api_client.get(filmography_url).data["filmography"]
+        ] == ["tt7000003"]
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("catalog")
+class TestFastSerialization:
+    """The values()-based serializers and orjson renderer match DRF byte for byte."""
+
+    @pytest.fixture(autouse=True)
+    def edge_cases(self):
+        Movie.objects.create(
+            tconst="tt7100000", title="Amélie\u2028", year=None, is_adult=True
+        )
+        Principal.objects.create(
+            tconst_id="tt7100000",
+            nconst_id="nm7000000",
+            category="actress",
+            characters=["Amélie Poulain", "“Le fabuleux”"],
+        )
+
+    @pytest.mark.parametrize(
+        "serializer_class, queryset",
+        [
+            (MovieSerializer, lambda: filter_movies({})),
+            (PrincipalSerializer, lambda: filter_principals({})),
+            (NameSerializer, lambda: filter_names({})),
+        ],
+    )
+    def test_matches_model_serializer(self, serializer_class, queryset):
+        expected = serializer_class(queryset(), many=True).data
+        fast = fast_serializer(serializer_class)
+        rows = fast.serialize(fast.values(queryset()))
+
+        renderer = JSONRenderer()
+        assert renderer.render(rows) == renderer.render(expected)
+        assert ORJSONRenderer().render(rows) == renderer.render(expected)
+
+    def test_renderer_matches_json_renderer(self):
+        data = {
+            "count": 2,
+            "rating": Decimal("7.5"),
+            "when": datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=UTC),
+            "text": "line\u2028separator\u2029 ✓",
+            1: None,
+        }
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_list_endpoint_output_is_unchanged(self, api_client):
+        response = api_client.get(reverse("movie-list"), {"page_size": 50})
+        assert response.content == JSONRenderer().render(response.data)
+        tconsts = [movie["tconst"] for movie in response.data["results"]]
+        assert "tt7100000" in tconsts
@@ -0,0 +1,159 @@
+"""
+Two-tier cache for hot, versioned reads.
+
+A bounded in-process LRU/TTL tier sits in front of the shared cache
+(django_redis in production). The keys embed generation counters, which
+each process also keeps for GENERATION_CACHE_TIMEOUT (see movies.cache), so
+a repeated search within that window is answered without any Redis lookup
+or unpickling. Once the counters expire, a hit costs one get_many for them.
+
+Only keys that are immutable once written may be served from the local tier:
+keys that embed model generations ("search:", "ids:", "count:"). A write in
+another process bumps the generation in Redis, and requests build new keys
+once they read the new counter. The local tier therefore serves nothing a
+shared-cache lookup with the same counters would not. The "obj:" rows of a
+list page stay in the shared cache only, so a list hit still makes one
+get_many for them.
+
+Hit/miss counters are kept per tier and per process; see CacheStatsAPIView.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+
+MISSING = object()
+
+
+class LocalLRUCache:
+    """Thread-safe LRU with a per-entry TTL and a maximum number of entries."""
+
+    def __init__(self, max_entries: int, timeout: float):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return MISSING
+            expires, value = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, timeout: float | None = None) -> None:
+        if self.max_entries <= 0:
+            return
+        # Never outlive the shared entry, nor the local TTL
+        if timeout is None or timeout > self.timeout:
+            timeout = self.timeout
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TierStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class TwoTierCache:
+    """get/set (and their async variants) through the local tier first."""
+
+    def __init__(self, local: LocalLRUCache, shared=cache):
+        self.local = local
+        self.shared = shared
+        self.local_stats = TierStats()
+        self.shared_stats = TierStats()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, stats: TierStats, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                stats.hits += 1
+            else:
+                stats.misses += 1
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.local.get(key)
+        self._count(self.local_stats, value is not MISSING)
+        if value is not MISSING:
+            return value
+        value = self.shared.get(key, MISSING)
+        self._count(self.shared_stats, value is not MISSING)
+        if value is MISSING:
+            return default
+        self.local.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any, timeout: float | None = None) -> None:
+        self.shared.set(key, value, timeout=timeout)
+        self.local.set(key, value, timeout)
+
+    async def aget(self, key: str, default: Any = None) -> Any:
+        value = self.local.get(key)
+        self._count(self.local_stats, value is not MISSING)
+        if value is not MISSING:
+            return value
+        value = await self.shared.aget(key, MISSING)
+        self._count(self.shared_stats, value is not MISSING)
+        if value is MISSING:
+            return default
+        self.local.set(key, value)
+        return value
+
+    async def aset(self, key: str, value: Any, timeout: float | None = None) -> None:
+        await self.shared.aset(key, value, timeout=timeout)
+        self.local.set(key, value, timeout)
+
+    def clear(self) -> None:
+        """Clear the local tier and reset the counters (the shared tier is kept)."""
+        self.local.clear()
+        with self._stats_lock:
+            self.local_stats = TierStats()
+            self.shared_stats = TierStats()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "local": {
+                **self.local_stats.as_dict(),
+                "entries": len(self.local),
+                "max_entries": self.local.max_entries,
+            },
+            "shared": self.shared_stats.as_dict(),
+        }
+
+
+hot_cache = TwoTierCache(
+    LocalLRUCache(
+        max_entries=getattr(settings, "HOT_CACHE_MAX_ENTRIES", 1024),
+        timeout=getattr(settings, "HOT_CACHE_TIMEOUT", 60),
+    )
+)
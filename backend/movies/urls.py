@@ -1,14 +1,43 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import MovieViewSet, NameViewSet, PrincipalViewSet, SearchAPIView
+from .async_views import (
+    AsyncMovieView,
+    AsyncNameView,
+    AsyncPrincipalView,
+    AsyncSearchView,
+)
+from .views import (
+    CacheStatsAPIView,
+    MovieViewSet,
+    NameViewSet,
+    PrincipalViewSet,
+    SearchAPIView,
+)
 
 router = DefaultRouter()
 router.register(r"movies", MovieViewSet)
 router.register(r"principals", PrincipalViewSet)
 router.register(r"names", NameViewSet)
 
+# Read-only async variants for ASGI deployments
+async_urlpatterns = [
+    path("movies/", AsyncMovieView.as_view(), name="async-movie-list"),
+    path("movies/<str:pk>/", AsyncMovieView.as_view(), name="async-movie-detail"),
+    path("principals/", AsyncPrincipalView.as_view(), name="async-principal-list"),
+    path(
+        "principals/<int:pk>/",
+        AsyncPrincipalView.as_view(),
+        name="async-principal-detail",
+    ),
+    path("names/", AsyncNameView.as_view(), name="async-name-list"),
+    path("names/<str:pk>/", AsyncNameView.as_view(), name="async-name-detail"),
+    path("search/", AsyncSearchView.as_view(), name="async-search"),
+]
+
 urlpatterns = [
     path("", include(router.urls)),
     path("search/", SearchAPIView.as_view(), name="search"),
+    path("async/", include(async_urlpatterns)),
+    path("cache/stats/", CacheStatsAPIView.as_view(), name="cache-stats"),
 ]
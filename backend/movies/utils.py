@@ -2,6 +2,40 @@ from typing import Any
 
 from django.db.models import Q, QuerySet
 
+from .search import CHARACTER_INDEX, MOVIE_TITLE_INDEX, NAME_INDEX, search_filter
+
+# Columns each serializer reads, so list queries load exactly what they render
+MOVIE_COLUMNS = (
+    "tconst",
+    "title_type",
+    "title",
+    "original_title",
+    "is_adult",
+    "year",
+    "end_year",
+    "runtime",
+    "genre",
+    "rating__average_rating",
+    "rating__num_votes",
+)
+PRINCIPAL_COLUMNS = (
+    "id",
+    "tconst",
+    "nconst",
+    "category",
+    "job",
+    "characters",
+    "ordering",
+)
+NAME_COLUMNS = (
+    "nconst",
+    "name",
+    "birth_year",
+    "death_year",
+    "primary_professions",
+    "known_for_titles",
+)
+
 
 def parse_exact(exact_param: str) -> bool:
     """
@@ -22,17 +56,27 @@ def build_string_query(field: str, value: str, exact: bool) -> Q:
         return Q(**{f"{field}__icontains": value})
 
 
+def parse_year(value: str) -> int | None:
+    """A year query param as an int, or None if it is not a number."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
 def filter_movies(params: dict[str, Any], base_qs: QuerySet | None = None) -> QuerySet:
     """
     Apply various filters and sorting to a Movie queryset based
     on the query params.
     """
+    from .genres import GENRE_MATCHES, filter_genres
     from .models import Movie  # Local import to avoid circular imports
 
     if base_qs is None:
         base_qs = Movie.objects.all()
 
-    queryset = base_qs
+    # MovieSerializer nests the rating, so join it instead of a query per row
+    queryset = base_qs.select_related("rating").only(*MOVIE_COLUMNS)
     exact = parse_exact(params.get("exact", "false"))
 
     # Filters
@@ -40,6 +84,8 @@ def filter_movies(params: dict[str, Any], base_qs: QuerySet | None = None) -> Qu
     title = params.get("title")
     genre = params.get("genre")
     year = params.get("year")
+    min_year = params.get("min_year")
+    max_year = params.get("max_year")
 
     # Sorting params
     sort_by = params.get("sort")
@@ -58,7 +104,12 @@ def filter_movies(params: dict[str, Any], base_qs: QuerySet | None = None) -> Qu
     else:
         # default to "title"
         sort_field = "title"
-    queryset = queryset.order_by(f"{order_prefix}{sort_field}")
+    ordering = [f"{order_prefix}{sort_field}"]
+    if sort_field != "title":
+        # Ties are ordered by title (as the (year, title) index is), so pages
+        # are stable on every database
+        ordering.append(f"{order_prefix}title")
+    queryset = queryset.order_by(*ordering)
 
     # 3) Title filter (title or original_title)
     if title:
@@ -67,17 +118,26 @@ def filter_movies(params: dict[str, Any], base_qs: QuerySet | None = None) -> Qu
                 Q(title__iexact=title) | Q(original_title__iexact=title)
             )
         else:
-            queryset = queryset.filter(
-                Q(title__icontains=title) | Q(original_title__icontains=title)
-            )
+            queryset = search_filter(queryset, MOVIE_TITLE_INDEX, title)
 
-    # 4) Genre filter
+    # 4) Genre filter: comma-separated genres, any (default) or all of them
     if genre:
-        queryset = queryset.filter(build_string_query("genre", genre, exact))
-
-    # 5) Year filter
-    if year:
-        queryset = queryset.filter(year=year)
+        match = params.get("genre_match") or "any"
+        queryset = filter_genres(
+            queryset, genre, match if match in GENRE_MATCHES else "any"
+        )
+
+    # 5) Year filter and range; a year that is not a number matches nothing
+    for value, lookup in (
+        (year, "year"),
+        (min_year, "year__gte"),
+        (max_year, "year__lte"),
+    ):
+        if value:
+            parsed = parse_year(value)
+            if parsed is None:
+                return queryset.none()
+            queryset = queryset.filter(**{lookup: parsed})
 
     return queryset
 
@@ -88,12 +148,13 @@ def filter_principals(
     """
     Apply filters and sorting to a Principal queryset.
     """
-    from .models import Principal
+    from .models import Principal, PrincipalCharacter
 
     if base_qs is None:
         base_qs = Principal.objects.all()
 
-    queryset = base_qs
+    # tconst/nconst are serialized as keys, so no join is needed
+    queryset = base_qs.only(*PRINCIPAL_COLUMNS)
     exact = parse_exact(params.get("exact", "false"))
 
     category = params.get("category")
@@ -110,8 +171,13 @@ def filter_principals(
     if job:
         queryset = queryset.filter(build_string_query("job", job, exact))
     if characters:
-        # For JSONField, this is a naive partial match approach
-        queryset = queryset.filter(build_string_query("characters", characters, exact))
+        # Match individual character names through their text index
+        matches = search_filter(
+            PrincipalCharacter.objects.all(), CHARACTER_INDEX, characters
+        )
+        if exact:
+            matches = matches.filter(name__iexact=characters)
+        queryset = queryset.filter(pk__in=matches.values("principal_id"))
 
     # Sorting
     valid_principal_fields = ["id", "category", "job", "ordering"]
@@ -131,7 +197,7 @@ def filter_names(params: dict[str, Any], base_qs: QuerySet | None = None) -> Que
     if base_qs is None:
         base_qs = Name.objects.all()
 
-    queryset = base_qs
+    queryset = base_qs.only(*NAME_COLUMNS)
     exact = parse_exact(params.get("exact", "false"))
     name = params.get("name")
 
@@ -141,7 +207,10 @@ def filter_names(params: dict[str, Any], base_qs: QuerySet | None = None) -> Que
 
     # Filter by name
     if name:
-        queryset = queryset.filter(build_string_query("name", name, exact))
+        if exact:
+            queryset = queryset.filter(name__iexact=name)
+        else:
+            queryset = search_filter(queryset, NAME_INDEX, name)
 
     # Sorting
     valid_name_fields = ["nconst", "name", "birth_year", "death_year"]
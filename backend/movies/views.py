@@ -1,18 +1,41 @@
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
+from django.conf import settings
 from django.core.cache import cache
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-from rest_framework import pagination, status
-from rest_framework.decorators import api_view
-from rest_framework.exceptions import ValidationError
+from django.db import close_old_connections
+from django.db.models import QuerySet
+from rest_framework import status
+from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
+from .cache import (
+    dependencies,
+    get_generations,
+    list_cache_key,
+    object_cache_key,
+    search_cache_key,
+    search_dependencies,
+)
+from .db import ReadReplicaMixin
+from .materialized import get_cast, get_filmography
 from .models import Movie, MovieInput, Name, Principal, SearchQueryParams
-from .serializers import MovieSerializer, NameSerializer, PrincipalSerializer
+from .pagination import KeysetPagination, StandardResultsSetPagination
+from .serializers import (
+    MovieSerializer,
+    NameSerializer,
+    PrincipalSerializer,
+    fast_serializer,
+)
+from .single_flight import get_or_compute
+from .tiered_cache import hot_cache
 from .utils import (
     filter_movies,
     filter_names,
@@ -20,18 +43,148 @@ from .utils import (
 )
 
 
-class StandardResultsSetPagination(pagination.PageNumberPagination):
+@functools.cache
+def search_executor(max_workers: int) -> ThreadPoolExecutor:
+    """Process-wide bounded pool for running search branches concurrently."""
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search")
+
+
+def run_with_own_connection(fn, *args):
+    """
+    Run `fn` on a pool thread. Each thread has its own database connections,
+    which are released afterwards the same way Django does between requests.
+    """
+    close_old_connections()
+    try:
+        return fn(*args)
+    finally:
+        close_old_connections()
+
+
+class KeysetPaginationMixin:
     """
-    Pagination settings for API responses.
+    Use KeysetPagination instead of `pagination_class` when the client
+    opts in with `?pagination=cursor` (or follows a `cursor` link).
     """
 
-    page_size = 10
-    page_size_query_param = "page_size"
-    max_page_size = 50
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if KeysetPagination.requested(self.request):
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
 
-@method_decorator(cache_page(60 * 15), name="dispatch")  # 15 min cache
-class MovieViewSet(ModelViewSet):
+class FastListMixin:
+    """
+    Serialize list pages through FastSerializer (values() rows) instead of
+    one ModelSerializer per object. Keyset pages need model instances to
+    build their cursors, so they keep the regular path.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if isinstance(self.paginator, KeysetPagination):
+            return super().list(request, *args, **kwargs)
+        fast = fast_serializer(self.get_serializer_class())
+        queryset = fast.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(fast.serialize(page))
+
+
+class ReadThroughCacheMixin:
+    """
+    Read-through cache for list and retrieve.
+
+    Serialized rows are cached per object and list pages as the IDs on the
+    page plus the pagination metadata, so a row appearing on many pages is
+    stored once. Both keys embed the model generations, so single-row writes
+    (see movies.signals) and imports alike retire them and nothing stale is
+    served.
+    """
+
+    cache_timeout = 60 * 15
+
+    @property
+    def cache_label(self) -> str:
+        return self.queryset.model._meta.label_lower
+
+    @property
+    def pk_field(self) -> str:
+        return self.queryset.model._meta.pk.name
+
+    def retrieve(self, request, *args, **kwargs):
+        # Filter params can hide the object, so only plain retrieves are cached
+        if request.query_params:
+            return super().retrieve(request, *args, **kwargs)
+        generations = get_generations(dependencies([self.cache_label]))
+        key = object_cache_key(self.cache_label, kwargs[self.lookup_field], generations)
+        data = cache.get(key)
+        if data is None:
+            response = super().retrieve(request, *args, **kwargs)
+            cache.set(key, response.data, timeout=self.cache_timeout)
+            return response
+        return Response(data)
+
+    def store_page(
+        self, key: str, data: dict[str, Any], generations: dict[str, int]
+    ) -> None:
+        rows = data["results"]
+        meta = {k: v for k, v in data.items() if k != "results"}
+        ids = [row[self.pk_field] for row in rows]
+        cache.set_many(
+            {
+                object_cache_key(self.cache_label, row[self.pk_field], generations): row
+                for row in rows
+            },
+            timeout=self.cache_timeout,
+        )
+        hot_cache.set(key, {"meta": meta, "ids": ids}, timeout=self.cache_timeout)
+
+    def get_cached_objects(
+        self, ids: list[Any], generations: dict[str, int]
+    ) -> list[dict[str, Any]]:
+        """Rows for `ids` in order, loading any evicted ones from the database."""
+        keys = {pk: object_cache_key(self.cache_label, pk, generations) for pk in ids}
+        found = cache.get_many(list(keys.values()))
+        rows = {pk: found[key] for pk, key in keys.items() if key in found}
+
+        missing = [pk for pk in ids if pk not in rows]
+        if missing:
+            fast = fast_serializer(self.get_serializer_class())
+            queryset = self.get_queryset().filter(pk__in=missing)
+            loaded = fast.serialize(fast.values(queryset))
+            fresh = {row[self.pk_field]: row for row in loaded}
+            cache.set_many(
+                {keys[pk]: row for pk, row in fresh.items()},
+                timeout=self.cache_timeout,
+            )
+            rows.update(fresh)
+        # A row deleted by a bulk write (no signal) drops out of the page
+        return [rows[pk] for pk in ids if pk in rows]
+
+    def list(self, request, *args, **kwargs):
+        generations = get_generations(dependencies([self.cache_label]))
+        key = list_cache_key(self.cache_label, request, generations)
+        entry = hot_cache.get(key)
+        if entry is None:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                self.store_page(key, response.data, generations)
+            return response
+
+        rows = self.get_cached_objects(entry["ids"], generations)
+        return Response({**entry["meta"], "results": rows})
+
+
+class MovieViewSet(
+    ReadReplicaMixin,
+    ReadThroughCacheMixin,
+    FastListMixin,
+    KeysetPaginationMixin,
+    ModelViewSet,
+):
     """
     API endpoint for managing movies.
     """
@@ -48,9 +201,22 @@ class MovieViewSet(ModelViewSet):
         base_qs = super().get_queryset()
         return filter_movies(self.request.query_params, base_qs=base_qs)
 
-
-@method_decorator(cache_page(60 * 15), name="dispatch")  # 15 min cache
-class PrincipalViewSet(ModelViewSet):
+    @action(detail=True)
+    def cast(self, request, pk=None):
+        """The movie's ordered cast and crew, from its materialized row."""
+        cast = get_cast(pk)
+        if cast is None:
+            raise NotFound()
+        return Response({"tconst": cast.movie_id, "cast": cast.members})
+
+
+class PrincipalViewSet(
+    ReadReplicaMixin,
+    ReadThroughCacheMixin,
+    FastListMixin,
+    KeysetPaginationMixin,
+    ModelViewSet,
+):
     """
     API endpoint for managing principals (actors, directors, etc.).
     """
@@ -66,13 +232,18 @@ class PrincipalViewSet(ModelViewSet):
         # do that here before calling filter_principals.
         tconst = self.request.query_params.get("tconst")
         if tconst:
-            base_qs = base_qs.filter(tconst__tconst=tconst)
+            base_qs = base_qs.filter(tconst_id=tconst)
 
         return filter_principals(self.request.query_params, base_qs=base_qs)
 
 
-@method_decorator(cache_page(60 * 15), name="dispatch")  # 15 min cache
-class NameViewSet(ModelViewSet):
+class NameViewSet(
+    ReadReplicaMixin,
+    ReadThroughCacheMixin,
+    FastListMixin,
+    KeysetPaginationMixin,
+    ModelViewSet,
+):
     """
     API endpoint for managing names of people in the industry.
     """
@@ -85,8 +256,121 @@ class NameViewSet(ModelViewSet):
         base_qs = super().get_queryset()
         return filter_names(self.request.query_params, base_qs=base_qs)
 
+    @action(detail=True)
+    def filmography(self, request, pk=None):
+        """The person's titles, newest first, from their materialized row."""
+        filmography = get_filmography(pk)
+        if filmography is None:
+            raise NotFound()
+        return Response(
+            {
+                "nconst": filmography.person_id,
+                "known_for": filmography.known_for,
+                "filmography": filmography.titles,
+            }
+        )
+
+
+SearchBranch = tuple[str, QuerySet, type[BaseSerializer]]
+BranchResult = tuple[str, dict[str, Any], list[dict[str, Any]]]
+
+
+def single_query_params(query_params) -> dict[str, Any]:
+    """Flatten a QueryDict, taking the first element of any list value."""
+    raw_query_params: dict[str, str | list[str]] = dict(query_params)
+    return {k: v[0] if isinstance(v, list) else v for k, v in raw_query_params.items()}
+
+
+def has_search_filters(params: SearchQueryParams) -> bool:
+    return any(
+        [
+            params.name,
+            params.title,
+            params.genre,
+            params.year,
+            params.min_year,
+            params.max_year,
+            params.category,
+            params.job,
+            params.characters,
+        ]
+    )
+
+
+def search_kinds(params: SearchQueryParams) -> list[str]:
+    """The search branches (result types) a search has params for."""
+    kinds = []
+    if any([params.title, params.genre, params.year, params.min_year, params.max_year]):
+        kinds.append("movie")
+    if any([params.category, params.job, params.characters]):
+        kinds.append("principal")
+    if params.name is not None:
+        kinds.append("name")
+    return kinds
+
+
+def search_branches(
+    params: SearchQueryParams, single_params: dict[str, Any]
+) -> list[SearchBranch]:
+    """The (type, queryset, serializer) branches a search has params for."""
+    # Filters read sort/order from the raw params; use the normalized values
+    single_params = {**single_params, "order": params.order}
+    if params.sort is not None:
+        single_params["sort"] = params.sort
+
+    builders = {
+        "movie": (filter_movies, MovieSerializer),
+        "principal": (filter_principals, PrincipalSerializer),
+        "name": (filter_names, NameSerializer),
+    }
+    branches: list[SearchBranch] = []
+    for kind in search_kinds(params):
+        filter_fn, serializer_class = builders[kind]
+        branches.append((kind, filter_fn(single_params), serializer_class))
+    return branches
+
+
+def total_count(counts: list[int | str | None]) -> int | str | None:
+    """
+    Sum the branch counts. Estimated ("1000+") counts make the total an
+    estimate too, and any uncounted branch leaves the total unknown.
+    """
+    if any(count is None for count in counts):
+        return None
+    total = sum(int(str(count).rstrip("+")) for count in counts)
+    if any(isinstance(count, str) for count in counts):
+        return f"{total}+"
+    return total
 
-class SearchAPIView(APIView):
+
+def build_search_response(results: list[BranchResult]) -> dict[str, Any] | None:
+    """
+    Merge the branch results into one paginated payload, or None if no
+    branch returned anything.
+    """
+    serialized_data: list[dict[str, Any]] = []
+    sections: dict[str, dict[str, Any]] = {}
+    for kind, meta, rows in results:
+        sections[kind] = meta
+        serialized_data.extend(rows)
+
+    if not serialized_data:
+        return None
+
+    # Every branch reads the same `page` param, so any next/previous link
+    # points at the next/previous page of the whole search
+    return {
+        "count": total_count([meta["count"] for meta in sections.values()]),
+        "next": next((m["next"] for m in sections.values() if m["next"]), None),
+        "previous": next(
+            (m["previous"] for m in sections.values() if m["previous"]), None
+        ),
+        "results": serialized_data,
+        "sections": sections,
+    }
+
+
+class SearchAPIView(ReadReplicaMixin, APIView):
     """
     API endpoint for searching movies, principals, and names
     with pagination, sorting, manual caching, and partial vs exact matching.
@@ -96,12 +380,7 @@ class SearchAPIView(APIView):
 
     def get(self, request: Request) -> Response:
         """Search movies, principals, and names with multiple filters."""
-        raw_query_params: dict[str, str | list[str]] = dict(request.query_params)
-
-        # If any value is a list, just take the first element
-        single_params = {
-            k: v[0] if isinstance(v, list) else v for k, v in raw_query_params.items()
-        }
+        single_params = single_query_params(request.query_params)
 
         try:
             params = SearchQueryParams(**single_params)
@@ -111,75 +390,89 @@ class SearchAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Build a unique cache key for these query parameters
-        cache_key: str = f"search:{request.query_params.urlencode()}"
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data, status=status.HTTP_200_OK)
+        # Key on the canonical search plus the generations of the models it
+        # reads, so writes to those models invalidate the entry
+        generations = get_generations(search_dependencies(search_kinds(params)))
+        cache_key = search_cache_key(params, request, generations)
 
         # Ensure at least one param is present
-        if not any(
-            [
-                params.name,
-                params.title,
-                params.genre,
-                params.year,
-                params.category,
-                params.job,
-                params.characters,
-            ]
-        ):
+        if not has_search_filters(params):
             return Response(
                 {"error": "At least one search parameter is required."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        paginator = self.pagination_class()
-        serialized_data: list[dict[str, Any]] = []
-
-        # 1) Filter movies if relevant query params are present
-        has_movie_filters = any([params.title, params.genre, params.year])
-        if has_movie_filters:
-            movie_qs = filter_movies(single_params)
-            movie_results = paginator.paginate_queryset(movie_qs, request)
-            if movie_results:
-                for m in movie_results:
-                    serialized_data.append(
-                        {"type": "movie", "data": MovieSerializer(m).data}
-                    )
-
-        # 2) Filter principals if relevant query params are present
-        has_principal_filters = any([params.category, params.job, params.characters])
-        if has_principal_filters:
-            principal_qs = filter_principals(single_params)
-            principal_results = paginator.paginate_queryset(principal_qs, request)
-            if principal_results:
-                for p in principal_results:
-                    serialized_data.append(
-                        {"type": "principal", "data": PrincipalSerializer(p).data}
-                    )
-
-        # 3) Filter names if relevant query params are present
-        has_name_filters = params.name is not None
-        if has_name_filters:
-            name_qs = filter_names(single_params)
-            name_results = paginator.paginate_queryset(name_qs, request)
-            if name_results:
-                for n in name_results:
-                    serialized_data.append(
-                        {"type": "name", "data": NameSerializer(n).data}
-                    )
-
-        if not serialized_data:
+        def compute():
+            branches = search_branches(params, single_params)
+            return build_search_response(self.run_branches(branches, request))
+
+        # Cache the final response (e.g. 5 minutes); concurrent misses for the
+        # same search wait for a single computation
+        response_data = get_or_compute(cache_key, compute, timeout=60 * 5)
+        if response_data is None:
             return Response(
                 {"message": "No results found."}, status=status.HTTP_404_NOT_FOUND
             )
+        return Response(response_data, status=status.HTTP_200_OK)
+
+    def run_branches(
+        self, branches: list[SearchBranch], request: Request
+    ) -> list[BranchResult]:
+        """
+        Run the search branches concurrently on the shared thread pool, or
+        inline when there is only one branch or SEARCH_MAX_WORKERS <= 1.
+        Results keep the order of `branches`.
+        """
+        max_workers = getattr(settings, "SEARCH_MAX_WORKERS", 3)
+        if len(branches) <= 1 or max_workers <= 1:
+            return [self.run_branch(*branch, request) for branch in branches]
+
+        executor = search_executor(max_workers)
+        futures = [
+            # Copy the context so the branches read from the same database
+            executor.submit(
+                contextvars.copy_context().run,
+                run_with_own_connection,
+                self.run_branch,
+                *branch,
+                request,
+            )
+            for branch in branches
+        ]
+        return [future.result() for future in futures]
+
+    def run_branch(
+        self,
+        kind: str,
+        queryset: QuerySet,
+        serializer_class: type[BaseSerializer],
+        request: Request,
+    ) -> BranchResult:
+        """Paginate and serialize one branch with its own paginator."""
+        paginator = self.pagination_class()
+        fast = fast_serializer(serializer_class)
+        values = fast.values(queryset)
+        try:
+            page = paginator.paginate_queryset(values, request) or []
+        except NotFound:
+            # This branch has fewer pages than the one being browsed
+            count = paginator.get_total(values, request)
+            return kind, {"count": count, "next": None, "previous": None}, []
+
+        rows = [{"type": kind, "data": data} for data in fast.serialize(page)]
+        meta = {
+            "count": paginator.get_page_count(),
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+        }
+        return kind, meta, rows
 
-        final_response = paginator.get_paginated_response(serialized_data)
 
-        # Cache the final response (e.g. 5 minutes)
-        cache.set(cache_key, final_response.data, timeout=60 * 5)
-        return final_response
+class CacheStatsAPIView(APIView):
+    """Hit/miss counters of the local and shared cache tiers (this process)."""
+
+    def get(self, request: Request) -> Response:
+        return Response(hot_cache.stats())
 
 
 @api_view(["POST"])
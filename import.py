@@ -1,4 +1,13 @@
+import argparse
+import hashlib
+import json
+import os
+import resource
 import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import pairwise
 
 import pandas as pd
 
@@ -9,6 +18,36 @@ tsv_files = {
     "name_basics": "./name.basics.tsv",
 }
 
+database_path = "imdb_subset.db"
+
+# Rows per chunk when streaming the TSV files
+DEFAULT_CHUNK_SIZE = 200_000
+
+# Byte ranges per worker in parallel mode; more, smaller ranges even out
+# the load when some parts of a file are slower to filter than others
+RANGES_PER_WORKER = 4
+
+# Column types of the Parquet files written by --parquet (Arrow type
+# aliases); every other column is a string. IMDb's \N becomes null.
+PARQUET_TYPES = {
+    "movies": {
+        "isAdult": "bool",
+        "startYear": "int32",
+        "endYear": "int32",
+        "runtimeMinutes": "int32",
+    },
+    "principals": {"ordering": "int32"},
+    "names": {"birthYear": "int32", "deathYear": "int32"},
+}
+
+# Values of a typed column that parse as its type; any other value (IMDb's
+# \N, stray text, a number too large for int32) is written as null rather
+# than failing the export
+PARQUET_PATTERNS = {"bool": "^[01]$", "int32": "^[0-9]{1,9}$"}
+
+# Written last by --parquet, so an interrupted export never looks current
+PARQUET_STATE = "import_state.json"
+
 # Define your top 20 movie titles
 top_movies = [
     "Pinocchio",
@@ -40,53 +79,511 @@ def status_update(message, emoji="✨"):
 
 
 # Load TSV data into Pandas DataFrames
-def load_tsv(file_path, name):
+def load_tsv(file_path, name, chunksize=None):
+    """
+    Read a TSV file fully, or as an iterator of DataFrames when chunksize is set.
+    """
     status_update(f"Loading {name} data from {file_path}...", "📂")
-    return pd.read_csv(file_path, sep="\t", na_values="\\N", dtype=str)
+    return pd.read_csv(
+        file_path, sep="\t", na_values="\\N", dtype=str, chunksize=chunksize
+    )
 
 
-status_update("Starting the IMDb data processing script!", "🚀")
+def peak_rss_mb():
+    """Peak resident set size of this process in megabytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    if sys.platform == "darwin":
+        peak /= 1024
+    return peak / 1024
 
-# Step 1: Load data
-title_basics = load_tsv(tsv_files["title_basics"], "Title Basics")
-title_principals = load_tsv(tsv_files["title_principals"], "Title Principals")
-name_basics = load_tsv(tsv_files["name_basics"], "Name Basics")
 
-# Step 2: Filter movies
-status_update(
-    "Filtering movies to include only the top 20 Disney animated movies...", "🎬"
-)
-filtered_titles = title_basics[
-    (title_basics["primaryTitle"].isin(top_movies))
-    & (title_basics["titleType"] == "movie")  # Ensure we only get movies
-]
-status_update(f"Filtered {len(filtered_titles)} movies from Title Basics.", "✅")
+def report_stage(name, rows_read, rows_kept, started):
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    status_update(
+        f"{name}: kept {rows_kept:,} of {rows_read:,} rows in {elapsed:.1f}s "
+        f"({rows_read / elapsed:,.0f} rows/sec, peak RSS {peak_rss_mb():,.0f} MB)",
+        "📊",
+    )
 
-# Step 3: Filter principals
-status_update("Filtering principals (cast and crew) for the selected movies...", "🎭")
-filtered_principals = title_principals[
-    title_principals["tconst"].isin(filtered_titles["tconst"])
-]
-status_update(f"Filtered {len(filtered_principals)} principals.", "✅")
 
-# Step 4: Filter names
-status_update("Filtering names for the selected principals...", "🧑‍🎨")
-filtered_names = name_basics[name_basics["nconst"].isin(filtered_principals["nconst"])]
-status_update(f"Filtered {len(filtered_names)} names.", "✅")
+def stream_filter(file_path, name, table, conn, keep, chunk_size, key_column=None):
+    """
+    Stream a TSV file chunk by chunk, appending the rows selected by
+    `keep(chunk)` to `table`. Only one chunk is held in memory at a time.
 
-# Step 5: Save data to SQLite
-status_update("Connecting to SQLite database...", "💾")
-database_path = "imdb_subset.db"
-conn = sqlite3.connect(database_path)
+    Returns the set of `key_column` values that were kept, so the next
+    stage can filter against it.
+    """
+    started = time.perf_counter()
+    rows_read = 0
+    rows_kept = 0
+    keys = set()
+    if_exists = "replace"
+
+    for chunk in load_tsv(file_path, name, chunksize=chunk_size):
+        rows_read += len(chunk)
+        filtered = chunk[keep(chunk)]
+        # Always write the first chunk so the table is replaced even if empty
+        if if_exists == "replace" or not filtered.empty:
+            filtered.to_sql(table, conn, if_exists=if_exists, index=False)
+            if_exists = "append"
+        rows_kept += len(filtered)
+        if key_column:
+            keys.update(filtered[key_column].dropna())
+
+    report_stage(name, rows_read, rows_kept, started)
+    return keys
+
+
+def byte_ranges(file_path, parts):
+    """Split a file into `parts` contiguous (start, end) byte ranges."""
+    size = os.path.getsize(file_path)
+    bounds = [size * i // parts for i in range(parts + 1)]
+    return [(start, end) for start, end in pairwise(bounds) if end > start]
+
+
+# Values a worker keeps rows for, set once per process by the pool initializer
+# instead of being pickled with every task
+_worker_values = frozenset()
+
+
+def init_worker(values):
+    global _worker_values
+    _worker_values = frozenset(value.encode("utf-8") for value in values)
+
+
+def filter_range(task):
+    """
+    Filter the lines of a TSV file that start within [start, end): keep the
+    rows whose `match_column` is in the worker's value set and whose
+    `required` columns have the given values. Runs in a pool process.
+
+    Returns (columns, rows kept, `key_column` values kept, rows read).
+    """
+    file_path, start, end, match_column, key_column, required = task
+    with open(file_path, "rb") as f:
+        columns = f.readline().rstrip(b"\r\n").decode("utf-8").split("\t")
+        match = columns.index(match_column)
+        key = columns.index(key_column) if key_column else None
+        conditions = [
+            (columns.index(column), value.encode("utf-8"))
+            for column, value in required.items()
+        ]
+
+        if start == 0:
+            pos = f.tell()
+        else:
+            # The line containing byte start - 1 belongs to the previous range
+            f.seek(start - 1)
+            pos = start - 1 + len(f.readline())
+
+        rows = []
+        keys = set()
+        rows_read = 0
+        values = _worker_values
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+            rows_read += 1
+            # Compare raw bytes; only the kept rows are decoded
+            fields = line.rstrip(b"\r\n").split(b"\t")
+            if fields[match] not in values:
+                continue
+            if any(fields[i] != value for i, value in conditions):
+                continue
+            row = tuple(
+                None if field == b"\\N" else field.decode("utf-8") for field in fields
+            )
+            rows.append(row)
+            if key is not None and row[key] is not None:
+                keys.add(row[key])
+    return columns, rows, keys, rows_read
+
+
+def parallel_filter(
+    file_path,
+    name,
+    table,
+    conn,
+    workers,
+    match_column,
+    values,
+    key_column=None,
+    required=None,
+):
+    """
+    Filter a TSV file in a pool of `workers` processes, each taking byte
+    ranges of the file, and write the kept rows to `table` in file order.
+
+    Returns the set of `key_column` values that were kept, so the next
+    stage can filter against it.
+    """
+    status_update(f"Filtering {name} from {file_path} with {workers} workers...", "📂")
+    started = time.perf_counter()
+    tasks = [
+        (file_path, start, end, match_column, key_column, required or {})
+        for start, end in byte_ranges(file_path, workers * RANGES_PER_WORKER)
+    ]
+    rows_read = 0
+    rows_kept = 0
+    keys = set()
+    created = False
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(values,)
+    ) as pool:
+        for columns, rows, found, read in pool.map(filter_range, tasks):
+            if not created:
+                create_table(conn, table, columns)
+                created = True
+            insert_rows(conn, table, columns, rows)
+            rows_read += read
+            rows_kept += len(rows)
+            keys.update(found)
+    if not created:
+        # Empty file: read the header so the table is still replaced
+        with open(file_path, encoding="utf-8") as f:
+            create_table(conn, table, f.readline().rstrip("\r\n").split("\t"))
+    conn.commit()
+
+    report_stage(name, rows_read, rows_kept, started)
+    return keys
+
+
+def create_table(conn, table, columns):
+    """(Re)create `table` with TEXT columns, as to_sql(dtype=str) does."""
+    conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+    definitions = ", ".join(f'"{column}" TEXT' for column in columns)
+    conn.execute(f'CREATE TABLE "{table}" ({definitions})')
+
+
+def insert_rows(conn, table, columns, rows):
+    placeholders = ", ".join("?" for _ in columns)
+    conn.executemany(f'INSERT INTO "{table}" VALUES ({placeholders})', rows)
+
+
+def file_checksum(path, block_size=1 << 20):
+    """SHA-256 of a file, read in blocks so large dumps are never fully loaded."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_checksums():
+    """Checksums of every input that determines the filtered subset."""
+    checksums = {name: file_checksum(path) for name, path in tsv_files.items()}
+    # Changing the movie list changes the subset even if the dumps did not
+    checksums["top_movies"] = hashlib.sha256(
+        json.dumps(top_movies).encode()
+    ).hexdigest()
+    return checksums
+
+
+def load_checksums(conn):
+    """Checksums recorded by the previous run, or {} if there was none."""
+    try:
+        return dict(conn.execute("SELECT file, checksum FROM import_state"))
+    except sqlite3.OperationalError:
+        return {}
+
+
+def save_checksums(conn, checksums):
+    """
+    Record the source checksums next to the subset. migrate_imdb_data reads
+    this table to skip a refresh when nothing upstream has changed.
+    """
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS import_state (file TEXT PRIMARY KEY, checksum TEXT)"
+    )
+    conn.execute("DELETE FROM import_state")
+    conn.executemany("INSERT INTO import_state VALUES (?, ?)", checksums.items())
+    conn.commit()
+
+
+def load_parquet_checksums(directory):
+    """Checksums recorded by the previous --parquet run, or {} if none."""
+    try:
+        with open(os.path.join(directory, PARQUET_STATE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def export_parquet(conn, directory, checksums, batch_size=DEFAULT_CHUNK_SIZE):
+    """
+    Write the movies, principals and names tables of `conn` to
+    <directory>/<table>.parquet with the column types in PARQUET_TYPES,
+    `batch_size` rows at a time, then record the source checksums.
+    """
+    # Optional dependency, only needed for --parquet
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    def parse(values, alias):
+        """Arrow array of type `alias` from TEXT values, nulling bad ones."""
+        array = pa.array(values, pa.string())
+        if alias == "string":
+            return array
+        valid = pc.match_substring_regex(array, PARQUET_PATTERNS[alias])
+        array = pc.if_else(valid, array, pa.scalar(None, pa.string()))
+        return pc.cast(array, pa.type_for_alias(alias))
+
+    os.makedirs(directory, exist_ok=True)
+    state_path = os.path.join(directory, PARQUET_STATE)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+
+    for table, types in PARQUET_TYPES.items():
+        path = os.path.join(directory, f"{table}.parquet")
+        status_update(f"Writing {table} to {path}...", "🧱")
+        cursor = conn.execute(f'SELECT * FROM "{table}"')
+        aliases = [types.get(column[0], "string") for column in cursor.description]
+        schema = pa.schema(
+            (column[0], pa.type_for_alias(alias))
+            for column, alias in zip(cursor.description, aliases)
+        )
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            while rows := cursor.fetchmany(batch_size):
+                # Every subset column is TEXT; Arrow parses the typed ones
+                arrays = [
+                    parse(values, alias) for values, alias in zip(zip(*rows), aliases)
+                ]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump(checksums, f, indent=2)
+
+
+def run_in_memory(conn):
+    """Original pipeline: load every TSV fully into memory, then filter."""
+    # Step 1: Load data
+    title_basics = load_tsv(tsv_files["title_basics"], "Title Basics")
+    title_principals = load_tsv(tsv_files["title_principals"], "Title Principals")
+    name_basics = load_tsv(tsv_files["name_basics"], "Name Basics")
+
+    # Step 2: Filter movies
+    status_update(
+        "Filtering movies to include only the top 20 Disney animated movies...", "🎬"
+    )
+    filtered_titles = title_basics[
+        (title_basics["primaryTitle"].isin(top_movies))
+        & (title_basics["titleType"] == "movie")  # Ensure we only get movies
+    ]
+    status_update(f"Filtered {len(filtered_titles)} movies from Title Basics.", "✅")
+
+    # Step 3: Filter principals
+    status_update(
+        "Filtering principals (cast and crew) for the selected movies...", "🎭"
+    )
+    filtered_principals = title_principals[
+        title_principals["tconst"].isin(filtered_titles["tconst"])
+    ]
+    status_update(f"Filtered {len(filtered_principals)} principals.", "✅")
+
+    # Step 4: Filter names
+    status_update("Filtering names for the selected principals...", "🧑‍🎨")
+    filtered_names = name_basics[
+        name_basics["nconst"].isin(filtered_principals["nconst"])
+    ]
+    status_update(f"Filtered {len(filtered_names)} names.", "✅")
+
+    # Step 5: Save data to SQLite
+    status_update("Saving filtered movies to the database...", "🎥")
+    filtered_titles.to_sql("movies", conn, if_exists="replace", index=False)
+    status_update("Saving filtered principals to the database...", "👥")
+    filtered_principals.to_sql("principals", conn, if_exists="replace", index=False)
+    status_update("Saving filtered names to the database...", "📜")
+    filtered_names.to_sql("names", conn, if_exists="replace", index=False)
+
+
+def run_streaming(conn, chunk_size):
+    """
+    Bounded-memory pipeline: each TSV is read in chunks and filtered against
+    the key set produced by the previous stage, so only the chunk and the
+    (small) tconst/nconst sets are ever held in memory.
+    """
+    # Step 1: Stream movies, keeping only the top 20 titles
+    status_update(
+        "Streaming movies to include only the top 20 Disney animated movies...", "🎬"
+    )
+    titles = set(top_movies)
+    tconsts = stream_filter(
+        tsv_files["title_basics"],
+        "Title Basics",
+        "movies",
+        conn,
+        lambda chunk: (
+            chunk["primaryTitle"].isin(titles) & (chunk["titleType"] == "movie")
+        ),
+        chunk_size,
+        key_column="tconst",
+    )
+    status_update(f"Filtered {len(tconsts)} movies from Title Basics.", "✅")
+
+    # Step 2: Stream principals for the selected movies
+    status_update(
+        "Streaming principals (cast and crew) for the selected movies...", "🎭"
+    )
+    nconsts = stream_filter(
+        tsv_files["title_principals"],
+        "Title Principals",
+        "principals",
+        conn,
+        lambda chunk: chunk["tconst"].isin(tconsts),
+        chunk_size,
+        key_column="nconst",
+    )
+    status_update(f"Found {len(nconsts)} distinct people in principals.", "✅")
+
+    # Step 3: Stream names for the selected principals
+    status_update("Streaming names for the selected principals...", "🧑‍🎨")
+    stream_filter(
+        tsv_files["name_basics"],
+        "Name Basics",
+        "names",
+        conn,
+        lambda chunk: chunk["nconst"].isin(nconsts),
+        chunk_size,
+    )
+
+
+def run_parallel(conn, workers):
+    """
+    Multi-process pipeline: each TSV is split into byte ranges filtered by
+    a process pool against the key set produced by the previous stage. The
+    stages still run in order, as each needs the previous stage's keys.
+    """
+    status_update(
+        "Filtering movies to include only the top 20 Disney animated movies...", "🎬"
+    )
+    tconsts = parallel_filter(
+        tsv_files["title_basics"],
+        "Title Basics",
+        "movies",
+        conn,
+        workers,
+        "primaryTitle",
+        set(top_movies),
+        key_column="tconst",
+        required={"titleType": "movie"},
+    )
+    status_update(f"Filtered {len(tconsts)} movies from Title Basics.", "✅")
+
+    status_update(
+        "Filtering principals (cast and crew) for the selected movies...", "🎭"
+    )
+    nconsts = parallel_filter(
+        tsv_files["title_principals"],
+        "Title Principals",
+        "principals",
+        conn,
+        workers,
+        "tconst",
+        tconsts,
+        key_column="nconst",
+    )
+    status_update(f"Found {len(nconsts)} distinct people in principals.", "✅")
+
+    status_update("Filtering names for the selected principals...", "🧑‍🎨")
+    parallel_filter(
+        tsv_files["name_basics"],
+        "Name Basics",
+        "names",
+        conn,
+        workers,
+        "nconst",
+        nconsts,
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Filter the IMDb TSV dumps down to the top Disney movies."
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read the TSV files in chunks instead of loading them fully into memory.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Rows per chunk in streaming mode (default: {DEFAULT_CHUNK_SIZE}).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help=(
+            "Filter the TSV files in this many processes, each reading byte "
+            "ranges of the file (e.g. the number of CPU cores)."
+        ),
+    )
+    parser.add_argument(
+        "--parquet",
+        metavar="DIR",
+        help=(
+            "Write the subset as typed Parquet files (movies, principals and "
+            "names) to this directory instead of the SQLite database. Needs pyarrow."
+        ),
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Skip the rebuild if the TSV checksums match the previous run.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    status_update("Starting the IMDb data processing script!", "🚀")
+
+    if args.parquet:
+        # The subset is only staged in SQLite on its way to the Parquet files
+        status_update("Staging the subset in an in-memory SQLite database...", "💾")
+        conn = sqlite3.connect(":memory:")
+    else:
+        status_update("Connecting to SQLite database...", "💾")
+        conn = sqlite3.connect(database_path)
+    try:
+        status_update("Computing source file checksums...", "🔍")
+        checksums = source_checksums()
+        if args.parquet:
+            previous = load_parquet_checksums(args.parquet)
+        else:
+            previous = load_checksums(conn)
+        if args.incremental and previous == checksums:
+            status_update("Source files unchanged since the last import.", "⏭️")
+            return
+
+        if args.workers:
+            run_parallel(conn, args.workers)
+        elif args.stream:
+            run_streaming(conn, args.chunk_size)
+        else:
+            run_in_memory(conn)
+        if args.parquet:
+            export_parquet(conn, args.parquet, checksums)
+        else:
+            save_checksums(conn, checksums)
+    finally:
+        conn.close()
+    if args.parquet:
+        status_update(f"All data has been saved as Parquet in {args.parquet}!", "🎉")
+    else:
+        status_update(
+            "All data has been successfully saved to the SQLite database!", "🎉"
+        )
+    status_update(f"Peak memory usage: {peak_rss_mb():,.0f} MB.", "📊")
 
-status_update("Saving filtered movies to the database...", "🎥")
-filtered_titles.to_sql("movies", conn, if_exists="replace", index=False)
-status_update("Saving filtered principals to the database...", "👥")
-filtered_principals.to_sql("principals", conn, if_exists="replace", index=False)
-status_update("Saving filtered names to the database...", "📜")
-filtered_names.to_sql("names", conn, if_exists="replace", index=False)
+    status_update("Script completed. Enjoy exploring your IMDb data! 🚀", "🌟")
 
-conn.close()
-status_update("All data has been successfully saved to the SQLite database!", "🎉")
 
-status_update("Script completed. Enjoy exploring your IMDb data! 🚀", "🌟")
+if __name__ == "__main__":
+    main()